@@ -0,0 +1,56 @@
+"""Сравнение задержки запроса статуса VPS: новая ClientSession на каждый вызов против общей сессии.
+
+Запуск: python -m benchmarks.bench_api_session [--requests 200] [--latency 0.005]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import aiohttp
+
+from benchmarks.fake_vps import FakeVPSProvider
+from integrations import api
+
+
+async def per_call_session_status():
+    """Прежняя реализация: отдельная сессия (DNS + TCP + TLS) на каждый запрос"""
+    async with aiohttp.ClientSession() as session:
+        async with session.get(api.API_URL, headers=api._headers()) as response:
+            return await response.json()
+
+
+async def measure(func, requests: int) -> list[float]:
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        await func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def report(name: str, samples: list[float]):
+    samples = sorted(samples)
+    p50 = statistics.median(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    print(f"{name:<20} mean={statistics.fmean(samples):7.3f} ms  p50={p50:7.3f} ms  p99={p99:7.3f} ms")
+
+
+async def main(requests: int, latency: float):
+    provider = FakeVPSProvider(latency=latency, is_power_on=True)
+    api.API_URL = await provider.start()
+    try:
+        report("per-call session", await measure(per_call_session_status, requests))
+        await api.open_session()
+        report("shared session", await measure(api.get_vps_server_status, requests))
+    finally:
+        await api.close_session()
+        await provider.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.0, help="Задержка ответа заглушки, секунд")
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.latency))
@@ -0,0 +1,89 @@
+"""Рассылка уведомления 500 подписанным чатам: последовательная отправка против Broadcaster.
+
+Фейковый Bot имитирует задержку send_message, медленные чаты, flood control и заблокированные чаты.
+Запуск: python -m benchmarks.bench_broadcast [--chats 500] [--latency 0.03]
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from telegram.error import Forbidden, RetryAfter
+
+from config.config import bot_config
+from services.notifications import Broadcaster
+
+
+class FakeBot:
+    def __init__(self, latency: float, slow_chats: set[int], blocked: set[int], flood_after: int | None):
+        self.latency = latency
+        self.slow_chats = slow_chats
+        self.blocked = blocked
+        self.flood_after = flood_after  # после стольких сообщений один раз вернуть RetryAfter
+        self.start = 0.0
+        self.sent_at: dict[int, float] = {}
+        self.calls = 0
+
+    async def send_message(self, chat_id, text):
+        self.calls += 1
+        if self.flood_after is not None and self.calls == self.flood_after:
+            raise RetryAfter(timedelta(seconds=1))
+        if chat_id in self.blocked:
+            raise Forbidden("Forbidden: bot was blocked by the user")
+        await asyncio.sleep(self.latency * (20 if chat_id in self.slow_chats else 1))
+        self.sent_at[chat_id] = time.perf_counter() - self.start
+
+
+def make_bot(args, chats: list[int]) -> FakeBot:
+    rnd = random.Random(1)
+    return FakeBot(args.latency, set(rnd.sample(chats, 5)), set(rnd.sample(chats, 10)), args.flood_after)
+
+
+async def sequential(bot: FakeBot, chats: set[int]):
+    """Прежний notifier: чаты по одному"""
+    for chat_id in list(chats):
+        try:
+            await bot.send_message(chat_id=chat_id, text="✅ Minecraft сервер доступен")
+        except Exception:
+            pass
+
+
+def report(name: str, bot: FakeBot, total: float):
+    delays = sorted(bot.sent_at.values())
+    print(f"{name:<12} total={total:6.2f} s  delivered={len(delays)}  "
+          f"p50={statistics.median(delays):6.2f} s  p99={delays[int(len(delays) * 0.99) - 1]:6.2f} s  "
+          f"calls={bot.calls}")
+
+
+async def main(args):
+    chats = list(range(1, args.chats + 1))
+
+    bot = make_bot(args, chats)
+    bot.start = time.perf_counter()
+    await sequential(bot, set(chats))
+    report("sequential", bot, time.perf_counter() - bot.start)
+
+    broadcaster = Broadcaster(concurrency=bot_config.broadcast_concurrency,
+                              global_rate=args.global_rate,
+                              private_rate=bot_config.broadcast_private_rate,
+                              group_rate=bot_config.broadcast_group_rate)
+    bot = make_bot(args, chats)
+    subscribers = set(chats)
+    bot.start = time.perf_counter()
+    broadcaster.submit(bot, subscribers, "✅ Minecraft сервер доступен")
+    submit_time = time.perf_counter() - bot.start
+    await broadcaster.close(timeout=600)
+    report("broadcaster", bot, time.perf_counter() - bot.start)
+    print(f"watchdog tick blocked for {submit_time * 1000:.3f} ms, "
+          f"{args.chats - len(subscribers)} blocked chats unsubscribed")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chats", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.03, help="Задержка send_message, секунд")
+    parser.add_argument("--global-rate", type=float, default=bot_config.broadcast_global_rate)
+    parser.add_argument("--flood-after", type=int, default=100, help="Номер вызова, получающего RetryAfter")
+    asyncio.run(main(parser.parse_args()))
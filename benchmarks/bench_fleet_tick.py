@@ -0,0 +1,46 @@
+"""Время одного тика watchdog'а в зависимости от размера парка серверов.
+
+Проверка каждого сервера имитируется задержкой --probe-latency (как у медленного SLP запроса).
+Запуск: python -m benchmarks.bench_fleet_tick [--max-servers 50] [--probe-latency 0.2]
+"""
+import argparse
+import asyncio
+import time
+
+from services import watchdog
+from state.minecraft_server import MinecraftServer
+from state.servers import ManagedServer
+
+
+def make_fleet(size: int) -> list[ManagedServer]:
+    return [ManagedServer(name=f"server{i}", mc=MinecraftServer(server_address=f"mc{i}.local"))
+            for i in range(size)]
+
+
+async def main(max_servers: int, probe_latency: float, concurrency: int):
+    async def simulated_probe(mc: MinecraftServer):
+        await asyncio.sleep(probe_latency)
+        mc.online = True
+        mc.players_online = 1
+
+    async def shutdown():
+        pass
+
+    watchdog.refresh_mc_server_state = simulated_probe
+    print(f"probe latency {probe_latency * 1000:.0f} ms, concurrency {concurrency}")
+    print(f"{'servers':>8} {'tick, ms':>10} {'sequential, ms':>15}")
+    for size in sorted({1, 5, 10, 25, max_servers}):
+        fleet = make_fleet(size)
+        start = time.perf_counter()
+        await watchdog.watchdog_fleet_tick(fleet, lambda server: shutdown, concurrency=concurrency)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{size:>8} {elapsed:>10.1f} {size * probe_latency * 1000:>15.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--max-servers", type=int, default=50)
+    parser.add_argument("--probe-latency", type=float, default=0.2)
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+    asyncio.run(main(args.max_servers, args.probe_latency, args.concurrency))
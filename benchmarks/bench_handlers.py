@@ -0,0 +1,122 @@
+"""Пропускная способность хендлеров: настоящий Application и register_handlers,
+Bot API заменён транспортом без сети (FakeBotRequest), обновления подаются в process_update.
+
+Печатает пропускную способность, перцентили задержки по типам обновлений и профиль cProfile
+для каждого типа — видно, сколько занимают декораторы, is_authorized и reply_text.
+Запуск: python -m benchmarks.bench_handlers [--updates 5000] [--concurrency 100] [--top 12]
+"""
+import argparse
+import asyncio
+import cProfile
+import pstats
+import statistics
+import time
+
+from telegram import Update
+from telegram.ext import Application, ApplicationBuilder
+
+from benchmarks.common import make_update, percentile
+from benchmarks.fake_minecraft import FakeMinecraftServer
+from benchmarks.fake_telegram import FakeBotRequest
+from benchmarks.fake_vps import FakeVPSProvider
+from handlers import handlers
+from handlers.handlers import register_handlers
+from integrations import api
+from integrations.resolver import resolver
+from services import bot_service, watchdog
+from services.ratelimit import CommandRateLimiter
+from state.servers import servers
+
+AUTHORIZED_USER = 1001
+UNAUTHORIZED_USER = 1_000_000_000
+KINDS = {
+    "/status": (AUTHORIZED_USER, "/status"),
+    "/version": (AUTHORIZED_USER, "/version"),
+    "sticker": (AUTHORIZED_USER, "привет"),
+    "unauthorized": (UNAUTHORIZED_USER, "/status"),
+}
+
+
+def make_updates(application: Application, kinds: list[str], count: int,
+                 first_id: int = 1) -> list[tuple[str, Update]]:
+    updates = []
+    for i in range(count):
+        kind = kinds[i % len(kinds)]
+        user, text = KINDS[kind]
+        chat_id = user + i  # отдельный чат на каждое обновление, как в большой группе пользователей
+        if user == AUTHORIZED_USER:
+            bot_service.authorized_users[chat_id] = ""
+        updates.append((kind, Update.de_json(make_update(first_id + i, chat_id, text), application.bot)))
+    return updates
+
+
+async def process(application: Application, updates: list[tuple[str, Update]], concurrency: int
+                  ) -> tuple[float, dict[str, list[float]]]:
+    latency: dict[str, list[float]] = {kind: [] for kind in KINDS}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(kind: str, update: Update):
+        async with semaphore:
+            start = time.perf_counter()
+            await application.process_update(update)
+            latency[kind].append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(kind, update) for kind, update in updates))
+    return time.perf_counter() - start, latency
+
+
+async def profile_kind(application: Application, kind: str, count: int, top: int):
+    updates = make_updates(application, [kind], count, first_id=1_000_000)
+    profiler = cProfile.Profile()
+    profiler.enable()
+    for _, update in updates:
+        await application.process_update(update)
+    profiler.disable()
+    print(f"\n--- profile: {kind} x{count}, sorted by cumulative time ---")
+    stats = pstats.Stats(profiler)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(r"handlers|services|telegram/_bot|telegram/ext", top)
+
+
+async def main(count: int, concurrency: int, top: int, profile_count: int):
+    minecraft = FakeMinecraftServer(players=3)
+    provider = FakeVPSProvider(is_power_on=True)
+    await minecraft.start()
+    api.API_URL = await provider.start()
+    server = servers.default()
+    server.mc.server_address, server.mc.query_port = minecraft.host, minecraft.port
+    resolver.invalidate()
+
+    request = FakeBotRequest()
+    application = ApplicationBuilder().token("123:bench").request(request).updater(None).build()
+    register_handlers(application)
+    handlers.command_limiter = CommandRateLimiter({})  # измеряются хендлеры, а не лимиты команд
+    await application.initialize()
+    await watchdog.refresh_mc_server_state(server.mc)  # /status и /version видят свежий снимок
+    try:
+        updates = make_updates(application, list(KINDS), count)
+        for label, limit in (("sequential", 1), (f"concurrency={concurrency}", concurrency)):
+            elapsed, latency = await process(application, updates, limit)
+            print(f"{label}: {count} updates in {elapsed:.2f} s, {count / elapsed:.0f} updates/s")
+            for kind, samples in latency.items():
+                print(f"  {kind:<14} p50={statistics.median(samples):7.3f} ms  "
+                      f"p99={percentile(samples, 0.99):7.3f} ms")
+        print(f"Bot API calls: {len(request.calls)}")
+        for kind in KINDS:
+            await profile_kind(application, kind, profile_count, top)
+    finally:
+        watchdog.watchdog_stop(server)
+        await application.shutdown()
+        await api.close_session()
+        await provider.stop()
+        await minecraft.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--updates", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--top", type=int, default=12, help="Строк профиля на каждый тип обновлений")
+    parser.add_argument("--profile-updates", type=int, default=500, help="Обновлений в профилируемом прогоне")
+    args = parser.parse_args()
+    asyncio.run(main(args.updates, args.concurrency, args.top, args.profile_updates))
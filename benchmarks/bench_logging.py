@@ -0,0 +1,69 @@
+"""Задержка цикла событий из-за журнала при медленном выводе (заполненный pipe Docker'а).
+
+Фоновая задача измеряет, насколько опаздывает пробуждение asyncio.sleep, пока обработчики
+пишут записи в журнал. Сравниваются logging.basicConfig (запись прямо в цикле событий)
+и services.logs.setup_logging (очередь и отдельный поток).
+Запуск: python -m benchmarks.bench_logging [--records 500] [--write-delay 0.002]
+"""
+import argparse
+import asyncio
+import io
+import logging
+import time
+
+from benchmarks.common import percentile
+from services import logs
+
+
+class SlowStream(io.StringIO):
+    def __init__(self, delay: float):
+        super().__init__()
+        self.delay = delay
+
+    def write(self, text):
+        time.sleep(self.delay)
+        return super().write(text)
+
+
+async def measure(label: str, records: int):
+    logger = logging.getLogger("bench")
+    lags = []
+    done = False
+
+    async def probe():
+        while not done:
+            started = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append(time.perf_counter() - started - 0.001)
+
+    async def handler(i: int):
+        logger.info("user %s sent COMMAND %s", i, "/status", extra={"chat_id": i, "command": "/status"})
+        await asyncio.sleep(0)
+
+    task = asyncio.create_task(probe())
+    started = time.perf_counter()
+    for i in range(records):
+        await handler(i)
+    elapsed = time.perf_counter() - started
+    done = True
+    await task
+    print(f"{label:14s} handlers {elapsed * 1000:8.1f} ms  loop lag p50={percentile(lags, 0.5) * 1000:6.2f} ms "
+          f"max={max(lags) * 1000:6.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=500)
+    parser.add_argument("--write-delay", type=float, default=0.002, help="секунд на одну запись в вывод")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, stream=SlowStream(args.write_delay), force=True)
+    asyncio.run(measure("basicConfig", args.records))
+
+    listener = logs.setup_logging(logging.INFO, json_format=True, stream=SlowStream(args.write_delay))
+    asyncio.run(measure("queue", args.records))
+    listener.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Проверка Minecraft сервера: одно соединение (probe_status) против проверки порта + status ping.
+
+Запуск: python -m benchmarks.bench_probe [--probes 200] [--latency 0.002]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from benchmarks.fake_minecraft import FakeMinecraftServer
+from integrations.minecraft import probe_status
+from services import watchdog
+
+
+async def measure(probe, server: FakeMinecraftServer, probes: int):
+    server.connections = 0
+    samples = []
+    for _ in range(probes):
+        start = time.perf_counter()
+        result = await probe("127.0.0.1", server.port)
+        samples.append((time.perf_counter() - start) * 1000)
+        assert result.online, result
+    return samples, server.connections
+
+
+def report(name: str, samples: list[float], connections: int, probes: int):
+    samples = sorted(samples)
+    print(f"{name:<10} mean={statistics.fmean(samples):7.3f} ms  p50={statistics.median(samples):7.3f} ms  "
+          f"p99={samples[int(len(samples) * 0.99) - 1]:7.3f} ms  connections/probe={connections / probes:.1f}")
+
+
+async def main(probes: int, latency: float):
+    server = FakeMinecraftServer(latency=latency, players=5)
+    await server.start()
+    try:
+        report("two-step", *await measure(watchdog.legacy_probe, server, probes), probes)
+        report("single", *await measure(probe_status, server, probes), probes)
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--probes", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.0, help="Задержка ответа фейкового сервера, секунд")
+    args = parser.parse_args()
+    asyncio.run(main(args.probes, args.latency))
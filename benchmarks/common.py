@@ -0,0 +1,16 @@
+"""Общие функции бенчмарков: синтетические обновления Telegram и перцентили"""
+import time
+
+
+def make_update(update_id: int, chat_id: int, text: str) -> dict:
+    message = {"message_id": update_id, "date": int(time.time()), "text": text,
+               "chat": {"id": chat_id, "type": "private"},
+               "from": {"id": chat_id, "is_bot": False, "first_name": f"user{chat_id}"}}
+    if text.startswith("/"):
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+    return {"update_id": update_id, "message": message}
+
+
+def percentile(samples: list[float], q: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * q))]
@@ -0,0 +1,179 @@
+"""Сквозной бенчмарк: настоящие хендлеры и watchdog против локальных заглушек
+Minecraft сервера (SLP), API VPS провайдера и Telegram Bot API.
+
+Измеряет p50/p99 задержки команд, длительность тика watchdog'а и пропускную способность.
+С --save-baseline результаты сохраняются в JSON, при следующих запусках сравниваются с ним.
+Запуск: python -m benchmarks.e2e [--commands 200] [--ticks 100] [--mc-latency 0.005]
+        [--api-latency 0.02] [--telegram-latency 0.005] [--baseline benchmarks/baseline.json]
+        [--save-baseline] [--fail-on-regression]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+from telegram import Update
+from telegram.ext import Application, ApplicationBuilder
+
+from benchmarks.common import make_update, percentile
+from benchmarks.fake_minecraft import FakeMinecraftServer
+from benchmarks.fake_telegram import FakeTelegramAPI
+from benchmarks.fake_vps import FakeVPSProvider
+from handlers import handlers
+from handlers.handlers import register_handlers
+from integrations import api
+from integrations.resolver import resolver
+from services import bot_service, watchdog
+from services.ratelimit import CommandRateLimiter
+from state.servers import servers
+
+AUTHORIZED_USER = 1001
+UNAUTHORIZED_USER = 1_000_000_000
+COMMANDS = ["/status", "/version", "привет", "/status unauthorized"]
+REGRESSION_THRESHOLD = 0.2  # на сколько результат может быть хуже базового, доля
+
+
+def summarize(samples: list[float]) -> dict:
+    return {"p50": statistics.median(samples), "p99": percentile(samples, 0.99), "count": len(samples)}
+
+
+async def run_commands(application: Application, count: int) -> dict:
+    """Каждая команда count раз подряд: process_update ждёт завершения хендлера вместе с ответом"""
+    results = {}
+    update_id = 0
+    for command in COMMANDS:
+        text, _, who = command.partition(" ")
+        user = UNAUTHORIZED_USER if who else AUTHORIZED_USER
+        samples = []
+        for _ in range(count):
+            update_id += 1
+            update = Update.de_json(make_update(update_id, user, text), application.bot)
+            start = time.perf_counter()
+            await application.process_update(update)
+            samples.append((time.perf_counter() - start) * 1000)
+        results[command] = summarize(samples)
+    return results
+
+
+async def run_throughput(application: Application, count: int) -> float:
+    """Обновлений в секунду, когда count обновлений из разных чатов обрабатываются одновременно"""
+    updates = [Update.de_json(make_update(100_000 + i, AUTHORIZED_USER + i, COMMANDS[i % 3]), application.bot)
+               for i in range(count)]
+    for i in range(count):
+        bot_service.authorized_users[AUTHORIZED_USER + i] = ""
+    start = time.perf_counter()
+    await asyncio.gather(*(application.process_update(update) for update in updates))
+    return count / (time.perf_counter() - start)
+
+
+async def run_ticks(count: int) -> dict:
+    async def shutdown():
+        pass
+
+    async def notify(message: str):
+        pass
+
+    server = servers.default()
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        await watchdog.watchdog_tick(shutdown, notify, server)
+        samples.append((time.perf_counter() - start) * 1000)
+    return summarize(samples)
+
+
+def compare(results: dict, baseline: dict) -> list[str]:
+    """Метрики, которые хуже базовых больше чем на REGRESSION_THRESHOLD"""
+    regressions = []
+
+    def check(name: str, value: float, base: float, higher_is_better: bool = False):
+        change = (base - value) / base if higher_is_better else (value - base) / base
+        mark = "REGRESSION" if change > REGRESSION_THRESHOLD else ""
+        print(f"  {name:<32} {base:10.2f} -> {value:10.2f}  {change:+7.1%} {mark}")
+        if mark:
+            regressions.append(name)
+
+    for command, stats in results["commands"].items():
+        base = baseline.get("commands", {}).get(command)
+        if base:
+            check(f"{command} p99, ms", stats["p99"], base["p99"])
+    if "tick" in baseline:
+        check("watchdog tick p99, ms", results["tick"]["p99"], baseline["tick"]["p99"])
+    if "throughput" in baseline:
+        check("throughput, updates/s", results["throughput"], baseline["throughput"], higher_is_better=True)
+    return regressions
+
+
+async def main(args) -> int:
+    minecraft = FakeMinecraftServer(latency=args.mc_latency, players=3)
+    provider = FakeVPSProvider(latency=args.api_latency, is_power_on=True)
+    telegram = FakeTelegramAPI(latency=args.telegram_latency)
+    await minecraft.start()
+    api.API_URL = await provider.start()
+    await telegram.start()
+
+    server = servers.default()
+    server.mc.server_address, server.mc.query_port = minecraft.host, minecraft.port
+    resolver.invalidate()
+    bot_service.authorized_users[AUTHORIZED_USER] = ""
+
+    application = ApplicationBuilder().token("123:e2e").base_url(f"{telegram.url}/bot").updater(None).build()
+    register_handlers(application)
+    handlers.command_limiter = CommandRateLimiter({})  # измеряются хендлеры, а не лимиты команд
+    await application.initialize()
+    await application.start()
+    try:
+        tick = await run_ticks(args.ticks)
+        commands = await run_commands(application, args.commands)
+        throughput = await run_throughput(application, args.throughput)
+    finally:
+        watchdog.watchdog_stop(server)
+        await application.stop()
+        await application.shutdown()
+        await api.close_session()
+        await telegram.stop()
+        await provider.stop()
+        await minecraft.stop()
+
+    results = {"commands": commands, "tick": tick, "throughput": throughput,
+               "params": {"mc_latency": args.mc_latency, "api_latency": args.api_latency,
+                          "telegram_latency": args.telegram_latency}}
+
+    print(f"latency: minecraft {args.mc_latency * 1000:.0f} ms, VPS API {args.api_latency * 1000:.0f} ms, "
+          f"Bot API {args.telegram_latency * 1000:.0f} ms")
+    for command, stats in commands.items():
+        print(f"{command:<22} p50={stats['p50']:8.2f} ms  p99={stats['p99']:8.2f} ms")
+    print(f"{'watchdog tick':<22} p50={tick['p50']:8.2f} ms  p99={tick['p99']:8.2f} ms")
+    print(f"{'throughput':<22} {throughput:8.0f} updates/s")
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("params") != results["params"]:
+            print("warning: baseline was recorded with different stand-in latencies")
+        print(f"compared with {args.baseline}:")
+        regressions = compare(results, baseline)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"baseline saved to {args.baseline}")
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--commands", type=int, default=200, help="Повторов каждой команды")
+    parser.add_argument("--ticks", type=int, default=100, help="Тиков watchdog'а")
+    parser.add_argument("--throughput", type=int, default=2000, help="Обновлений в тесте пропускной способности")
+    parser.add_argument("--mc-latency", type=float, default=0.005, help="Задержка ответа Minecraft, секунд")
+    parser.add_argument("--api-latency", type=float, default=0.02, help="Задержка ответа API VPS, секунд")
+    parser.add_argument("--telegram-latency", type=float, default=0.005, help="Задержка ответа Bot API, секунд")
+    parser.add_argument("--baseline", default=os.path.join("benchmarks", "baseline.json"))
+    parser.add_argument("--save-baseline", action="store_true", help="Сохранить результаты как базовые")
+    parser.add_argument("--fail-on-regression", action="store_true",
+                        help=f"Код возврата 1, если метрика хуже базовой больше чем на {REGRESSION_THRESHOLD:.0%}")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,179 @@
+"""Локальный фейковый Minecraft сервер, отвечающий на Server List Ping и Query (GS4, UDP)"""
+import asyncio
+import json
+import random
+import struct
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    value &= 0xFFFFFFFF
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+async def _read_varint(reader: asyncio.StreamReader) -> int:
+    result = 0
+    for i in range(5):
+        byte = (await reader.readexactly(1))[0]
+        result |= (byte & 0x7F) << (7 * i)
+        if not byte & 0x80:
+            return result
+    raise ValueError("VarInt is too big")
+
+
+def _unpack_varint(data: bytes, offset: int) -> tuple[int, int]:
+    result = 0
+    for i in range(5):
+        byte = data[offset + i]
+        result |= (byte & 0x7F) << (7 * i)
+        if not byte & 0x80:
+            return result, offset + i + 1
+    raise ValueError("VarInt is too big")
+
+
+def _handshake_host(data: bytes) -> str:
+    _, offset = _unpack_varint(data, 1)  # версия протокола
+    length, offset = _unpack_varint(data, offset)
+    return data[offset:offset + length].decode()
+
+
+def _packet(packet_id: int, payload: bytes) -> bytes:
+    body = _varint(packet_id) + payload
+    return _varint(len(body)) + body
+
+
+class FakeMinecraftServer:
+    """Отвечает на handshake, status request и ping с задержкой latency секунд"""
+
+    def __init__(self, latency: float = 0.0, players: int = 0, version: str = "Paper 1.21.4",
+                 player_names: list[str] | None = None):
+        self.latency = latency
+        self.players = players
+        self.version = version
+        self.player_names = player_names or []
+        self.connections = 0  # принятые TCP соединения
+        self.status_requests = 0
+        self.handshake_hosts: list[str] = []  # адрес сервера из handshake каждого соединения
+        self._server: asyncio.AbstractServer | None = None
+        self.host = "127.0.0.1"
+        self.port = 0
+
+    def status_json(self) -> dict:
+        return {
+            "version": {"name": self.version, "protocol": 769},
+            "players": {"max": 20, "online": self.players,
+                        "sample": [{"name": name, "id": f"00000000-0000-0000-0000-{i:012d}"}
+                                   for i, name in enumerate(self.player_names)]},
+            "description": {"text": "Fake server"},
+        }
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while True:
+                length = await _read_varint(reader)
+                data = await reader.readexactly(length)
+                packet_id = data[0]
+                if packet_id == 0x00 and length == 1:  # status request
+                    self.status_requests += 1
+                    if self.latency:
+                        await asyncio.sleep(self.latency)
+                    payload = json.dumps(self.status_json()).encode()
+                    writer.write(_packet(0x00, _varint(len(payload)) + payload))
+                    await writer.drain()
+                elif packet_id == 0x01:  # ping, в ответ тот же payload
+                    if self.latency:
+                        await asyncio.sleep(self.latency)
+                    writer.write(_packet(0x01, data[1:9]))
+                    await writer.drain()
+                elif packet_id == 0x00:  # handshake: версия, адрес сервера, порт, next state; без ответа
+                    self.handshake_hosts.append(_handshake_host(data))
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError, struct.error):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        self._server = await asyncio.start_server(self._handle, host, port)
+        self.host = host
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+
+class _QueryProtocol(asyncio.DatagramProtocol):
+    def __init__(self, server: "FakeQueryServer"):
+        self.server = server
+        self.transport: asyncio.DatagramTransport | None = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr):
+        response = self.server.respond(data, addr)
+        if response is not None:
+            self.transport.sendto(response, addr)
+
+
+class FakeQueryServer:
+    """Отвечает на Query handshake и full stat. Токен привязан к адресу клиента, как у vanilla сервера;
+    rotate_tokens() имитирует периодический сброс токенов"""
+
+    def __init__(self, minecraft: FakeMinecraftServer, plugins: str = "", map_name: str = "world"):
+        self.minecraft = minecraft
+        self.plugins = plugins
+        self.map_name = map_name
+        self.handshakes = 0
+        self.stats = 0
+        self._tokens: dict[tuple, int] = {}
+        self._transport: asyncio.DatagramTransport | None = None
+        self.port = 0
+
+    def rotate_tokens(self):
+        self._tokens.clear()
+
+    def respond(self, data: bytes, addr) -> bytes | None:
+        if len(data) < 7 or data[:2] != b"\xfe\xfd":
+            return None
+        packet_type, session = data[2], data[3:7]
+        if packet_type == 9:
+            self.handshakes += 1
+            token = self._tokens[addr] = random.randint(1, 2 ** 31 - 1)
+            return bytes([9]) + session + str(token).encode() + b"\x00"
+        if packet_type == 0 and len(data) >= 11:
+            if struct.unpack(">i", data[7:11])[0] != self._tokens.get(addr):
+                return None  # неверный или устаревший токен сервер молча игнорирует
+            self.stats += 1
+            info = {"hostname": "Fake server", "gametype": "SMP", "game_id": "MINECRAFT",
+                    "version": self.minecraft.version, "plugins": self.plugins, "map": self.map_name,
+                    "numplayers": str(self.minecraft.players), "maxplayers": "20",
+                    "hostport": str(self.minecraft.port), "hostip": "127.0.0.1"}
+            body = b"splitnum\x00\x80\x00"
+            body += b"".join(key.encode() + b"\x00" + value.encode() + b"\x00" for key, value in info.items())
+            body += b"\x00\x01player_\x00\x00"
+            body += b"".join(name.encode() + b"\x00" for name in self.minecraft.player_names) + b"\x00"
+            return bytes([0]) + session + body
+        return None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        self._transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+            lambda: _QueryProtocol(self), local_addr=(host, port))
+        self.port = self._transport.get_extra_info("sockname")[1]
+        return self.port
+
+    async def stop(self):
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
@@ -0,0 +1,118 @@
+"""Локальные заглушки Telegram Bot API для бенчмарков.
+
+FakeTelegramAPI — HTTP сервер, используется через ApplicationBuilder().base_url(f"{fake.url}/bot").
+FakeBotRequest — транспорт без сети, используется через ApplicationBuilder().request(FakeBotRequest()).
+"""
+import asyncio
+import itertools
+import json
+import time
+from aiohttp import web
+from telegram.request import BaseRequest, RequestData
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "FakeBot", "username": "fake_bot"}
+
+
+def bot_api_result(method: str, params: dict, message_id: int):
+    """Правдоподобный result для метода Bot API"""
+    if method == "getMe":
+        return BOT_USER
+    if method.startswith("send") or method.startswith("edit"):
+        chat_id = int(params.get("chat_id", 0))
+        return {"message_id": params.get("message_id", message_id), "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private" if chat_id > 0 else "supergroup"},
+                "from": BOT_USER, "text": params.get("text", "")}
+    return True
+
+
+class FakeTelegramAPI:
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency  # задержка ответа на каждый вызов, секунд
+        self.calls: list[tuple[str, dict, float]] = []  # (метод, параметры, time.perf_counter())
+        self._message_id = 0
+        self._runner: web.AppRunner | None = None
+        self._waiters: list[tuple[int, asyncio.Future]] = []
+        self.url = ""
+
+    @staticmethod
+    def _decode(value: str):
+        try:
+            return json.loads(value)
+        except (json.JSONDecodeError, TypeError):
+            return value
+
+    async def _handle(self, request: web.Request):
+        method = request.match_info["method"]
+        if request.content_type == "application/json":
+            params = await request.json()
+        else:
+            params = {key: self._decode(value) for key, value in (await request.post()).items()
+                      if isinstance(value, str)}
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.calls.append((method, params, time.perf_counter()))
+        self._wake()
+        return web.json_response({"ok": True, "result": self._result(method, params)})
+
+    def _result(self, method: str, params: dict):
+        self._message_id += 1
+        return bot_api_result(method, params, self._message_id)
+
+    def _wake(self):
+        for waiter in list(self._waiters):
+            count, future = waiter
+            if len(self.calls) >= count and not future.done():
+                future.set_result(None)
+                self._waiters.remove(waiter)
+
+    async def wait_for_calls(self, count: int, timeout: float = 30):
+        """Ждёт, пока боту будет сделано не меньше count вызовов"""
+        if len(self.calls) >= count:
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append((count, future))
+        await asyncio.wait_for(future, timeout)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        app = web.Application()
+        app.router.add_route("*", "/bot{token}/{method}", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        self.url = f"http://{host}:{self._runner.addresses[0][1]}"
+        return self.url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+class FakeBotRequest(BaseRequest):
+    """Отвечает на вызовы Bot API в том же процессе, без HTTP: в замерах остаётся только код бота и PTB"""
+
+    def __init__(self):
+        self.calls: list[str] = []  # вызванные методы
+        self.timeline: list[tuple[str, int | None, float]] = []  # (метод, chat_id, time.perf_counter())
+        self._message_ids = itertools.count(1)
+
+    @property
+    def read_timeout(self) -> float | None:
+        return None
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_request(self, url: str, method: str, request_data: RequestData | None = None,
+                         read_timeout=None, write_timeout=None, connect_timeout=None,
+                         pool_timeout=None) -> tuple[int, bytes]:
+        api_method = url.rsplit("/", 1)[-1]
+        self.calls.append(api_method)
+        params = request_data.parameters if request_data is not None else {}
+        chat_id = params.get("chat_id")
+        self.timeline.append((api_method, int(chat_id) if chat_id is not None else None, time.perf_counter()))
+        result = bot_api_result(api_method, params, next(self._message_ids))
+        return 200, json.dumps({"ok": True, "result": result}).encode()
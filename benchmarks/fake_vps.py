@@ -0,0 +1,87 @@
+"""Локальная заглушка API VPS провайдера для бенчмарков и тестов, с внедрением сбоев"""
+import asyncio
+import time
+from collections import deque
+from aiohttp import web
+
+
+class FakeVPSProvider:
+    """Реализует GET / и POST /Action с типами PowerOn и ShutDownGuestOS.
+
+    inject() задаёт сбои для следующих запросов по одному на запрос: HTTP код (ответ без выполнения),
+    "hang" (ответ через hang_time секунд), "reset" (разрыв соединения без ответа), None — обычный ответ.
+    """
+
+    def __init__(self, latency: float = 0.0, is_power_on: bool = False, boot_time: float = 0.0):
+        self.latency = latency  # искусственная задержка ответа, секунд
+        self.is_power_on = is_power_on
+        self.boot_time = boot_time  # сколько секунд после PowerOn статус остаётся InProgress
+        self._powered_on_at = 0.0
+        self.hang_time = 30.0
+        self.requests = 0
+        self.actions: list[str] = []  # выполненные действия
+        self._faults: deque = deque()
+        self._runner: web.AppRunner | None = None
+        self.url = ""
+
+    def inject(self, *faults):
+        self._faults.extend(faults)
+
+    @web.middleware
+    async def _inject_faults(self, request: web.Request, handler):
+        fault = self._faults.popleft() if self._faults else None
+        if isinstance(fault, int):
+            self.requests += 1
+            return web.Response(status=fault, text="injected failure")
+        if fault == "hang":
+            await asyncio.sleep(self.hang_time)
+        elif fault == "reset":
+            self.requests += 1
+            request.transport.close()
+            raise asyncio.CancelledError
+        return await handler(request)
+
+    async def _status(self, request: web.Request):
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if not self.is_power_on:
+            state = "Stopped"
+        elif time.monotonic() - self._powered_on_at < self.boot_time:
+            state = "InProgress"
+        else:
+            state = "Running"
+        return web.json_response({"IsPowerOn": self.is_power_on, "State": state})
+
+    async def _action(self, request: web.Request):
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        data = await request.json()
+        action = data.get("Type")
+        self.actions.append(action)
+        if action == "PowerOn":
+            self.is_power_on = True
+            self._powered_on_at = time.monotonic()
+        elif action == "ShutDownGuestOS":
+            self.is_power_on = False
+        else:
+            return web.Response(status=400, text=f"Unknown action {action}")
+        return web.json_response({"State": "InProgress"})
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        app = web.Application(middlewares=[self._inject_faults])
+        app.router.add_get("/", self._status)
+        app.router.add_post("/Action", self._action)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.url = f"http://{host}:{port}"
+        return self.url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
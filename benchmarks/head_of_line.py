@@ -0,0 +1,108 @@
+"""Блокировка очереди обновлений медленной командой: /poweron ждёт API VPS провайдера,
+а в это время другие чаты шлют /version и обычные сообщения (ответ стикером).
+
+Обновления подаются в update_queue запущенного Application, как при polling и webhook.
+Сравнивается задержка ответа остальным чатам при последовательной обработке (по умолчанию в PTB)
+и с ChatOrderedUpdateProcessor.
+Запуск: python -m benchmarks.head_of_line [--api-latency 1.0] [--updates 200] [--concurrency 32]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from telegram import Update
+from telegram.ext import ApplicationBuilder
+
+from benchmarks.common import make_update, percentile
+from benchmarks.fake_minecraft import FakeMinecraftServer
+from benchmarks.fake_telegram import FakeBotRequest
+from benchmarks.fake_vps import FakeVPSProvider
+from handlers import handlers
+from handlers.handlers import register_handlers
+from integrations import api
+from integrations.resolver import resolver
+from services import bot_service, vps_service, watchdog
+from services.ratelimit import CommandRateLimiter
+from services.update_processor import ChatOrderedUpdateProcessor
+from state.servers import servers
+
+SLOW_CHAT = 500
+FAST_CHATS = 10_000
+
+
+async def run(label: str, processor, provider: FakeVPSProvider, count: int) -> None:
+    server = servers.default()
+    provider.is_power_on = False
+    server.vps.last_poweron_time = 0
+    vps_service.get_status_cache(server).invalidate()
+
+    request = FakeBotRequest()
+    builder = ApplicationBuilder().token("123:hol").request(request).updater(None)
+    if processor is not None:
+        builder = builder.concurrent_updates(processor)
+    application = builder.build()
+    register_handlers(application)
+    handlers.command_limiter = CommandRateLimiter({})
+    await application.initialize()
+    await application.start()
+
+    chats = [SLOW_CHAT] + [FAST_CHATS + i for i in range(count)]
+    texts = ["/poweron"] + ["/version" if i % 2 else "привет" for i in range(count)]
+    for chat_id in chats:
+        bot_service.authorized_users[chat_id] = ""
+    enqueued: dict[int, float] = {}
+    try:
+        for update_id, (chat_id, text) in enumerate(zip(chats, texts), start=1):
+            enqueued[chat_id] = time.perf_counter()
+            await application.update_queue.put(
+                Update.de_json(make_update(update_id, chat_id, text), application.bot))
+        replied: dict[int, float] = {}
+        start = time.perf_counter()
+        while len(replied) < len(enqueued):
+            await asyncio.sleep(0.005)
+            replied = {}
+            for method, chat_id, at in request.timeline:
+                if chat_id in enqueued and method.startswith("send"):
+                    replied.setdefault(chat_id, at)
+            if time.perf_counter() - start > 60:
+                raise TimeoutError("Not all updates were answered")
+    finally:
+        watchdog.watchdog_stop(server)
+        await application.stop()
+        await application.shutdown()
+
+    fast = [(replied[chat] - enqueued[chat]) * 1000 for chat in enqueued if chat >= FAST_CHATS]
+    slow = (replied[SLOW_CHAT] - enqueued[SLOW_CHAT]) * 1000
+    print(f"{label}:")
+    print(f"  /poweron reply           {slow:9.1f} ms")
+    print(f"  other chats, {len(fast)} updates  p50={statistics.median(fast):9.1f} ms  "
+          f"p99={percentile(fast, 0.99):9.1f} ms  max={max(fast):9.1f} ms")
+
+
+async def main(api_latency: float, count: int, concurrency: int):
+    minecraft = FakeMinecraftServer(players=0)
+    provider = FakeVPSProvider(latency=api_latency)
+    await minecraft.start()
+    api.API_URL = await provider.start()
+    server = servers.default()
+    server.mc.server_address, server.mc.query_port = minecraft.host, minecraft.port
+    resolver.invalidate()
+    try:
+        print(f"VPS API latency {api_latency * 1000:.0f} ms")
+        await run("sequential (PTB default)", None, provider, count)
+        await run(f"ChatOrderedUpdateProcessor({concurrency})", ChatOrderedUpdateProcessor(concurrency),
+                  provider, count)
+    finally:
+        await api.close_session()
+        await provider.stop()
+        await minecraft.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--api-latency", type=float, default=1.0, help="Задержка ответа API VPS, секунд")
+    parser.add_argument("--updates", type=int, default=200, help="Обновлений из других чатов")
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+    asyncio.run(main(args.api_latency, args.updates, args.concurrency))
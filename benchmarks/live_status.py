@@ -0,0 +1,137 @@
+"""Запросы к Telegram и новые сообщения в чатах за типичную сессию сервера: уведомления и ответы
+на /status новыми сообщениями против живого статуса (одно закреплённое сообщение, которое
+редактируется при смене состояния и по /status, если текст изменился).
+Смена состояния стоит одной правки на чат, как и уведомление, а закрепление первого сообщения —
+разовый запрос на чат, поэтому сессий по умолчанию десять. Живой статус выигрывает на /status:
+ответ не нужен, а правка — только если число игроков изменилось с прошлого обновления.
+
+Сессия: запуск Minecraft, игра с меняющимся числом игроков, пустой сервер с таймером
+автовыключения и выключение. Во время игры каждый чат --status раз спрашивает /status.
+Проверки Minecraft подменены сценарием. Время сжато в --speedup раз:
+тики, задержки живого статуса и таймер автовыключения идут быстрее реального, но через
+тот же планировщик обновлений, что и в боте. Сессия кончается автовыключением, поэтому
+число тиков пустого сервера зависит от --tick.
+Запуск: python -m benchmarks.live_status [--chats 50] [--tick 30] [--sessions 10] [--status 2] [--speedup 1000]
+"""
+import argparse
+import asyncio
+import random
+from types import SimpleNamespace
+
+from config.config import bot_config
+from services import events, live_status as live_status_module, watchdog
+from services.events import EventBus
+from services.live_status import LiveStatus
+from services.notifications import Broadcaster
+from state.minecraft_server import MinecraftServer
+from state.servers import ManagedServer
+
+
+class CountingBot:
+    def __init__(self):
+        self.calls = 0
+        self.messages = 0  # новых сообщений в чатах
+
+    async def send_message(self, chat_id, text, disable_notification=False):
+        self.calls += 1
+        self.messages += 1
+
+        class Message:
+            message_id = self.calls
+        return Message()
+
+    async def edit_message_text(self, text, chat_id, message_id):
+        self.calls += 1
+
+    async def pin_chat_message(self, chat_id, message_id, disable_notification=False):
+        self.calls += 1
+
+
+STARTING_TICKS, PLAYING_TICKS = 6, 120
+
+
+def session(seed: int = 1) -> list[int | None]:
+    rng = random.Random(seed)
+    starting = [None] * STARTING_TICKS
+    playing, players = [], 1
+    for _ in range(PLAYING_TICKS):
+        players = max(1, players + rng.choice((-1, 0, 0, 0, 1)))
+        playing.append(players)
+    return starting + playing + [0] * 1000
+
+
+def status_checks(chats: int, checks: int, seed: int = 1) -> dict[int, list[int]]:
+    """Тик сессии -> чаты, которые на этом тике спрашивают /status"""
+    rng = random.Random(seed)
+    schedule: dict[int, list[int]] = {}
+    for chat_id in range(1, chats + 1):
+        for _ in range(checks):
+            schedule.setdefault(rng.randrange(STARTING_TICKS, STARTING_TICKS + PLAYING_TICKS), []).append(chat_id)
+    return schedule
+
+
+async def run(chats: int, tick: float, speedup: float, sessions: int, checks: int):
+    live_status_module.broadcaster = Broadcaster(concurrency=50, global_rate=1e6, private_rate=1e6,
+                                                 group_rate=1e6)
+    events.bus = EventBus()
+    server = ManagedServer(name="bench", mc=MinecraftServer())
+    server.active_chats.update(range(1, chats + 1))
+    server.mc.wd_poweroff_cooldown /= speedup  # таймер автовыключения идёт в сжатом времени
+    script = iter(())
+    notifications = replies = 0
+    shut_down = False
+
+    async def probe(mc=None):
+        players = next(script)
+        mc.online = players is not None
+        mc.players_online = players
+
+    async def notify(message: str):
+        nonlocal notifications
+        notifications += len(server.active_chats)
+
+    async def shutdown():
+        nonlocal shut_down
+        shut_down = True
+
+    watchdog.refresh_mc_server_state = probe
+    bot = CountingBot()
+    live = LiveStatus(bot_config.live_status_delay / speedup, bot_config.live_status_min_interval / speedup)
+    live.attach(SimpleNamespace(bot=bot))
+    ticks = 0
+    for seed in range(sessions):
+        script, shut_down = iter(session(seed)), False
+        schedule = status_checks(chats, checks, seed)
+        index = 0
+        while not shut_down:
+            await watchdog.watchdog_tick(shutdown, notify, server)
+            for chat_id in schedule.get(index, ()):
+                replies += 1  # без живого статуса на /status отвечает новое сообщение
+                if not await live.refresh(bot, server, chat_id):
+                    await bot.send_message(chat_id, "/status")
+            index += 1
+            ticks += 1
+            await asyncio.sleep(tick / speedup)
+    await events.bus.drain()
+    await asyncio.sleep(bot_config.live_status_min_interval / speedup * 2)
+    await live.close()
+
+    print(f"{sessions} sessions, {ticks} ticks every {tick:.0f} s, {chats} chats, {checks} /status per chat")
+    baseline = notifications + replies
+    print(f"notifications           {baseline:6d} requests {baseline:6d} new messages")
+    print(f"live status             {bot.calls:6d} requests {bot.messages:6d} new messages")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chats", type=int, default=50)
+    parser.add_argument("--tick", type=float, default=30, help="секунд между проверками в сценарии")
+    parser.add_argument("--sessions", type=int, default=10, help="сессий подряд: закреплённое сообщение одно на все")
+    parser.add_argument("--status", type=int, default=2, help="запросов /status от каждого чата за сессию")
+    parser.add_argument("--speedup", type=float, default=1000, help="во сколько раз сжато время")
+    args = parser.parse_args()
+    asyncio.run(run(args.chats, args.tick, args.speedup, args.sessions, args.status))
+
+
+if __name__ == "__main__":
+    main()
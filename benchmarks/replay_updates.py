@@ -0,0 +1,110 @@
+"""Воспроизведение обновлений Telegram через webhook сервер бота без обращения к Telegram.
+
+Обновления берутся из файла, записанного webhook'ом (WEBHOOK_RECORD_FILE), или генерируются.
+Bot API и API VPS заменены локальными заглушками; хендлеры настоящие.
+Запуск: python -m benchmarks.replay_updates [--updates recorded.jsonl] [--count 1000] [--concurrency 50]
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from collections import defaultdict, deque
+
+import aiohttp
+from telegram.ext import ApplicationBuilder
+
+from benchmarks.common import make_update, percentile
+from benchmarks.fake_telegram import FakeTelegramAPI
+from benchmarks.fake_vps import FakeVPSProvider
+from handlers.handlers import register_handlers
+from integrations import api
+from integrations.webhook import SECRET_HEADER, WebhookServer
+from services import bot_service
+
+SECRET = "replay-secret"
+AUTHORIZED_USER = 1001
+UNAUTHORIZED_USER = 1_000_000_000
+
+
+def synthetic_updates(count: int) -> list[dict]:
+    """Смесь: /version и /status авторизованных, стикер в ответ на текст, отказ неавторизованным"""
+    mix = [(AUTHORIZED_USER, "/version"), (AUTHORIZED_USER, "/status"),
+           (AUTHORIZED_USER, "привет"), (UNAUTHORIZED_USER, "/status")]
+    updates = []
+    for i in range(count):
+        user, text = mix[i % len(mix)]
+        updates.append(make_update(i + 1, user + i, text))  # отдельный чат на каждое обновление
+    return updates
+
+
+async def replay(updates: list[dict], concurrency: int, latency: float):
+    telegram = FakeTelegramAPI(latency=latency)
+    provider = FakeVPSProvider(is_power_on=False)
+    await telegram.start()
+    api.API_URL = await provider.start()
+    for update in updates:
+        chat_id = update["message"]["chat"]["id"]
+        if chat_id >= AUTHORIZED_USER and chat_id < UNAUTHORIZED_USER:
+            bot_service.authorized_users[chat_id] = ""
+
+    application = ApplicationBuilder().token("123:replay").base_url(f"{telegram.url}/bot").updater(None).build()
+    register_handlers(application)
+    await application.initialize()
+    await application.start()
+    server = WebhookServer(application, "127.0.0.1", 0, "telegram", secret_token=SECRET)
+    port = await server.start()
+    url = f"http://127.0.0.1:{port}/telegram"
+
+    sent_at: dict[int, deque] = defaultdict(deque)
+    ack_latency = []
+    semaphore = asyncio.Semaphore(concurrency)
+    calls_before = len(telegram.calls)
+
+    async with aiohttp.ClientSession() as session:
+        async def post(update: dict):
+            async with semaphore:
+                chat_id = update["message"]["chat"]["id"]
+                start = time.perf_counter()
+                sent_at[chat_id].append(start)
+                async with session.post(url, json=update, headers={SECRET_HEADER: SECRET}) as response:
+                    assert response.status == 200, response.status
+                ack_latency.append((time.perf_counter() - start) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(post(update) for update in updates))
+        await telegram.wait_for_calls(calls_before + len(updates), timeout=120)
+        elapsed = time.perf_counter() - started
+
+    end_to_end = []
+    for method, params, at in telegram.calls[calls_before:]:
+        queue = sent_at.get(int(params.get("chat_id", 0)))
+        if queue:
+            end_to_end.append((at - queue.popleft()) * 1000)
+
+    await server.stop()
+    await application.stop()
+    await application.shutdown()
+    await api.close_session()
+    await provider.stop()
+    await telegram.stop()
+
+    print(f"updates={len(updates)} concurrency={concurrency} total={elapsed:.2f} s "
+          f"throughput={len(updates) / elapsed:.0f} updates/s")
+    print(f"webhook ack   p50={statistics.median(ack_latency):7.2f} ms  p99={percentile(ack_latency, 0.99):7.2f} ms")
+    print(f"reply latency p50={statistics.median(end_to_end):7.2f} ms  p99={percentile(end_to_end, 0.99):7.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--updates", help="Файл с обновлениями, по одному JSON в строке")
+    parser.add_argument("--count", type=int, default=1000, help="Сколько обновлений сгенерировать")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.0, help="Задержка ответа заглушки Bot API, секунд")
+    args = parser.parse_args()
+    if args.updates:
+        with open(args.updates, encoding="utf-8") as f:
+            recorded = [json.loads(line) for line in f if line.strip()]
+    else:
+        recorded = synthetic_updates(args.count)
+    asyncio.run(replay(recorded, args.concurrency, args.latency))
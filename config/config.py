@@ -1,27 +1,119 @@
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from dotenv import load_dotenv
 
 load_dotenv()
 
+@dataclass(frozen=True)
+class RateLimit:
+    burst: float  # сколько запросов можно сделать подряд
+    period: float  # за сколько секунд восстанавливается один запрос
+
+
 @dataclass(frozen=True)
 class BotConfig:
     # константы
     poweron_cooldown: int = 20 * 60  # 20 минут в секундах
     poweroff_cooldown: int = 1 * 60  # 1 минута
-    status_cooldown: int = 5  # запрос статуса
-    authorized_file: str = "authorized.json"
+    # лимиты команд: (на пользователя, на чат). Администратор не ограничивается
+    command_rate_limits: dict[str, tuple[RateLimit, RateLimit]] = field(default_factory=lambda: {
+        "status": (RateLimit(3, 5), RateLimit(10, 2)),
+        "poweron": (RateLimit(2, 10), RateLimit(3, 10)),
+        "version": (RateLimit(5, 3), RateLimit(20, 1)),
+        "stats": (RateLimit(3, 10), RateLimit(10, 5)),
+    })
+    status_cache_ttl: float = 5  # сколько секунд статус VPS считается свежим
+    status_stale_ttl: float = 25  # сколько ещё можно отдавать устаревший статус, обновляя его в фоне
+    authorized_file: str = "authorized.json"  # старый формат, импортируется в authorized_db один раз
+    authorized_db: str = "authorized.db"
+    state_db: str = "state.db"  # runtime состояние: подписанные чаты, таймер автовыключения, кулдауны
+    state_save_interval: float = 5  # как часто сохранять изменившееся состояние, секунд
+    stats_dir: str = "stats"  # история онлайна серверов для /stats
+    stats_sample_interval: float = 60  # не чаще одной точки истории в минуту
+    servers_file: str = "servers.json"  # описание парка серверов, без него используется один сервер из .env
+    watchdog_probe_concurrency: int = 64  # сколько серверов проверяется одновременно за один тик
+    watchdog_min_interval: float = 10  # самый частый опрос: запуск сервера, скорое автовыключение
+    watchdog_max_interval: float = 300  # самый редкий опрос: на сервере давно есть игроки
+    boot_poll_max_interval: float = 60  # самый редкий опрос статуса VPS во время загрузки
+    boot_timeout: float = 15 * 60  # после этого загрузка не отслеживается, проверяется сам Minecraft
+    # Подавление дребезга: решения о падении и восстановлении принимаются по последним flap_window проверкам
+    flap_window: int = 5
+    flap_down_threshold: int = 3  # неудачных проверок в окне, чтобы считать работавший сервер упавшим
+    flap_up_threshold: int = 4  # удачных проверок в окне, чтобы считать упавший сервер восстановившимся
+    notify_merge_window: float = 120  # уведомления о сервере чаще этого объединяются в одно, секунд
+    # Рассылка уведомлений (лимиты Telegram Bot API)
+    broadcast_concurrency: int = 10  # одновременных запросов send_message
+    broadcast_global_rate: float = 30  # сообщений в секунду на бота
+    broadcast_private_rate: float = 1  # сообщений в секунду в личный чат
+    broadcast_group_rate: float = 20 / 60  # сообщений в секунду в группу
+    # обновления разных чатов обрабатываются параллельно, одного чата — по порядку
+    concurrent_updates: int = 32
+    # одно закреплённое сообщение со статусом в каждом подписанном чате вместо потока уведомлений
+    live_status: bool = False  # закреплённый статус вместо уведомлений и ответов на /status
+    live_status_delay: float = 5  # смена состояния показывается через столько секунд
+    live_status_min_interval: float = 60  # остальные изменения (например, перезапуск таймера) — не чаще раза в столько секунд
+    log_format: str = "text"  # text или json (одна запись — одна строка JSON)
+    log_sample_every: int = 10  # из частых записей (тики, сообщения чатов) выводится одна из стольких
     telegram_token: str | None = None
     admin_chat_id: int | None = None
+    # Webhook режим (main.py --webhook)
+    webhook_listen: str = "127.0.0.1"  # в Docker за обратным прокси — 0.0.0.0
+    webhook_port: int = 8443
+    webhook_path: str = "telegram"
+    webhook_url: str | None = None  # публичный адрес, который регистрируется в Telegram
+    webhook_secret: str | None = None  # заголовок X-Telegram-Bot-Api-Secret-Token; без него — случайный
+    webhook_record_file: str | None = None  # запись принятых обновлений для локального воспроизведения
+    # Метрики Prometheus (GET /metrics), сервер запускается только если задан порт
+    metrics_listen: str = "127.0.0.1"
+    metrics_port: int | None = None
+    # HTTP клиент VPS API
+    api_pool_size: int = 10  # максимум одновременных соединений к API
+    api_dns_cache_ttl: int = 300  # секунд хранения DNS ответа в пуле
+    api_keepalive_timeout: float = 30  # сколько держать простаивающее соединение
+    api_connect_timeout: float = 5
+    api_read_timeout: float = 15
+    api_deadline: float = 10  # общий срок запроса статуса вместе с повторами
+    api_action_deadline: float = 20  # общий срок PowerOn/ShutDownGuestOS
+    api_attempt_timeout: float = 4  # срок одной попытки, чтобы на повтор осталось время
+    api_retries: int = 3
+    api_backoff_base: float = 0.2  # задержка перед первым повтором (до джиттера), удваивается
+    api_backoff_max: float = 2
+    api_breaker_threshold: int = 5  # неудачных вызовов подряд до паузы запросов
+    api_breaker_reset_timeout: float = 30  # пауза, после которой отправляется пробный запрос
 
 
 def load_config() -> BotConfig:
     admin_chat_id = os.getenv("ADMIN_CHAT_ID")
+    metrics_port = os.getenv("METRICS_PORT")
 
     return BotConfig(
         telegram_token=os.getenv("TELEGRAM_TOKEN"),
         admin_chat_id=int(admin_chat_id) if admin_chat_id else None,
+        servers_file=os.getenv("SERVERS_FILE", BotConfig.servers_file),
+        authorized_db=os.getenv("AUTHORIZED_DB", BotConfig.authorized_db),
+        state_db=os.getenv("STATE_DB", BotConfig.state_db),
+        stats_dir=os.getenv("STATS_DIR", BotConfig.stats_dir),
+        watchdog_min_interval=float(os.getenv("WATCHDOG_MIN_INTERVAL", BotConfig.watchdog_min_interval)),
+        watchdog_max_interval=float(os.getenv("WATCHDOG_MAX_INTERVAL", BotConfig.watchdog_max_interval)),
+        webhook_listen=os.getenv("WEBHOOK_LISTEN", BotConfig.webhook_listen),
+        webhook_port=int(os.getenv("WEBHOOK_PORT", BotConfig.webhook_port)),
+        webhook_path=os.getenv("WEBHOOK_PATH", BotConfig.webhook_path),
+        webhook_url=os.getenv("WEBHOOK_URL"),
+        webhook_secret=os.getenv("WEBHOOK_SECRET"),
+        webhook_record_file=os.getenv("WEBHOOK_RECORD_FILE"),
+        metrics_listen=os.getenv("METRICS_LISTEN", BotConfig.metrics_listen),
+        metrics_port=int(metrics_port) if metrics_port else None,
+        concurrent_updates=int(os.getenv("CONCURRENT_UPDATES", BotConfig.concurrent_updates)),
+        flap_window=int(os.getenv("FLAP_WINDOW", BotConfig.flap_window)),
+        flap_down_threshold=int(os.getenv("FLAP_DOWN_THRESHOLD", BotConfig.flap_down_threshold)),
+        flap_up_threshold=int(os.getenv("FLAP_UP_THRESHOLD", BotConfig.flap_up_threshold)),
+        notify_merge_window=float(os.getenv("NOTIFY_MERGE_WINDOW", BotConfig.notify_merge_window)),
+        log_format=os.getenv("LOG_FORMAT", BotConfig.log_format).lower(),
+        log_sample_every=int(os.getenv("LOG_SAMPLE_EVERY", BotConfig.log_sample_every)),
+        live_status=os.getenv("LIVE_STATUS", "").lower() in ("1", "true", "yes"),
+        live_status_delay=float(os.getenv("LIVE_STATUS_DELAY", BotConfig.live_status_delay)),
+        live_status_min_interval=float(os.getenv("LIVE_STATUS_MIN_INTERVAL", BotConfig.live_status_min_interval)),
     )
 
 
-bot_config = load_config()
\ No newline at end of file
+bot_config = load_config()
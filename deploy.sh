@@ -43,10 +43,32 @@ fi
 # ----------------------------
 OLD_CONTAINER_ID=$(docker ps -aq -f name="^/${CONTAINER_NAME}$")
 
-# Backup persistent data BEFORE rebuilding anything
+# Stop the old bot BEFORE backing up persistent data: on SIGTERM it saves its runtime state
+# and closes the databases, so the copies are complete. They are baked into the new image.
+OLD_IMAGE_ID=""
 if [ -n "$OLD_CONTAINER_ID" ]; then
-  echo "💾 Backing up authorized.json from old container..."
-  docker cp "$OLD_CONTAINER_ID":/app/authorized.json . 2>/dev/null || true
+  OLD_IMAGE_ID=$(docker inspect -f '{{.Image}}' "$OLD_CONTAINER_ID" 2>/dev/null || true)
+
+  echo "🛑 Stopping old container..."
+  docker stop -t 30 "$OLD_CONTAINER_ID" || true
+
+  echo "💾 Backing up persistent data from old container..."
+  # Remove copies left by the previous deploy: a stale -wal sidecar would be replayed
+  # into the fresh database, and docker cp would nest stats/ into ./stats/stats.
+  rm -rf ./stats
+  for DATA_FILE in authorized.json authorized.db state.db; do
+    rm -f "./$DATA_FILE" "./$DATA_FILE-wal" "./$DATA_FILE-shm"
+    docker cp "$OLD_CONTAINER_ID":/app/"$DATA_FILE" . 2>/dev/null || true
+  done
+  # After a clean stop the databases are checkpointed; if the bot was killed (SIGKILL after
+  # the timeout), committed transactions are still in the WAL sidecars, so copy them too.
+  for DB_FILE in authorized.db state.db; do
+    for SIDECAR in "$DB_FILE-wal" "$DB_FILE-shm"; do
+      docker cp "$OLD_CONTAINER_ID":/app/"$SIDECAR" . 2>/dev/null || true
+    done
+  done
+  mkdir -p ./stats
+  docker cp "$OLD_CONTAINER_ID":/app/stats/. ./stats/ 2>/dev/null || true
 fi
 
 
@@ -54,7 +76,14 @@ fi
 # Build new image
 # ----------------------------
 echo "🏗️ Building new image..."
-docker build -t "$IMAGE_NAME" .
+if ! docker build -t "$IMAGE_NAME" .; then
+  echo "❌ Build failed"
+  if [ -n "$OLD_CONTAINER_ID" ]; then
+    echo "↩️ Restarting old container..."
+    docker start "$OLD_CONTAINER_ID" || true
+  fi
+  exit 1
+fi
 
 # Tag image as latest for runtime simplicity
 echo "🏷️ Updating latest tag..."
@@ -62,15 +91,9 @@ docker tag "$IMAGE_NAME" "$CONTAINER_NAME:latest"
 
 
 # ----------------------------
-# Stop and remove old container
+# Remove old container
 # ----------------------------
-OLD_IMAGE_ID=""
 if [ -n "$OLD_CONTAINER_ID" ]; then
-  OLD_IMAGE_ID=$(docker inspect -f '{{.Image}}' "$OLD_CONTAINER_ID" 2>/dev/null || true)
-
-  echo "🛑 Stopping old container..."
-  docker stop "$OLD_CONTAINER_ID" || true
-
   echo "🗑️ Removing old container..."
   docker rm "$OLD_CONTAINER_ID" || true
 fi
@@ -1,15 +1,19 @@
 import logging
+import math
 import time
 from telegram.ext import CommandHandler, MessageHandler, filters, ContextTypes
-from integrations import api
-from services import vps_service, watchdog, bot_service
+from services import boot_tracker, events, lifecycle, metrics, vps_service, watchdog, bot_service
+from services.ratelimit import CommandRateLimiter
+from services.player_stats import HISTORY_DAYS, player_stats
+from services.live_status import live_status
 from services.bot_service import log_command
 from state.bot_state import bot_state
 from config.config import bot_config
 from functools import wraps
 from telegram import Update
 import random
-from state.minecraft_server import mc_server
+from state.servers import ManagedServer, servers
+from state.watchdog_state import Phase
 
 
 logger = logging.getLogger(__name__)
@@ -28,6 +32,7 @@ def register_handlers(app):
     app.add_handler(CommandHandler("maintain", maintenance))
     app.add_handler(CommandHandler("mute", mute))
     app.add_handler(CommandHandler("version", get_cached_mc_version))
+    app.add_handler(CommandHandler("stats", stats))
     app.add_handler(MessageHandler(filters.ALL & ~filters.COMMAND, echo))
     #app.add_handler(MessageHandler(filters.ALL, log_all), group=0) # для логирования всего
 
@@ -55,6 +60,47 @@ def check_permissions(func):
 
     return wrapper
 
+
+command_limiter = CommandRateLimiter(bot_config.command_rate_limits)
+
+
+def rate_limited(command: str):
+    """Декоратор ограничения частоты команды для пользователя и чата (см. bot_config.command_rate_limits)"""
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
+            if update.effective_user.id != bot_config.admin_chat_id:
+                wait, warn = command_limiter.check(command, update.effective_user.id, update.effective_chat.id)
+                if wait:
+                    metrics.rate_limited.inc(command)
+                    if warn:  # на повторные запросы во время ограничения не отвечаем
+                        await update.message.reply_text(
+                            f"⏳ Слишком много запросов. Подождите {math.ceil(wait)} секунд(у).")
+                    return None
+            return await func(update, context)
+
+        return wrapper
+
+    return decorator
+
+
+def parse_server_arg(context: ContextTypes.DEFAULT_TYPE) -> tuple[ManagedServer, list[str]]:
+    """Отделяет имя сервера (первый аргумент команды) от остальных аргументов.
+    Без имени используется сервер по умолчанию"""
+    args = list(context.args or [])
+    if args and (server := servers.get(args[0])) is not None:
+        return server, args[1:]
+    return servers.default(), args
+
+
+def server_label(server: ManagedServer) -> str:
+    return f"[{server.name}] " if servers.is_fleet() else ""
+
+
+def servers_hint() -> str:
+    return f"\nДоступные серверы: {', '.join(servers.names())}" if servers.is_fleet() else ""
+
+
 @log_command("/start")
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_type = update.effective_chat.type  # 'private', 'group', 'supergroup', 'channel'
@@ -88,6 +134,7 @@ async def echo(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """user_name = get_user_name(update)
     message_text = update.message.text
     logger.info(f"Message from {user_name}: {message_text}")"""
+    await bot_service.log_all(update, context)  # в журнал попадает выборка сообщений
     random_sticker = random.choice(sticker_ids)
     await update.message.reply_sticker(random_sticker)
     #await update.message.reply_text(random.choice(["🌚", "🌝"]))
@@ -107,8 +154,7 @@ async def addgroup(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("ℹ️ Группа уже добавлена.")
         return
 
-    bot_service.authorized_groups.add(update.effective_chat.id)
-    bot_service.save_auth_data()
+    await bot_service.add_authorized_group(update.effective_chat.id)
     await update.message.reply_text("✅ Группа успешно добавлена в список разрешённых.")
 
 
@@ -136,8 +182,7 @@ async def adduser(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text(f"ℹ️ Пользователь {user_id} уже в списке.")
         return
 
-    bot_service.authorized_users[int(user_id)] = username
-    bot_service.save_auth_data()
+    await bot_service.add_authorized_user(int(user_id), username)
 
     await update.message.reply_text(
         f"✅ Добавлен пользователь {user_id} (@{username})" if username else f"✅ Добавлен пользователь {user_id}")
@@ -154,8 +199,7 @@ async def removegroup(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     if update.effective_chat.id in bot_service.authorized_groups:
-        bot_service.authorized_groups.remove(update.effective_chat.id)
-        bot_service.save_auth_data()
+        await bot_service.remove_authorized_group(update.effective_chat.id)
         await update.message.reply_text("✅ Группа удалена из списка разрешённых.")
     else:
         await update.message.reply_text("ℹ️ Группа не была в списке.")
@@ -185,11 +229,8 @@ async def removeuser(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text(f"ℹ️ Пользователь {user_id} не найден в списке.")
         return
 
-    # Удаляем пользователя
-    bot_service.authorized_users.pop(int(user_id))
-
-    # Сохраняем изменения
-    bot_service.save_auth_data()
+    # Удаляем пользователя, изменение сразу записывается в базу
+    await bot_service.remove_authorized_user(int(user_id))
 
     await update.message.reply_text(f"✅ Пользователь {user_id} удалён.")
 
@@ -228,76 +269,83 @@ async def list_authorized(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 @check_maintenance
 @check_permissions
+@rate_limited("poweron")
 @log_command("/poweron")
 async def poweron(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    now = time.time()
+    server, args = parse_server_arg(context)
+    force = args == ["force"]
 
-    if len(context.args) == 1 and context.args[0] == "force":  # type: ignore
+    if force:
         if update.effective_user.id != bot_config.admin_chat_id:
             await update.message.reply_text("⛔ Недостаточно прав для принудительного включения.")
             return
-    elif context.args:
-        await update.message.reply_text("⚠️ Неправильно введённая команда.")
-        return
-
-    if now - vps_service.vps_state.last_status_time < bot_config.status_cooldown and not context.args:
-        remaining = int(bot_config.status_cooldown - (now - vps_service.vps_state.last_status_time))
-        await update.message.reply_text(f"⏳ Подождите {remaining} секунд(у) перед повторным запросом.")
+    elif args:
+        await update.message.reply_text("⚠️ Неправильно введённая команда." + servers_hint())
         return
 
     try:
         # Запрос текущего статуса VPS
-        server_status = await api.get_vps_server_status()
-        # Запрос текущего статуса Minecraft
-        await watchdog.refresh_mc_server_state()
+        server_status = await vps_service.get_vps_status(allow_stale=False, server=server)
+        # Обновление снимка состояния Minecraft в фоне, если он устарел
+        watchdog.get_mc_snapshot(server=server)
 
         if "error" in server_status:
             await update.message.reply_text(f"⚠️ Ошибка при запросе статуса: {server_status['error']}")
             return
-        bot_state.active_chats.add(update.effective_chat.id)  # Вывод уведомлений о статусе сервера в текущий чат
+        server.active_chats.add(update.effective_chat.id)  # Вывод уведомлений о статусе сервера в текущий чат
         is_power_on = server_status.get("IsPowerOn")
         if is_power_on:
-            await update.message.reply_text("✅ Сервер уже включен.")
+            await update.message.reply_text(f"{server_label(server)}✅ Сервер уже включен.")
             job_queue = context.job_queue # без выделения в отдельную переменную ругается линтер
             if job_queue is None:
                 raise RuntimeError("JobQueue is not available")
-            watchdog.watchdog_run(job_queue)
-            vps_service.vps_state.last_status_time = now
+            watchdog.watchdog_run(job_queue, server)
             return
         elif is_power_on is False:
-            if now - vps_service.vps_state.last_poweron_time < bot_config.poweron_cooldown and not context.args:
-                remaining = int(bot_config.poweron_cooldown - (now - vps_service.vps_state.last_poweron_time))
+            now = time.time()
+            if now - server.vps.last_poweron_time < bot_config.poweron_cooldown and not force:
+                remaining = int(bot_config.poweron_cooldown - (now - server.vps.last_poweron_time))
                 await update.message.reply_text(
                     f"⏳ Подождите {remaining if remaining < 60 else f'{(remaining / 60):.0f}'} "
                     f"{'секунд(у)' if remaining < 60 else 'минут(у)'} "
                     f"перед повторным включением сервера."
                 )
                 return
-            # Отправка запроса на включение
-            result = await api.api_request("PowerOn")
+            # Отправка запроса на включение. Если его уже отправил другой пользователь,
+            # ждём тот же запрос вместо повторного
+            result, joined = await vps_service.get_power_coordinator(server).run(
+                "poweron", lambda: vps_service.poweron_vps(server))
 
             if "error" in result:
                 await update.message.reply_text(f"⚠️ Ошибка: {result['error']}")
-                bot_state.active_chats.discard(update.effective_chat.id)  # Сброс уведомлений при ошибке
+                server.active_chats.discard(update.effective_chat.id)  # Сброс уведомлений при ошибке
                 return
 
             job_queue = context.job_queue
             if job_queue is None:
                 raise RuntimeError("JobQueue is not available")
-            watchdog.watchdog_run(job_queue)
+            watchdog.watchdog_run(job_queue, server)
 
             state = result.get("State", "Unknown")
+            if joined:
+                await update.message.reply_text(
+                    f"{server_label(server)}✅ Сервер уже включается по запросу другого пользователя, "
+                    f"пожалуйста, подождите...")
+                return
             if state == "InProgress":
-                await update.message.reply_text("✅ Запрос на включение отправлен, пожалуйста, подождите...")
+                message = f"{server_label(server)}✅ Запрос на включение отправлен, пожалуйста, подождите..."
             else:
-                await update.message.reply_text(f"✅ Запрос отправлен. Статус: {state}")
-
-            vps_service.vps_state.last_poweron_time = now
-            vps_service.vps_state.last_status_time = now
+                message = f"{server_label(server)}✅ Запрос отправлен. Статус: {state}"
+            expected = boot_tracker.expected_boot_time(server.vps)
+            if expected is not None:
+                message += f"\n⏱ Обычно запуск занимает около {boot_tracker.format_eta(expected)}"
+            await update.message.reply_text(message)
 
             chat_type = update.effective_chat.type  # 'private', 'group', 'supergroup', 'channel'
             if chat_type == 'private':
-                await bot_service.notify_admin(update, context, "отправил запрос на включение сервера")
+                await bot_service.notify_admin(update, context,
+                                               f"отправил запрос на включение сервера {server.name}"
+                                               if servers.is_fleet() else "отправил запрос на включение сервера")
 
         else:
             await update.message.reply_text("❓ Не удалось определить состояние сервера.")
@@ -316,21 +364,21 @@ async def poweroff(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("⛔ Недостаточно прав для выполнения команды.")
         return
 
+    server, args = parse_server_arg(context)
+    if args:
+        await update.message.reply_text("⚠️ Неправильно введённая команда." + servers_hint())
+        return
+
     # Проверка кулдауна
     now = time.time()
-    if now - vps_service.vps_state.last_poweroff_time < bot_config.poweroff_cooldown:
-        remaining = int(bot_config.poweroff_cooldown - (now - vps_service.vps_state.last_poweroff_time))
+    if now - server.vps.last_poweroff_time < bot_config.poweroff_cooldown:
+        remaining = int(bot_config.poweroff_cooldown - (now - server.vps.last_poweroff_time))
         await update.message.reply_text(f"⏳ Подождите {remaining} секунд(у) перед повторным выключением.")
         return
 
-    if now - vps_service.vps_state.last_status_time < bot_config.status_cooldown:
-        remaining = int(bot_config.status_cooldown - (now - vps_service.vps_state.last_status_time))
-        await update.message.reply_text(f"⏳ Подождите {remaining} секунд(у) перед повторным запросом.")
-        return
-
     try:
         # Запрос текущего статуса
-        server_status = await api.get_vps_server_status()
+        server_status = await vps_service.get_vps_status(allow_stale=False, server=server)
 
         if "error" in server_status:
             await update.message.reply_text(f"⚠️ Ошибка при запросе статуса: {server_status['error']}")
@@ -338,25 +386,24 @@ async def poweroff(update: Update, context: ContextTypes.DEFAULT_TYPE):
         is_power_on = server_status.get("IsPowerOn")
 
         if is_power_on is False:
-            await update.message.reply_text("✅ Сервер уже выключен.")
-            vps_service.vps_state.last_status_time = now
+            await update.message.reply_text(f"{server_label(server)}✅ Сервер уже выключен.")
             return
 
         elif is_power_on:
-            # Отправка запроса на выключение
-            result = await bot_service.shutdown_all(context.application)
+            # Отправка запроса на выключение; автовыключение watchdog'а, если оно уже идёт, не повторяется
+            result, _ = await vps_service.get_power_coordinator(server).run(
+                "shutdown", lambda: bot_service.shutdown_all(context.application, server))
             if "error" in result:
                 await update.message.reply_text(f"⚠️ Ошибка: {result['error']}")
                 return
 
             state = result.get("State", "Unknown")
             if state == "InProgress":
-                await update.message.reply_text("✅ Сервер выключается, пожалуйста, подождите...")
+                await update.message.reply_text(f"{server_label(server)}✅ Сервер выключается, пожалуйста, подождите...")
             else:
-                await update.message.reply_text(f"✅ Запрос отправлен. Статус: {state}")
+                await update.message.reply_text(f"{server_label(server)}✅ Запрос отправлен. Статус: {state}")
 
-            vps_service.vps_state.last_poweroff_time = now
-            vps_service.vps_state.last_status_time = now
+            server.vps.last_poweroff_time = now
 
             #await notify_admin(update, context, "отправил запрос на выключение сервера")
 
@@ -370,63 +417,90 @@ async def poweroff(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 @check_maintenance
 @check_permissions
+@rate_limited("status")
 @log_command("/status")
-async def status(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def refresh_live_status(update: Update, context: ContextTypes.DEFAULT_TYPE, server: ManagedServer) -> bool:
+    """В режиме живого статуса /status обновляет закреплённое сообщение чата вместо нового ответа"""
+    if not bot_config.live_status:
+        return False
+    return await live_status.refresh(context.bot, server, update.effective_chat.id)
 
-    now = time.time()
-    if now - vps_service.vps_state.last_status_time < bot_config.status_cooldown:
-        remaining = int(bot_config.status_cooldown - (now - vps_service.vps_state.last_status_time))
-        await update.message.reply_text(f"⏳ Подождите {remaining} секунд(у) перед повторным запросом статуса сервера.")
+
+async def status(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    server, args = parse_server_arg(context)
+    if args:
+        await update.message.reply_text("⚠️ Неправильно введённая команда." + servers_hint())
         return
 
     try:
 
-        # Запрос текущего статуса VPS сервера
-        server_status = await api.get_vps_server_status()
+        # Текущий статус VPS сервера: одновременные запросы объединяются в один запрос к API
+        server_status = await vps_service.get_vps_status(server=server)
 
         if "error" in server_status:
             await update.message.reply_text(f"⚠️ Ошибка при запросе статуса: {server_status['error']}")
             return
-        vps_service.vps_state.last_status_time = now  # обновляем время успешного запроса статуса
         is_power_on = server_status.get("IsPowerOn")
-        logger.debug(
-            f"IsPowerOn={is_power_on}, type={type(is_power_on)}"
-        )
-        logger.debug(
-            f"mc_server.online={mc_server.online}, "
-            f"chat_muted={context.chat_data.get('muted', False)}"
-        )
+        logger.debug("IsPowerOn=%s, type=%s", is_power_on, type(is_power_on))
+        snapshot = watchdog.get_mc_snapshot(server=server)
+        logger.debug("mc_server.online=%s, chat_muted=%s", snapshot.online, context.chat_data.get("muted", False))
+        label = server_label(server)
+        stale_for = server_status.get("stale_for")
+        if stale_for is not None:
+            # API провайдера не отвечает: показываем последний известный статус
+            age = f"{stale_for:.0f} сек." if stale_for < 60 else f"{stale_for / 60:.0f} мин."
+            label += f"⚠️ API провайдера не отвечает, статус VPS получен {age} назад.\n"
         if is_power_on:
             if not context.chat_data.get("muted", False):
                 # добавляем чат для уведомлений только если сервер активен
-                bot_state.active_chats.add(update.effective_chat.id)
+                server.active_chats.add(update.effective_chat.id)
             job_queue = context.job_queue
             if job_queue is None:
                 raise RuntimeError("JobQueue is not available")
-            watchdog.watchdog_run(job_queue)
-            if mc_server.online:
+            watchdog.watchdog_run(job_queue, server)
+            if stale_for is None and await refresh_live_status(update, context, server):
+                return
+            if snapshot.online:
                 message = (
-                    f"🟢 Сервер включен. "
-                    f"На сервере {mc_server.players_online} игрок(ов)."
+                    f"{label}🟢 Сервер включен. "
+                    f"На сервере {snapshot.players_online} игрок(ов)."
                 )
+                if snapshot.player_names:
+                    message += f"\n👤 {', '.join(snapshot.player_names)}"
 
-                if mc_server.players_online == 0 and mc_server.shutdown_remaining is not None:
+                # таймер идёт и при игроках из ignored_players, поэтому проверяется только он
+                if snapshot.shutdown_remaining is not None:
                     remaining = (
-                        f"{mc_server.shutdown_remaining} сек."
-                        if mc_server.shutdown_remaining < 60
-                        else f"{(mc_server.shutdown_remaining / 60):.0f} мин."
+                        f"{snapshot.shutdown_remaining} сек."
+                        if snapshot.shutdown_remaining < 60
+                        else f"{(snapshot.shutdown_remaining / 60):.0f} мин."
                     )
 
                     message += f"\n⏳ До автовыключения: {remaining}"
 
                 await update.message.reply_text(message)
             else:
-                await update.message.reply_text("🟡 Minecraft сервер запускается или ещё недоступен.")
-                mc_server.online = False
+                message = f"{label}🟡 Minecraft сервер запускается или ещё недоступен."
+                remaining = boot_tracker.eta(server.vps)
+                if remaining:
+                    message += f"\n⏱ Примерно через {boot_tracker.format_eta(remaining)}"
+                await update.message.reply_text(message)
         elif is_power_on is False:
-            await update.message.reply_text("🔴 Сервер выключен.")
-            mc_server.online = False
-            watchdog.watchdog_stop()
+            pending = vps_service.get_power_coordinator(server).pending
+            if pending == "poweron":
+                await update.message.reply_text(f"{label}🟠 Сервер включается, пожалуйста, подождите...")
+            # во время выключения состояние сбросит само выключение, по старому статусу не сбрасываем
+            elif pending is None and stale_for is None:
+                # VPS выключили в обход бота: тиков больше не будет, состояние переводится здесь
+                event = lifecycle.transition(server, Phase.VPS_OFF)
+                server.mc.reset_runtime()
+                watchdog.watchdog_stop(server)
+                if event is not None:
+                    events.bus.publish(event)
+                if not await refresh_live_status(update, context, server):
+                    await update.message.reply_text(f"{label}🔴 Сервер выключен.")
+            else:
+                await update.message.reply_text(f"{label}🔴 Сервер выключен.")
         else:
             await update.message.reply_text("❓ Не удалось определить состояние сервера.")
 
@@ -444,7 +518,8 @@ async def maintenance(update: Update, context: ContextTypes.DEFAULT_TYPE):
     bot_state.maintenance_mode = not bot_state.maintenance_mode
 
     if bot_state.maintenance_mode:
-        watchdog.watchdog_stop()
+        for server in servers:
+            watchdog.watchdog_stop(server)
         await update.message.reply_text("🚧 Режим обслуживания включен.")
     else:
         await update.message.reply_text("🎮 Режим обслуживания выключен.")
@@ -462,18 +537,47 @@ async def mute(update: Update, context: ContextTypes.DEFAULT_TYPE):
     context.chat_data["muted"] = not is_muted
 
     if context.chat_data["muted"]:
-        bot_state.active_chats.discard(update.effective_chat.id)
+        for server in servers:
+            server.active_chats.discard(update.effective_chat.id)
         await update.message.reply_text("🔇 Уведомления в этом чате выключены до перезапуска сервера.")
     else:
-        bot_state.active_chats.add(update.effective_chat.id)
+        # уведомления возвращаются для работающих серверов
+        for server in servers.running() or [servers.default()]:
+            server.active_chats.add(update.effective_chat.id)
         await update.message.reply_text("🔔 Уведомления включены.")
 
 
 @check_permissions
+@rate_limited("version")
 @log_command("/version")
 async def get_cached_mc_version(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Хендлер вывода текущей версии Minecraft сервера без запроса к API"""
-    if mc_server.version and mc_server.online:
-        await update.message.reply_text(f"ℹ️ Версия Minecraft сервера: {mc_server.version_number}")
+    server, _ = parse_server_arg(context)
+    snapshot = server.mc.snapshot
+    if snapshot.version and snapshot.online:
+        await update.message.reply_text(f"{server_label(server)}ℹ️ Версия Minecraft сервера: {snapshot.version_number}")
     else:
         await update.message.reply_text("ℹ️ Версия Minecraft сервера неизвестна или сервер не запущен.")
+
+
+@check_permissions
+@rate_limited("stats")
+@log_command("/stats")
+async def stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Статистика онлайна за последние дни: /stats [server] [days]"""
+    server, args = parse_server_arg(context)
+    days = int(args[0]) if args and args[0].isdigit() and int(args[0]) > 0 else 7
+    days = min(days, HISTORY_DAYS)  # старше истории всё равно нет, а длинное число не переполнит time.time()
+    history = player_stats.history(server)
+    summary = history.summarize(time.time() - days * 86400) if history is not None else None
+    if summary is None or not summary.online_samples:
+        await update.message.reply_text(f"{server_label(server)}ℹ️ Статистики за {days} дн. пока нет.")
+        return
+
+    message = [f"{server_label(server)}📊 Статистика за {days} дн. ({summary.samples} проверок):"]
+    if summary.peak_hours:
+        peaks = ", ".join(f"{hour:02d}:00 ({players:.1f})" for hour, players in summary.peak_hours)
+        message.append(f"📈 Часы пик: {peaks}")
+    message.append(f"👥 Игроков в среднем, когда сервер не пуст: {summary.session_concurrency:.1f}")
+    message.append(f"💤 Сервер пустовал {summary.idle_share:.0%} времени работы")
+    await update.message.reply_text("\n".join(message))
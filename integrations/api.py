@@ -1,41 +1,185 @@
+import asyncio
 import logging
 import os
+import random
+import time
 import aiohttp
+from config.config import bot_config
 
 logger = logging.getLogger(__name__)
 
 API_URL = os.getenv("API_URL")
 API_TOKEN = os.getenv("API_TOKEN")
 
-async def get_vps_server_status():
-    headers = {
-        "Authorization": f"Bearer {API_TOKEN}",
-        "Content-Type": "application/json"
-    }
+# Общая сессия с пулом соединений: keep-alive, кеш DNS, таймауты.
+# Открывается и закрывается хуками Application в main.py
+_session: aiohttp.ClientSession | None = None
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(API_URL, headers=headers) as response:  # type: ignore
-            if response.status == 200:
-                return await response.json()
-            return {"error": f"{response.status}: {await response.text()}"}
+RETRYABLE_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
 
 
-async def api_request(action: str):
-    """Общая функция для API-запросов"""
-    headers = {
-        "Authorization": f"Bearer {API_TOKEN}",
+def _headers(api_token: str | None = None) -> dict[str, str]:
+    return {
+        "Authorization": f"Bearer {api_token or API_TOKEN}",
         "Content-Type": "application/json"
     }
-    json_data = {"Type": action}
 
+
+async def open_session() -> aiohttp.ClientSession:
+    """Создаёт общую HTTP сессию для запросов к API VPS"""
+    global _session
+    if _session is None or _session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=bot_config.api_pool_size,
+            ttl_dns_cache=bot_config.api_dns_cache_ttl,
+            keepalive_timeout=bot_config.api_keepalive_timeout,
+        )
+        timeout = aiohttp.ClientTimeout(
+            connect=bot_config.api_connect_timeout,
+            sock_read=bot_config.api_read_timeout,
+        )
+        _session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        logger.debug("API client session opened")
+    return _session
+
+
+async def close_session():
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+        logger.debug("API client session closed")
+    _session = None
+
+
+class CircuitBreaker:
+    """Размыкатель для одного API: после failure_threshold неудачных вызовов подряд запросы
+    не отправляются reset_timeout секунд, затем пропускается один пробный запрос.
+    Успешный пробный запрос замыкает цепь, неудачный — размыкает снова."""
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return "open"
+        return "half_open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self):
+        if self.opened_at is not None:
+            logger.info("VPS API answered, circuit closed")
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._probing or self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                logger.warning(f"VPS API failed {self.failures} times in a row, "
+                               f"pausing requests for {self.reset_timeout:.0f} seconds")
+            self.opened_at = time.monotonic()
+        self._probing = False
+
+    def abandon(self):
+        """Вызов отменён без результата: пробный запрос можно отправить снова"""
+        self._probing = False
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(api_url: str | None = None) -> CircuitBreaker:
+    url = api_url or API_URL or ""
+    breaker = _breakers.get(url)
+    if breaker is None:
+        breaker = _breakers[url] = CircuitBreaker(bot_config.api_breaker_threshold,
+                                                  bot_config.api_breaker_reset_timeout)
+    return breaker
+
+
+async def _attempt(method: str, url: str, api_token: str | None, json_data: dict | None):
+    session = await open_session()  # лениво открывает сессию, если хук не вызывался
+    async with session.request(method, url, headers=_headers(api_token), json=json_data) as response:
+        if response.status == 200:
+            return response.status, await response.json()
+        return response.status, await response.text()
+
+
+async def _call(method: str, api_url: str | None, api_token: str | None, path: str = "",
+                json_data: dict | None = None, idempotent: bool = True, deadline: float | None = None) -> dict:
+    """Запрос к API с общим сроком deadline, повторами и размыкателем.
+
+    Повторяются временные ошибки (соединение, таймаут, 429 и 5xx) с экспоненциальной задержкой
+    и полным джиттером, пока укладываются в срок. Неидемпотентный запрос (действие с питанием)
+    повторяется, только если он точно не дошёл до провайдера: ошибка установки соединения или 429.
+    Ошибки возвращаются словарём {"error": ...}, как и раньше.
+    """
+    breaker = get_breaker(api_url)
+    url = f"{api_url or API_URL}{path}"
+    if not breaker.allow():
+        return {"error": "VPS API is not responding, requests are paused", "circuit_open": True}
+    deadline_at = time.monotonic() + (deadline or bot_config.api_deadline)
+    attempt = 0
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(f"{API_URL}/Action", headers=headers, json=json_data) as response:
-                if response.status == 200:
-                    return await response.json()
-                error_text = await response.text()
-                logger.error(f"API error {response.status}: {error_text}")
-                return {"error": f"API error {response.status}: {error_text}"}
-    except Exception as e:
-        logger.error(f"Connection error: {str(e)}")
-        return {"error": f"Connection error: {str(e)}"}
\ No newline at end of file
+        while True:
+            attempt += 1
+            remaining = deadline_at - time.monotonic()
+            sent = True  # мог ли запрос дойти до провайдера
+            status = None
+            try:
+                status, body = await asyncio.wait_for(_attempt(method, url, api_token, json_data),
+                                                      timeout=min(remaining, bot_config.api_attempt_timeout))
+            except aiohttp.ClientConnectorError as e:
+                sent, transient, error = False, True, f"Connection error: {e}"
+            except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+                transient, error = True, f"Connection error: {type(e).__name__} {e}".rstrip()
+            else:
+                if status == 200:
+                    breaker.record_success()
+                    return body
+                transient = status in RETRYABLE_STATUSES
+                sent = status != 429  # 429: запрос отклонён до выполнения
+                error = f"API error {status}: {body}"
+
+            delay = random.uniform(0, min(bot_config.api_backoff_max,
+                                          bot_config.api_backoff_base * 2 ** (attempt - 1)))
+            if (not transient or not (idempotent or not sent) or attempt > bot_config.api_retries
+                    or time.monotonic() + delay >= deadline_at):
+                if transient:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()  # провайдер отвечает, ошибка в самом запросе
+                logger.error(f"{method} {url} failed after {attempt} attempt(s): {error}")
+                return {"error": error}
+            logger.warning(f"{method} {url} attempt {attempt} failed ({error}), retrying in {delay:.2f} seconds")
+            await asyncio.sleep(delay)
+    except BaseException:
+        breaker.abandon()
+        raise
+
+
+async def get_vps_server_status(api_url: str | None = None, api_token: str | None = None):
+    """Статус VPS. Без api_url/api_token используются API_URL и API_TOKEN из окружения"""
+    return await _call("GET", api_url, api_token)
+
+
+async def api_request(action: str, api_url: str | None = None, api_token: str | None = None):
+    """Действие с VPS (PowerOn, ShutDownGuestOS). Повторяется, только если точно не было выполнено"""
+    return await _call("POST", api_url, api_token, "/Action", {"Type": action},
+                       idempotent=False, deadline=bot_config.api_action_deadline)
@@ -0,0 +1,75 @@
+"""Проверка состояния Minecraft сервера"""
+import asyncio
+import logging
+from dataclasses import dataclass
+from enum import Enum
+from mcstatus import JavaServer
+# не входят в публичный API mcstatus, версия закреплена в requirements.txt
+from mcstatus._net.address import Address
+from mcstatus._protocol.io.connection import TCPAsyncSocketConnection
+
+logger = logging.getLogger(__name__)
+
+
+class ProbeError(Enum):
+    REFUSED = "refused"  # порт закрыт, сервер не запущен
+    TIMEOUT = "timeout"  # не уложились в отведённое время
+    UNREACHABLE = "unreachable"  # сетевая ошибка: хост недоступен, соединение сброшено
+    PROTOCOL = "protocol"  # соединение есть, но ответ не похож на Minecraft
+
+
+@dataclass(frozen=True)
+class ProbeResult:
+    online: bool
+    players_online: int | None = None
+    version: str = ""
+    latency_ms: float | None = None
+    error: ProbeError | None = None
+    player_names: tuple[str, ...] | None = None  # полный список, только из Query
+    plugins: str = ""
+    map_name: str = ""
+
+
+class PinnedJavaServer(JavaServer):
+    """Status ping на уже известный IP: соединение идёт на ip, а в handshake уходит имя сервера.
+    По этому имени прокси (forced hosts BungeeCord/Velocity, TCPShield, общий хостинг) выбирают бэкенд,
+    поэтому IP вместо имени дал бы ответ чужого сервера или отказ"""
+
+    def __init__(self, host: str, port: int, ip: str, timeout: float = 3):
+        super().__init__(host, port, timeout)
+        self.connect_address = Address(ip, port)
+
+    async def async_status(self, *, tries: int = 3, version: int = 47, ping_token: int | None = None):
+        async with TCPAsyncSocketConnection(self.connect_address, self.timeout) as connection:
+            return await self._retry_async_status(connection, tries=tries, version=version, ping_token=ping_token)
+
+
+def classify_error(e: BaseException) -> ProbeError:
+    if isinstance(e, ConnectionRefusedError):
+        return ProbeError.REFUSED
+    if isinstance(e, (asyncio.TimeoutError, TimeoutError)):
+        return ProbeError.TIMEOUT
+    if isinstance(e, OSError):
+        return ProbeError.UNREACHABLE
+    return ProbeError.PROTOCOL
+
+
+async def probe_status(host: str, port: int, deadline: float = 6.0, server_name: str | None = None) -> ProbeResult:
+    """Server List Ping через одно TCP соединение: handshake, status request, ответ.
+
+    host — адрес для соединения (обычно IP из кеша резолвера), server_name — имя сервера
+    для handshake (по умолчанию host). deadline ограничивает всю проверку целиком,
+    включая установку соединения.
+    """
+    async def status():
+        server = PinnedJavaServer(server_name or host, port, host, timeout=deadline)
+        return await server.async_status()
+
+    try:
+        response = await asyncio.wait_for(status(), timeout=deadline)
+    except Exception as e:
+        error = classify_error(e)
+        logger.debug("Minecraft probe %s:%s failed (%s): %s: %s", host, port, error.value, type(e).__name__, e)
+        return ProbeResult(online=False, error=error)
+    return ProbeResult(online=True, players_online=response.players.online,
+                       version=response.version.name, latency_ms=response.latency)
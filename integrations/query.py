@@ -0,0 +1,132 @@
+"""Проверка Minecraft сервера по Query протоколу (GS4, UDP): полный список игроков, плагины, карта.
+
+Работает, только если на сервере включено enable-query=true.
+"""
+import asyncio
+import logging
+import random
+import struct
+import time
+import asyncio_dgram
+from integrations.minecraft import ProbeError, ProbeResult, classify_error
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"\xfe\xfd"
+HANDSHAKE = 9
+STAT = 0
+FULL_STAT_PADDING = b"\x00\x00\x00\x00"
+KV_HEADER = b"splitnum\x00\x80\x00"
+PLAYERS_HEADER = b"\x01player_\x00\x00"
+
+
+def parse_full_stat(data: bytes) -> tuple[dict[str, str], list[str]]:
+    """Разбирает ответ full stat (без первых 5 байт типа и session id)"""
+    if not data.startswith(KV_HEADER):
+        raise ValueError("Unexpected full stat header")
+    body = data[len(KV_HEADER):]
+    kv_part, _, players_part = body.partition(PLAYERS_HEADER)
+    # пары key\0value\0, конец списка — пустой ключ
+    fields = kv_part.split(b"\x00")
+    info = {}
+    for i in range(0, len(fields) - 1, 2):
+        key = fields[i].decode("latin-1")
+        if not key:
+            break
+        info[key] = fields[i + 1].decode("utf-8", errors="replace")
+    players = [name.decode("utf-8", errors="replace") for name in players_part.split(b"\x00") if name]
+    return info, players
+
+
+class QueryClient:
+    """Query клиент одного сервера с постоянным UDP сокетом.
+
+    Токен challenge привязан к адресу клиента, поэтому сокет не пересоздаётся между проверками,
+    а токен используется повторно, пока моложе token_ttl (сервер сбрасывает токены каждые 30 секунд).
+    Если Query не ответил, а сервер доступен по SLP, Query не пробуется retry_after секунд.
+    """
+
+    def __init__(self, host: str, port: int, token_ttl: float = 25, retry_after: float = 600):
+        self.host = host
+        self.port = port
+        self.token_ttl = token_ttl
+        self.retry_after = retry_after
+        self.disabled_until = 0.0
+        self._stream = None
+        self._token: int | None = None
+        self._token_time = 0.0
+        self._lock = asyncio.Lock()
+
+    def available(self) -> bool:
+        return time.monotonic() >= self.disabled_until
+
+    def disable(self):
+        self.disabled_until = time.monotonic() + self.retry_after
+        logger.info(f"Query is not answering on {self.host}:{self.port}, "
+                    f"using status ping for {self.retry_after:.0f} seconds")
+
+    async def _exchange(self, packet_type: int, payload: bytes = b"") -> bytes:
+        if self._stream is None:
+            self._stream = await asyncio_dgram.connect((self.host, self.port))
+        session_id = random.getrandbits(32) & 0x0F0F0F0F  # сервер учитывает только младшие 4 бита байтов
+        await self._stream.send(MAGIC + struct.pack(">BI", packet_type, session_id) + payload)
+        while True:
+            data, _ = await self._stream.recv()
+            # ответ на прошлый запрос, не дождавшийся ответа, пропускаем
+            if len(data) >= 5 and data[0] == packet_type and struct.unpack(">I", data[1:5])[0] == session_id:
+                return data[5:]
+
+    async def _handshake(self):
+        data = await self._exchange(HANDSHAKE)
+        self._token = int(data.rstrip(b"\x00"))
+        self._token_time = time.monotonic()
+
+    async def _full_stat(self) -> tuple[dict[str, str], list[str]]:
+        data = await self._exchange(STAT, struct.pack(">i", self._token) + FULL_STAT_PADDING)
+        return parse_full_stat(data)
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+        self._token = None
+
+    async def query(self, deadline: float = 2.0) -> ProbeResult:
+        async def exchange():
+            started = time.perf_counter()
+            if self._token is None or time.monotonic() - self._token_time > self.token_ttl:
+                await self._handshake()
+                result = await self._full_stat()
+            else:
+                try:
+                    result = await asyncio.wait_for(self._full_stat(), timeout=deadline / 2)
+                except asyncio.TimeoutError:
+                    # сервер молча игнорирует запросы с истёкшим токеном — получаем новый
+                    await self._handshake()
+                    result = await self._full_stat()
+            return result, (time.perf_counter() - started) * 1000
+
+        async with self._lock:  # один обмен на сокет одновременно
+            try:
+                (info, players), latency_ms = await asyncio.wait_for(exchange(), timeout=deadline)
+                # разбор ответа внутри try: нечисловой numplayers — тоже ошибка протокола
+                return ProbeResult(online=True, players_online=int(info.get("numplayers", len(players))),
+                                   version=info.get("version", ""), latency_ms=latency_ms,
+                                   player_names=tuple(players), plugins=info.get("plugins", ""),
+                                   map_name=info.get("map", ""))
+            except Exception as e:
+                # сокет с неотвеченным запросом не переиспользуем, токен мог устареть
+                self.close()
+                error = ProbeError.PROTOCOL if isinstance(e, (ValueError, struct.error)) else classify_error(e)
+                logger.debug("Query %s:%s failed (%s): %s: %s", self.host, self.port, error.value, type(e).__name__, e)
+                return ProbeResult(online=False, error=error)
+
+
+_clients: dict[tuple[str, int], QueryClient] = {}
+
+
+def get_query_client(host: str, port: int) -> QueryClient:
+    client = _clients.get((host, port))
+    if client is None:
+        client = _clients[(host, port)] = QueryClient(host, port)
+    return client
@@ -0,0 +1,116 @@
+"""Кеш DNS (A и SRV) для проверок Minecraft сервера с учётом TTL записей"""
+import asyncio
+import ipaddress
+import logging
+import socket
+import time
+from dataclasses import dataclass
+import dns.asyncresolver
+import dns.exception
+import dns.resolver
+from dns.rdatatype import RdataType
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ResolvedAddress:
+    ip: str
+    port: int
+    expires_at: float  # time.monotonic(), после которого запись нужно перезапросить
+
+
+@dataclass
+class ResolverStats:
+    hits: int = 0
+    misses: int = 0
+    resolve_time: float = 0  # суммарное время запросов к DNS, секунд
+
+
+class ResolverCache:
+    """Кеширует результат разрешения адреса сервера на время TTL записи.
+
+    Один и тот же IP используется и для проверки порта, и для status ping.
+    После max_failures неудачных проверок подряд запись сбрасывается досрочно:
+    сервер мог переехать на другой адрес.
+    """
+
+    def __init__(self, min_ttl: float = 30, max_ttl: float = 3600, fallback_ttl: float = 300,
+                 max_failures: int = 3, lifetime: float = 3):
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.fallback_ttl = fallback_ttl  # TTL для ответов системного резолвера, который его не сообщает
+        self.max_failures = max_failures
+        self.lifetime = lifetime
+        self.stats = ResolverStats()
+        self._cache: dict[tuple[str, int, bool], ResolvedAddress] = {}
+        self._failures: dict[tuple[str, int, bool], int] = {}
+
+    def _ttl(self, ttl: float) -> float:
+        return min(self.max_ttl, max(self.min_ttl, ttl))
+
+    async def resolve(self, host: str, port: int, srv: bool = False) -> ResolvedAddress:
+        key = (host, port, srv)
+        cached = self._cache.get(key)
+        if cached is not None and cached.expires_at > time.monotonic():
+            self.stats.hits += 1
+            return cached
+        self.stats.misses += 1
+        start = time.perf_counter()
+        try:
+            resolved = await self._lookup(host, port, srv)
+        finally:
+            self.stats.resolve_time += time.perf_counter() - start
+        self._cache[key] = resolved
+        logger.debug("Resolved %s:%s -> %s:%s, valid for %.0f seconds",
+                     host, port, resolved.ip, resolved.port, resolved.expires_at - time.monotonic())
+        return resolved
+
+    async def _lookup(self, host: str, port: int, srv: bool) -> ResolvedAddress:
+        now = time.monotonic()
+        try:
+            ipaddress.ip_address(host)
+            return ResolvedAddress(host, port, float("inf"))  # IP адрес разрешать не нужно
+        except ValueError:
+            pass
+
+        ttl = self.max_ttl
+        if srv:
+            try:
+                answer = await dns.asyncresolver.resolve(f"_minecraft._tcp.{host}", RdataType.SRV,
+                                                         lifetime=self.lifetime, search=True)
+                record = answer[0]
+                host, port = str(record.target).rstrip("."), int(record.port)  # type: ignore
+                ttl = answer.rrset.ttl if answer.rrset is not None else ttl
+            except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+                pass  # SRV записи нет, используется указанный порт
+
+        try:
+            answer = await dns.asyncresolver.resolve(host, RdataType.A, lifetime=self.lifetime, search=True)
+            ip = str(answer[0]).rstrip(".")
+            ttl = min(ttl, answer.rrset.ttl if answer.rrset is not None else ttl)
+        except dns.exception.DNSException as e:
+            # например, имя из /etc/hosts или нет доступа к DNS серверу — спрашиваем систему
+            logger.debug("DNS lookup for %s failed (%r), falling back to getaddrinfo", host, e)
+            infos = await asyncio.get_running_loop().getaddrinfo(host, port, family=socket.AF_INET,
+                                                                 type=socket.SOCK_STREAM)
+            ip = infos[0][4][0]
+            ttl = self.fallback_ttl
+        return ResolvedAddress(ip, port, now + self._ttl(ttl))
+
+    def report_success(self, host: str, port: int, srv: bool = False):
+        self._failures.pop((host, port, srv), None)
+
+    def report_failure(self, host: str, port: int, srv: bool = False):
+        key = (host, port, srv)
+        self._failures[key] = self._failures.get(key, 0) + 1
+        if self._failures[key] >= self.max_failures and self._cache.pop(key, None) is not None:
+            logger.info(f"{self._failures[key]} failed probes of {host}:{port} in a row, forcing re-resolution")
+            self._failures[key] = 0
+
+    def invalidate(self):
+        self._cache.clear()
+        self._failures.clear()
+
+
+resolver = ResolverCache() # Общий кеш для всех серверов
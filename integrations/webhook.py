@@ -0,0 +1,75 @@
+"""Приём обновлений Telegram через webhook на локальном aiohttp сервере"""
+import asyncio
+import hmac
+import json
+import logging
+from aiohttp import web
+from telegram import Update
+from telegram.ext import Application
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class WebhookServer:
+    """Принимает POST с обновлением, проверяет секретный токен и кладёт обновление в очередь Application.
+    Без секретного токена сервер не создаётся: иначе любой в сети мог бы прислать поддельное обновление
+    от имени администратора.
+
+    Если задан record_file, тело каждого принятого обновления дописывается в него строкой JSON —
+    такой файл можно воспроизвести локально (benchmarks/replay_updates.py).
+    """
+
+    def __init__(self, application: Application, listen: str, port: int, path: str,
+                 secret_token: str, record_file: str | None = None):
+        if not secret_token:
+            raise ValueError("Webhook secret token is required")
+        self.application = application
+        self.listen = listen
+        self.port = port
+        self.path = "/" + path.strip("/")
+        self.secret_token = secret_token
+        self.record_file = record_file
+        self._runner: web.AppRunner | None = None
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        if not hmac.compare_digest(request.headers.get(SECRET_HEADER, ""), self.secret_token):
+            logger.warning(f"Webhook request from {request.remote} with invalid secret token")
+            return web.Response(status=403)
+        try:
+            data = await request.json()
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return web.Response(status=400)
+
+        try:
+            update = Update.de_json(data, self.application.bot)
+        except Exception as e:
+            # корректный JSON, но не обновление Telegram (например, без update_id)
+            logger.warning(f"Webhook request from {request.remote} is not a valid update: {e!r}")
+            return web.Response(status=400)
+        if update is None:
+            return web.Response(status=400)
+        await self.application.update_queue.put(update)
+        if self.record_file:
+            await asyncio.to_thread(self._record, data)
+        return web.Response()
+
+    def _record(self, data: dict):
+        with open(self.record_file, "a", encoding="utf-8") as f:  # type: ignore
+            f.write(json.dumps(data, ensure_ascii=False) + "\n")
+
+    async def start(self) -> int:
+        app = web.Application()
+        app.router.add_post(self.path, self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.listen, self.port).start()
+        self.port = self._runner.addresses[0][1]  # при port=0 — фактически выбранный порт
+        logger.info(f"Webhook server listening on {self.listen}:{self.port}{self.path}")
+        return self.port
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -1,8 +1,21 @@
 import argparse
+import asyncio
+import atexit
 import logging
-from telegram.ext import ApplicationBuilder
+import secrets
+import signal
+from telegram import Update
+from telegram.ext import Application, ApplicationBuilder
 import config.config as config
 from handlers.handlers import register_handlers
+from integrations import api
+from integrations.webhook import WebhookServer
+from services import bot_service, events, logs, persistence, watchdog
+from services.metrics import MetricsServer
+from services.player_stats import player_stats
+from services.update_processor import ChatOrderedUpdateProcessor
+from services.live_status import live_status
+from services.notifications import broadcaster, merger
 
 
 parser = argparse.ArgumentParser()
@@ -11,13 +24,19 @@ parser.add_argument(
     action="store_true",
     help="Enable debug logging"
 )
+parser.add_argument(
+    "--webhook",
+    action="store_true",
+    help="Receive updates via webhook instead of long polling"
+)
 args = parser.parse_args()
 
-# Enable logging
+# Enable logging: запись в stderr идёт в отдельном потоке, цикл событий её не ждёт
 
-logging.basicConfig(
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    level=logging.DEBUG if args.debug else logging.INFO, force=True)
+log_listener = logs.setup_logging(logging.DEBUG if args.debug else logging.INFO,
+                                  json_format=config.bot_config.log_format == "json",
+                                  sample_every=config.bot_config.log_sample_every)
+atexit.register(log_listener.stop)  # дописывает очередь журнала при выходе
 
 # set higher logging level for httpx to avoid all GET and POST requests being logged
 
@@ -30,10 +49,91 @@ logging.getLogger("httpcore").setLevel(logging.WARNING)
 
 logger = logging.getLogger(__name__)
 
+
+state_store = persistence.StateStore(config.bot_config.state_db)
+metrics_server = (MetricsServer(config.bot_config.metrics_listen, config.bot_config.metrics_port)
+                  if config.bot_config.metrics_port is not None else None)
+
+
+async def post_init(application: Application):
+    await api.open_session()
+    bot_service.load_auth_data()
+    persistence.restore_state(application, state_store.load())
+    watchdog.subscribe_consumers(application)
+    player_stats.open(config.bot_config.stats_dir, config.bot_config.stats_sample_interval,
+                      config.bot_config.watchdog_max_interval)
+    persistence.schedule_saving(application, state_store, config.bot_config.state_save_interval)
+    if metrics_server is not None:
+        await metrics_server.start()
+
+
+async def post_shutdown(application: Application):
+    if metrics_server is not None:
+        await metrics_server.stop()
+    await events.bus.close()  # уведомления о последних переходах попадают в очередь рассылки
+    await live_status.close()
+    merger.close()  # накопленные сводки уходят в очередь рассылки до её закрытия
+    await persistence.save_runtime_state(application, state_store)
+    await broadcaster.close()
+    await api.close_session()
+    bot_service.close_auth_data()
+    state_store.close()
+    player_stats.close()
+
+
+async def run_webhook(application: Application):
+    """Webhook режим: обновления принимает локальный aiohttp сервер вместо getUpdates"""
+    cfg = config.bot_config
+    secret = cfg.webhook_secret
+    if not secret:
+        if not cfg.webhook_url:
+            # webhook зарегистрирован вне бота: без общего секрета нельзя отличить Telegram от подделки
+            raise RuntimeError("WEBHOOK_SECRET is required when WEBHOOK_URL is not configured")
+        secret = secrets.token_urlsafe(32)  # бот сам регистрирует webhook и передаёт Telegram этот токен
+        logger.info("WEBHOOK_SECRET is not configured, using a random secret token")
+    server = WebhookServer(application, cfg.webhook_listen, cfg.webhook_port, cfg.webhook_path,
+                           secret_token=secret, record_file=cfg.webhook_record_file)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    await application.initialize()
+    await post_init(application)
+    await application.start()
+    await server.start()
+    try:
+        if cfg.webhook_url:
+            await application.bot.set_webhook(url=f"{cfg.webhook_url.rstrip('/')}/{cfg.webhook_path.strip('/')}",
+                                              secret_token=secret,
+                                              allowed_updates=Update.ALL_TYPES)
+            logger.info("Webhook registered in Telegram")
+        else:
+            logger.warning("WEBHOOK_URL is not configured, webhook is not registered in Telegram")
+        await stop.wait()
+    finally:
+        await server.stop()
+        await application.stop()
+        await application.shutdown()
+        await post_shutdown(application)
+
+
 if __name__ == "__main__":
     if not config.bot_config.telegram_token:
         raise RuntimeError("TELEGRAM_TOKEN is not configured")
-    application = ApplicationBuilder().token(config.bot_config.telegram_token).build()
-    register_handlers(application)
-    application.run_polling(poll_interval=1, timeout=30)
-    #application.run_polling()
+    builder = (
+        ApplicationBuilder()
+        .token(config.bot_config.telegram_token)
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .concurrent_updates(ChatOrderedUpdateProcessor(config.bot_config.concurrent_updates))
+    )
+    if args.webhook:
+        application = builder.updater(None).build()
+        register_handlers(application)
+        asyncio.run(run_webhook(application))
+    else:
+        application = builder.build()
+        register_handlers(application)
+        application.run_polling(poll_interval=1, timeout=30)
+        #application.run_polling()
@@ -0,0 +1,64 @@
+"""Хранилище списков авторизованных пользователей и групп в SQLite"""
+import json
+import logging
+import os
+from services.sqlite_store import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (id INTEGER PRIMARY KEY, username TEXT NOT NULL DEFAULT '');
+CREATE TABLE IF NOT EXISTS groups (id INTEGER PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+
+class AuthStore(SQLiteStore):
+    """Каждое изменение списков — отдельная транзакция, без перезаписи всего файла"""
+
+    schema = SCHEMA
+
+    def import_json(self, json_path: str) -> bool:
+        """Однократно переносит данные из старого authorized.json. Возвращает True, если импорт был"""
+        if self._conn.execute("SELECT 1 FROM meta WHERE key = 'json_imported'").fetchone():
+            return False
+        if not os.path.exists(json_path):
+            return False
+        try:
+            with open(json_path, "r") as f:
+                data = json.load(f)
+            users = [(int(user["id"]), user.get("username", "")) for user in data.get("users", [])]
+            groups = [(int(group_id),) for group_id in data.get("groups", [])]
+        except (json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+            logger.error(f"Cannot import {json_path}: {e!r}. Fix the file and restart the bot.")
+            return False
+        with self._transaction():
+            self._conn.executemany("INSERT OR REPLACE INTO users (id, username) VALUES (?, ?)", users)
+            self._conn.executemany("INSERT OR IGNORE INTO groups (id) VALUES (?)", groups)
+            self._conn.execute("INSERT INTO meta (key, value) VALUES ('json_imported', ?)", (json_path,))
+        logger.info(f"Imported {len(users)} users and {len(groups)} groups from {json_path}")
+        return True
+
+    def load(self) -> tuple[dict[int, str], set[int]]:
+        users = {uid: name for uid, name in self._conn.execute("SELECT id, username FROM users")}
+        groups = {gid for (gid,) in self._conn.execute("SELECT id FROM groups")}
+        return users, groups
+
+    def _write(self, sql: str, params: tuple):
+        with self._transaction():
+            self._conn.execute(sql, params)
+
+    async def _run(self, sql: str, *params):
+        await self._in_writer(self._write, sql, params)
+
+    async def add_user(self, user_id: int, username: str = ""):
+        await self._run("INSERT OR REPLACE INTO users (id, username) VALUES (?, ?)", user_id, username)
+
+    async def remove_user(self, user_id: int):
+        await self._run("DELETE FROM users WHERE id = ?", user_id)
+
+    async def add_group(self, group_id: int):
+        await self._run("INSERT OR IGNORE INTO groups (id) VALUES (?)", group_id)
+
+    async def remove_group(self, group_id: int):
+        await self._run("DELETE FROM groups WHERE id = ?", group_id)
@@ -0,0 +1,105 @@
+"""Отслеживание загрузки VPS после PowerOn.
+
+Пока провайдер не сообщил, что VPS запущен, watchdog опрашивает только API провайдера
+с растущим интервалом и не тратит время на проверки Minecraft, которые всё равно не ответят.
+Ожидаемое время готовности считается по медиане прошлых загрузок (от PowerOn до доступности Minecraft).
+"""
+import logging
+import statistics
+import time
+from config.config import bot_config
+from services import metrics, vps_service
+from state.servers import ManagedServer
+from state.vps_state import VPSState
+
+logger = logging.getLogger(__name__)
+
+BOOT_HISTORY_SIZE = 10  # сколько последних загрузок учитывается в оценке
+# состояния VPS, в которых IsPowerOn уже true, но система ещё загружается
+VPS_BUSY_STATES = frozenset({"InProgress", "Pending", "Starting"})
+
+
+def is_booting(vps: VPSState) -> bool:
+    """PowerOn отправлен, а провайдер ещё не сообщил, что VPS запущен"""
+    return bool(vps.boot_started) and not vps.boot_vps_ready
+
+
+def is_vps_running(status: dict) -> bool:
+    return status.get("IsPowerOn") is True and status.get("State") not in VPS_BUSY_STATES
+
+
+def expected_boot_time(vps: VPSState) -> float | None:
+    """Сколько секунд от PowerOn до доступности Minecraft занимает загрузка обычно"""
+    if not vps.boot_durations:
+        return None
+    return statistics.median(vps.boot_durations)
+
+
+def eta(vps: VPSState, now: float | None = None) -> float | None:
+    """Сколько секунд осталось до доступности Minecraft, если загрузка отслеживается и есть история"""
+    expected = expected_boot_time(vps)
+    if not vps.boot_started or expected is None:
+        return None
+    now = time.time() if now is None else now
+    return max(expected - (now - vps.boot_started), 0)
+
+
+def format_eta(seconds: float) -> str:
+    if seconds < 60:
+        return f"{seconds:.0f} сек."
+    return f"{seconds / 60:.0f} мин."
+
+
+def poll_interval(polls: int) -> float:
+    """Интервал между запросами статуса во время загрузки: удваивается до boot_poll_max_interval"""
+    low = bot_config.watchdog_min_interval
+    return min(low * 2 ** polls, max(bot_config.boot_poll_max_interval, low))
+
+
+async def poll(server: ManagedServer) -> bool:
+    """Один опрос провайдера во время загрузки. Возвращает True, если VPS ещё загружается
+    и проверять Minecraft рано"""
+    vps, state = server.vps, server.watchdog
+    now = time.time()
+    status = await vps_service.get_vps_status(max_age=0, allow_stale=False, server=server)
+    if "error" in status:
+        logger.warning(f"Boot tracker: status of VPS {server.name} is unavailable: {status['error']}")
+    elif is_vps_running(status):
+        vps.boot_vps_ready = now
+        state.boot_polls = 0
+        elapsed = now - vps.boot_started
+        metrics.boot_duration.observe(elapsed, server.name, "vps")
+        logger.info(f"Boot tracker: VPS {server.name} is running {elapsed:.0f} seconds after PowerOn")
+        return False  # уведомление отправляет watchdog при переходе BOOTING -> MC_STARTING
+
+    if now - vps.boot_started > bot_config.boot_timeout:
+        # провайдер так и не сообщил о запуске — дальше решают обычные проверки Minecraft
+        logger.warning(f"Boot tracker: VPS {server.name} did not report running in "
+                       f"{bot_config.boot_timeout:.0f} seconds, giving up")
+        reset(vps)
+        return False
+
+    state.interval = poll_interval(state.boot_polls)
+    state.boot_polls += 1
+    state.next_check = time.monotonic() + state.interval
+    logger.debug("Boot tracker: VPS %s is still booting (State=%s), next status check in %.0f seconds",
+                 server.name, status.get("State"), state.interval)
+    return True
+
+
+def minecraft_ready(server: ManagedServer, now: float | None = None):
+    """Minecraft ответил после PowerOn: длительность загрузки сохраняется для следующих оценок"""
+    vps = server.vps
+    if not vps.boot_started:
+        return
+    now = time.time() if now is None else now
+    duration = now - vps.boot_started
+    vps.boot_durations = (vps.boot_durations + [round(duration, 1)])[-BOOT_HISTORY_SIZE:]
+    metrics.boot_duration.observe(duration, server.name, "minecraft")
+    logger.info(f"Boot tracker: Minecraft server {server.name} is available {duration:.0f} seconds after PowerOn")
+    reset(vps)
+
+
+def reset(vps: VPSState):
+    vps.boot_started = 0
+    vps.boot_vps_ready = 0
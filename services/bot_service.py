@@ -1,11 +1,13 @@
+import time
 from functools import wraps
 from telegram.ext import ContextTypes, Application
 from config.config import bot_config
-import json
 import logging
 from telegram import Update
-from services import vps_service, watchdog
-from state import minecraft_server, bot_state as tg_bot_state
+from services import events, lifecycle, metrics, vps_service, watchdog
+from services.auth_store import AuthStore
+from state.servers import ManagedServer, servers
+from state.watchdog_state import Phase
 
 logger = logging.getLogger(__name__)
 
@@ -14,38 +16,62 @@ def log_command(command_name):
     def decorator(func):
         @wraps(func)
         async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE, *args, **kwargs):
-            logger.info(f"{get_user_name(update)} sent COMMAND {command_name}")
-            return await func(update, context, *args, **kwargs)
+            user = get_user_name(update)
+            fields = {"chat_id": update.effective_chat.id if update.effective_chat else None,
+                      "user": user, "command": command_name}
+            logger.info("%s sent COMMAND %s", user, command_name, extra=fields)
+            started = time.perf_counter()
+            try:
+                return await func(update, context, *args, **kwargs)
+            finally:
+                duration = time.perf_counter() - started
+                metrics.handler_duration.observe(duration, command_name)
+                logger.debug("COMMAND %s handled in %.1f ms", command_name, duration * 1000,
+                             extra={**fields, "latency_ms": round(duration * 1000, 1)})
 
         return wrapper
 
     return decorator
 
 
-def load_auth_data():
-    try:
-        with open(bot_config.authorized_file, "r") as f:
-            data = json.load(f)
-            # Преобразуем список пользователей в словарь с int ключами
-            users = {int(user["id"]): user.get("username", "")
-                     for user in data.get("users", [])}
-            return users, set(data.get("groups", []))
-    except (FileNotFoundError, json.JSONDecodeError):
-        logger.warning("Authorization file not found or corrupted. Using empty sets.")
-        return {}, set()
+auth_store: AuthStore | None = None  # открывается в post_init, а не при импорте модуля
+authorized_users: dict[int, str] = {}
+authorized_groups: set[int] = set()
 
 
-def save_auth_data():
-    data = {
-        "users": [{"id": uid, "username": name}
-                  for uid, name in authorized_users.items()],
-        "groups": list(authorized_groups)
-    }
-    with open(bot_config.authorized_file, "w") as f:
-        json.dump(data, f, indent=2)
+def load_auth_data(db_path: str = bot_config.authorized_db, json_path: str = bot_config.authorized_file):
+    """Открывает хранилище авторизованных чатов и загружает списки"""
+    global auth_store, authorized_users, authorized_groups
+    auth_store = AuthStore(db_path)
+    auth_store.import_json(json_path)
+    authorized_users, authorized_groups = auth_store.load()
 
 
-authorized_users, authorized_groups = load_auth_data()
+def close_auth_data():
+    global auth_store
+    if auth_store is not None:
+        auth_store.close()
+        auth_store = None
+
+
+async def add_authorized_user(user_id: int, username: str = ""):
+    await auth_store.add_user(user_id, username)
+    authorized_users[user_id] = username
+
+
+async def remove_authorized_user(user_id: int):
+    await auth_store.remove_user(user_id)
+    authorized_users.pop(user_id, None)
+
+
+async def add_authorized_group(group_id: int):
+    await auth_store.add_group(group_id)
+    authorized_groups.add(group_id)
+
+
+async def remove_authorized_group(group_id: int):
+    await auth_store.remove_group(group_id)
+    authorized_groups.discard(group_id)
 
 
 def is_authorized(chat_id: int) -> bool:
@@ -70,26 +96,33 @@ async def log_all(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_name = get_user_name(update)
     message = update.message
     if message:
-        logger.info(f"[{user_name}] написал: {message.text or '[нет текста]'}")
+        # обычные сообщения — самый частый путь, в журнал попадает их выборка
+        logger.info("[%s] написал: %s", user_name, message.text or "[нет текста]",
+                    extra={"chat_id": message.chat_id, "user": user_name, "sample": "chat_message"})
 
 
 def reset_chat_state(application: Application):
     """Сбрасывает статус muted для всех чатов"""
     for chat_id, chat_data in application.chat_data.items():
         if chat_data.pop("muted", None) is not None:
-            logger.debug(f"Successfully reset muted state for chat {chat_id}")
+            logger.debug("Successfully reset muted state for chat %s", chat_id)
 
 
-async def shutdown_all(application: Application):
+async def shutdown_all(application: Application, server: ManagedServer | None = None):
     """Полное выключение: VPS + watchdog + сброс состояния"""
-    result = await vps_service.shutdown_vps()
+    server = server or servers.default()
+    result = await vps_service.shutdown_vps(server)
     if "error" in result:
-        logger.error(f"Failed to shutdown VPS: {result['error']}")
+        logger.error(f"Failed to shutdown VPS {server.name}: {result['error']}")
         return result
-    watchdog.watchdog_stop()
-    watchdog.reset_watchdog_state()
-    minecraft_server.mc_server.reset_runtime()
-    tg_bot_state.bot_state.active_chats.clear()
+    event = lifecycle.transition(server, Phase.VPS_OFF)
+    watchdog.watchdog_stop(server)
+    watchdog.reset_watchdog_state(server)
+    server.watchdog.phase = Phase.VPS_OFF
+    server.mc.reset_runtime()
+    server.active_chats.clear()
     reset_chat_state(application)
-    logger.info("VPS and watchdog shutdown initiated successfully")
+    if event is not None:
+        events.bus.publish(event)
+    logger.info(f"VPS {server.name} and watchdog shutdown initiated successfully")
     return result
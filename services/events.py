@@ -0,0 +1,118 @@
+"""Шина событий внутри процесса: watchdog публикует события, потребители (уведомления, метрики,
+сохранение состояния) подписываются на нужные типы"""
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+from state.servers import ManagedServer
+from state.watchdog_state import Phase
+
+logger = logging.getLogger(__name__)
+
+
+def _capture_chats(event):
+    # подписчики работают позже публикации: к этому моменту shutdown_all уже очистит active_chats
+    if event.chats is None:
+        object.__setattr__(event, "chats", frozenset(event.server.active_chats))
+
+
+@dataclass(frozen=True)
+class PhaseChanged:
+    """Сервер перешёл в другое состояние жизненного цикла"""
+    server: ManagedServer
+    previous: Phase
+    phase: Phase
+    message: str | None = None  # уведомление для подписанных чатов, если переход о нём сообщает
+    chats: frozenset[int] | None = None  # получатели; по умолчанию — подписанные чаты на момент события
+    at: float = field(default_factory=time.time)
+
+    def __post_init__(self):
+        _capture_chats(self)
+
+
+@dataclass(frozen=True)
+class ServerNotice:
+    """Уведомление без смены состояния (например, предупреждение перед автовыключением)"""
+    server: ManagedServer
+    message: str
+    chats: frozenset[int] | None = None
+    at: float = field(default_factory=time.time)
+
+    def __post_init__(self):
+        _capture_chats(self)
+
+
+@dataclass(frozen=True)
+class StatusUpdated:
+    """Watchdog закончил проверку сервера и опубликовал новый снимок состояния"""
+    server: ManagedServer
+    at: float = field(default_factory=time.time)
+
+
+Handler = Callable[[object], Awaitable[None]]
+
+
+class EventBus:
+    """publish() только ставит событие в очередь: подписчики вызываются по порядку в отдельной
+    задаче, поэтому новый потребитель не замедляет тик watchdog'а. События без подписчиков
+    не ставятся в очередь вовсе. Ошибка подписчика не мешает остальным."""
+
+    def __init__(self, max_pending: int = 1000):
+        self.max_pending = max_pending
+        self._subscribers: dict[type, list[Handler]] = defaultdict(list)
+        self._queue: asyncio.Queue | None = None
+        self._worker: asyncio.Task | None = None
+
+    def subscribe(self, event_type: type, handler: Handler):
+        self._subscribers[event_type].append(handler)
+
+    def unsubscribe(self, event_type: type, handler: Handler):
+        handlers = self._subscribers.get(event_type, [])
+        if handler in handlers:
+            handlers.remove(handler)
+
+    def publish(self, event: object):
+        if not self._subscribers.get(type(event)):
+            return
+        if self._worker is None or self._worker.done() or self._worker.get_loop() is not asyncio.get_running_loop():
+            # очередь привязана к циклу событий: в новом цикле (перезапуск, тесты) создаётся заново
+            self._queue = asyncio.Queue(self.max_pending)
+            self._worker = asyncio.create_task(self._run())
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            logger.warning(f"Event queue is full, dropping {type(event).__name__}")
+
+    async def _run(self):
+        while True:
+            event = await self._queue.get()  # type: ignore
+            try:
+                for handler in list(self._subscribers.get(type(event), [])):
+                    try:
+                        await handler(event)
+                    except Exception as e:
+                        logger.exception(f"Event handler {getattr(handler, '__name__', handler)} "
+                                         f"failed on {type(event).__name__}: {e}")
+            finally:
+                self._queue.task_done()  # type: ignore
+
+    async def drain(self):
+        """Дожидается обработки всех опубликованных событий"""
+        if self._queue is not None and self._worker is not None and not self._worker.done():
+            await self._queue.join()
+
+    async def close(self, timeout: float = 10):
+        if self._worker is None:
+            return
+        try:
+            await asyncio.wait_for(self.drain(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Pending events dropped on shutdown")
+        self._worker.cancel()
+        self._worker = None
+        self._queue = None
+
+
+bus = EventBus()
@@ -0,0 +1,146 @@
+"""Жизненный цикл сервера: определение состояния по результату проверки, таблица уведомлений
+о переходах и действия при входе в состояние. Watchdog вызывает transition() на каждом тике,
+но событие PhaseChanged появляется только при смене состояния."""
+import logging
+from config.config import bot_config
+from services import boot_tracker
+from services.events import PhaseChanged
+from state.servers import ManagedServer
+from state.watchdog_state import Phase, WatchdogState
+
+logger = logging.getLogger(__name__)
+
+ONLINE = frozenset({Phase.ONLINE_ACTIVE, Phase.ONLINE_IDLE})
+ANY = None  # любое исходное состояние в таблице переходов
+
+
+def _available(server: ManagedServer) -> str:
+    return f"✅ Minecraft сервер доступен для подключения.\nВерсия сервера: {server.mc.version_number}"
+
+
+def _remaining(server: ManagedServer) -> str:
+    remaining = boot_tracker.eta(server.vps)
+    return f", осталось примерно {boot_tracker.format_eta(remaining)}" if remaining else "..."
+
+
+def _starting(server: ManagedServer) -> str:
+    return "⏳ Minecraft сервер запускается" + _remaining(server)
+
+
+def _vps_started(server: ManagedServer) -> str:
+    return "🖥 VPS запущен, Minecraft сервер запускается" + _remaining(server)
+
+
+def _crashed(server: ManagedServer) -> str:
+    return "⚠️ Minecraft сервер временно недоступен или аварийно завершил работу."
+
+
+def _idle_shutdown(server: ManagedServer) -> str:
+    return f"🔴 Сервер выключен после {server.mc.wd_poweroff_cooldown // 60} минут неактивности."
+
+
+# (из, в) -> текст уведомления подписанным чатам. Запись с конкретным исходным состоянием
+# важнее записи с ANY; None — переход без уведомления. Переходы без записи тоже происходят молча
+NOTIFICATIONS = {
+    (ANY, Phase.ONLINE_ACTIVE): _available,
+    (ANY, Phase.ONLINE_IDLE): _available,
+    (Phase.ONLINE_IDLE, Phase.ONLINE_ACTIVE): None,
+    (Phase.ONLINE_ACTIVE, Phase.ONLINE_IDLE): None,
+    (Phase.VPS_OFF, Phase.MC_STARTING): _starting,
+    (Phase.BOOTING, Phase.MC_STARTING): _vps_started,
+    (ANY, Phase.CRASHED): _crashed,
+    (Phase.ONLINE_IDLE, Phase.SHUTTING_DOWN): _idle_shutdown,
+}
+
+
+def _enter_online(server: ManagedServer, previous: Phase):
+    if previous not in ONLINE:
+        server.watchdog.is_fresh_start = False
+        boot_tracker.minecraft_ready(server)
+
+
+def _enter_crashed(server: ManagedServer, previous: Phase):
+    server.watchdog.warning_3m_sent = False
+    server.watchdog.is_fresh_start = True  # для уведомления о доступности после восстановления
+    server.mc.shutdown_remaining = None
+
+
+def _enter_vps_off(server: ManagedServer, previous: Phase):
+    state = server.watchdog
+    state.empty_since = None
+    state.warning_3m_sent = False
+    state.is_fresh_start = True  # следующий запуск будет новым
+    server.mc.shutdown_remaining = None
+
+
+ON_ENTER = {
+    Phase.ONLINE_ACTIVE: _enter_online,
+    Phase.ONLINE_IDLE: _enter_online,
+    Phase.CRASHED: _enter_crashed,
+    Phase.VPS_OFF: _enter_vps_off,
+}
+
+
+def infer_phase(state: WatchdogState) -> Phase:
+    """Состояние по флагам watchdog'а, если фаза не сохранена (состояние прежних версий)"""
+    if not state.is_fresh_start:
+        return Phase.ONLINE_IDLE if state.empty_since is not None else Phase.ONLINE_ACTIVE
+    return Phase.MC_STARTING if state.crashed else Phase.VPS_OFF
+
+
+def current_phase(state: WatchdogState) -> Phase:
+    return Phase(state.phase) if state.phase is not None else infer_phase(state)
+
+
+def _record_probe(state: WatchdogState, online: bool) -> tuple[bool, ...]:
+    probes = tuple(state.recent_probes)
+    if not probes and state.crashed:
+        # состояние прежних версий: известны только подряд идущие неудачные проверки
+        probes = (False,) * min(state.crashed, bot_config.flap_window)
+    state.recent_probes = (probes + (online,))[-bot_config.flap_window:]
+    return state.recent_probes
+
+
+def observe(server: ManagedServer, players: int | None) -> Phase:
+    """Записывает результат только что выполненной проверки Minecraft в окно последних
+    flap_window проверок и возвращает состояние по нему.
+
+    Работавший сервер считается упавшим, когда не ответил на flap_down_threshold проверок
+    из окна, упавший — восстановившимся, когда ответил на flap_up_threshold. Порог
+    восстановления выше, поэтому сервер, который то отвечает, то нет, остаётся в CRASHED
+    и не порождает поток уведомлений «недоступен» / «доступен».
+    """
+    state = server.watchdog
+    previous = current_phase(state)
+    online = server.mc.online
+    probes = _record_probe(state, online)
+    online_phase = Phase.ONLINE_IDLE if players == 0 else Phase.ONLINE_ACTIVE
+    if previous in ONLINE:
+        if online:
+            return online_phase
+        return Phase.CRASHED if probes.count(False) >= bot_config.flap_down_threshold else previous
+    if previous == Phase.CRASHED:
+        return online_phase if online and probes.count(True) >= bot_config.flap_up_threshold else previous
+    return online_phase if online else Phase.MC_STARTING
+
+
+def _notification(previous: Phase, phase: Phase):
+    if (previous, phase) in NOTIFICATIONS:
+        return NOTIFICATIONS[(previous, phase)]
+    return NOTIFICATIONS.get((ANY, phase))
+
+
+def transition(server: ManagedServer, phase: Phase) -> PhaseChanged | None:
+    """Переводит сервер в состояние phase. Возвращает событие, если состояние изменилось"""
+    state = server.watchdog
+    previous = current_phase(state)
+    state.phase = phase
+    if phase == previous:
+        return None
+    render = _notification(previous, phase)
+    message = render(server) if render is not None else None
+    on_enter = ON_ENTER.get(phase)
+    if on_enter is not None:
+        on_enter(server, previous)
+    logger.info(f"Server {server.name}: {previous.value} -> {phase.value}")
+    return PhaseChanged(server=server, previous=previous, phase=phase, message=message)
@@ -0,0 +1,228 @@
+"""Живой статус: одно закреплённое сообщение на сервер в каждом подписанном чате.
+
+Вместо новых уведомлений watchdog'а сообщение редактируется через edit_message_text, а /status
+обновляет это же сообщение вместо нового ответа. Смена состояния показывается через
+live_status_delay секунд, прочие изменения — не чаще раза в live_status_min_interval; всё, что
+случилось за это время, попадает в одно обновление. Число игроков в сообщении обновляется только
+при смене состояния и по /status, поэтому обычные тики не вызывают правок. Запрос к Telegram
+отправляется, только если отрисованный текст отличается от уже показанного в чате.
+"""
+import asyncio
+import logging
+import time
+from telegram import Bot
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter
+from telegram.ext import Application
+from config.config import bot_config
+from services import boot_tracker, events, lifecycle, metrics
+from services.events import PhaseChanged, ServerNotice, StatusUpdated
+from services.notifications import broadcaster
+from state.servers import ManagedServer, servers
+from state.watchdog_state import Phase
+
+logger = logging.getLogger(__name__)
+
+# эти переходы требуют внимания, поэтому и в режиме живого статуса приходят отдельным сообщением
+ALERT_PHASES = frozenset({Phase.CRASHED})
+
+
+def _clock(timestamp: float) -> str:
+    return time.strftime("%H:%M", time.localtime(timestamp))
+
+
+def render(server: ManagedServer, players: int | None = None) -> str:
+    """Текст живого статуса по текущему состоянию сервера. Время указывается часами (к 14:20),
+    а не обратным отсчётом, а число игроков players — на момент последнего обновления чата:
+    текст не меняется на каждом тике"""
+    phase = lifecycle.current_phase(server.watchdog)
+    title = f"📌 Статус сервера {server.name}" if servers.is_fleet() else "📌 Статус сервера"
+    lines = [title]
+    if phase == Phase.ONLINE_ACTIVE:
+        lines.append(f"🟢 Сервер включен, на сервере {players} игрок(ов)." if players
+                     else "🟢 Сервер включен, на сервере есть игроки.")
+        lines.append("Обновить — /status")
+    elif phase == Phase.ONLINE_IDLE:
+        lines.append("🟢 Сервер включен, на сервере никого нет.")
+        empty_since = server.watchdog.empty_since
+        if empty_since is not None:
+            lines.append(f"⏳ Автовыключение в {_clock(empty_since + server.mc.wd_poweroff_cooldown)}, "
+                         f"если никто не зайдёт.")
+    elif phase in (Phase.BOOTING, Phase.MC_STARTING):
+        lines.append("🟠 VPS загружается." if phase == Phase.BOOTING else "🟡 Minecraft сервер запускается.")
+        expected = boot_tracker.expected_boot_time(server.vps)
+        if expected is not None and server.vps.boot_started:
+            lines.append(f"⏱ Будет готов примерно к {_clock(server.vps.boot_started + expected)}")
+    elif phase == Phase.CRASHED:
+        lines.append("⚠️ Minecraft сервер временно недоступен или аварийно завершил работу.")
+    elif phase == Phase.SHUTTING_DOWN:
+        lines.append("🔴 Сервер выключается...")
+    else:
+        lines.append("🔴 Сервер выключен.")
+    return "\n".join(lines)
+
+
+def replaces(event: PhaseChanged | ServerNotice) -> bool:
+    """Заменяет ли живой статус отдельное уведомление об этом событии"""
+    return bot_config.live_status and not (isinstance(event, PhaseChanged) and event.phase in ALERT_PHASES)
+
+
+class LiveStatus:
+    """Хранит сообщения живого статуса и обновляет их. message_id сохраняются между
+    перезапусками (см. persistence), после перезапуска редактируются те же сообщения"""
+
+    def __init__(self, delay: float, min_interval: float = 0, max_retries: int = 3):
+        self.delay = delay
+        self.min_interval = min_interval
+        self.max_retries = max_retries
+        self.messages: dict[tuple[str, int], int] = {}  # (сервер, чат) -> message_id
+        self._shown: dict[tuple[str, int], str] = {}  # последний показанный в чате текст
+        self._phases: dict[tuple[str, int], Phase] = {}  # состояние в показанном тексте
+        self._players: dict[tuple[str, int], int | None] = {}  # число игроков в показанном тексте
+        self._refresh_players: set[str] = set()  # серверы, в обновлении которых сменилось состояние
+        self._pending: dict[str, set[int]] = {}  # сервер -> чаты, которые нужно обновить
+        self._flushes: dict[str, asyncio.Task] = {}
+        self._due: dict[str, float] = {}  # time.monotonic() запланированного обновления
+        self._flushed_at: dict[str, float] = {}
+        self._bot: Bot | None = None
+
+    def attach(self, application: Application):
+        self._bot = application.bot
+        events.bus.subscribe(PhaseChanged, self._on_event)
+        events.bus.subscribe(StatusUpdated, self._on_event)
+
+    async def _on_event(self, event: PhaseChanged | StatusUpdated):
+        # после выключения active_chats уже пуст: последнее состояние получают чаты из события
+        self.schedule(event.server, getattr(event, "chats", None) or (), urgent=isinstance(event, PhaseChanged))
+
+    def schedule(self, server: ManagedServer, chats=(), urgent: bool = False):
+        """Отмечает, что статус сервера мог измениться. Смена состояния (urgent) показывается
+        через delay секунд, остальное — не раньше min_interval после прошлого обновления.
+        Все отметки до обновления объединяются в одно"""
+        self._pending.setdefault(server.name, set()).update(chats)
+        if urgent:
+            self._refresh_players.add(server.name)
+        now = time.monotonic()
+        due = now + self.delay
+        if not urgent:
+            due = max(due, self._flushed_at.get(server.name, 0) + self.min_interval)
+        current = self._due.get(server.name)
+        if current is not None and current <= due:
+            return
+        task = self._flushes.pop(server.name, None)
+        if task is not None:
+            task.cancel()  # смена состояния не ждёт отложенного обновления
+        self._due[server.name] = due
+        self._flushes[server.name] = asyncio.create_task(self._flush_later(server, due - now))
+
+    async def _flush_later(self, server: ManagedServer, delay: float):
+        await asyncio.sleep(delay)
+        self._flushes.pop(server.name, None)
+        self._due.pop(server.name, None)
+        self._flushed_at[server.name] = time.monotonic()
+        chats = self._pending.pop(server.name, set()) | server.active_chats
+        players = server.name in self._refresh_players
+        self._refresh_players.discard(server.name)
+        try:
+            await self.flush(self._bot, server, chats, players)
+        except Exception as e:
+            logger.exception(f"Live status update for {server.name} failed: {e}")
+
+    async def flush(self, bot: Bot, server: ManagedServer, chats: set[int], players: bool = False):
+        """Обновляет сообщения в chats. players — показать текущее число игроков (смена состояния)"""
+        phase = lifecycle.current_phase(server.watchdog)
+        count = server.mc.snapshot.players_online if phase == Phase.ONLINE_ACTIVE else None
+
+        async def update(chat_id: int):
+            key = (server.name, chat_id)
+            if players:
+                self._players[key] = count
+            await self._update(bot, server, chat_id, render(server, self._players.get(key)), phase)
+
+        await asyncio.gather(*(update(chat_id) for chat_id in chats))
+
+    async def refresh(self, bot: Bot, server: ManagedServer, chat_id: int) -> bool:
+        """/status в режиме живого статуса: обновляет сообщение чата вместо нового ответа.
+        Возвращает False, если в чате ещё нет сообщения живого статуса этого сервера"""
+        if (server.name, chat_id) not in self.messages:
+            return False
+        await self.flush(bot, server, {chat_id}, players=True)
+        return True
+
+    def shows(self, server_name: str, chat_id: int, phase: Phase) -> bool:
+        """Показывает ли сообщение чата состояние phase"""
+        return self._phases.get((server_name, chat_id)) == phase
+
+    async def _update(self, bot: Bot, server: ManagedServer, chat_id: int, text: str, phase: Phase | None = None):
+        key = (server.name, chat_id)
+        if self._shown.get(key) == text:
+            metrics.live_status_updates.inc("unchanged")
+            return
+        for attempt in range(self.max_retries + 1):
+            await broadcaster.acquire(chat_id)
+            try:
+                message_id = self.messages.get(key)
+                if message_id is None:
+                    message = await bot.send_message(chat_id=chat_id, text=text, disable_notification=True)
+                    self.messages[key] = message.message_id
+                    await self._pin(bot, chat_id, message.message_id)
+                    metrics.live_status_updates.inc("sent")
+                else:
+                    await bot.edit_message_text(text=text, chat_id=chat_id, message_id=message_id)
+                    metrics.live_status_updates.inc("edited")
+                self._shown[key], self._phases[key] = text, phase
+                return
+            except RetryAfter as e:
+                delay = broadcaster.flood_control(e.retry_after)
+                logger.warning(f"Flood control while updating live status in {chat_id}, "
+                               f"retrying in {delay} seconds")
+            except Forbidden as e:
+                logger.info(f"Chat {chat_id} blocked the bot, removing from notifications: {e}")
+                server.active_chats.discard(chat_id)
+                self.forget(server.name, chat_id)
+                return
+            except BadRequest as e:
+                error = str(e).lower()
+                if "not modified" in error:
+                    self._shown[key], self._phases[key] = text, phase
+                    return
+                if "message to edit not found" in error or "can't be edited" in error:
+                    # сообщение удалили из чата: на следующей попытке будет отправлено новое
+                    logger.info(f"Live status message in {chat_id} is gone, sending a new one")
+                    self.forget(server.name, chat_id)
+                    continue
+                logger.warning(f"Failed to update live status in {chat_id}: {e}")
+                return
+            except NetworkError as e:
+                logger.debug("Network error while updating live status in %s (attempt %d): %s", chat_id, attempt + 1, e)
+                await asyncio.sleep(2 ** attempt)
+        logger.warning(f"Failed to update live status in {chat_id}: retries exhausted")
+
+    @staticmethod
+    async def _pin(bot: Bot, chat_id: int, message_id: int):
+        try:
+            await bot.pin_chat_message(chat_id=chat_id, message_id=message_id, disable_notification=True)
+        except (BadRequest, Forbidden) as e:
+            # в группе без прав администратора сообщение просто остаётся незакреплённым
+            logger.debug("Could not pin live status message in %s: %s", chat_id, e)
+
+    def forget(self, server_name: str, chat_id: int):
+        for known in (self.messages, self._shown, self._phases, self._players):
+            known.pop((server_name, chat_id), None)
+
+    def dump(self) -> list[list]:
+        return sorted([name, chat_id, message_id] for (name, chat_id), message_id in self.messages.items())
+
+    def load(self, saved: list[list]):
+        self.messages = {(name, chat_id): message_id for name, chat_id, message_id in saved}
+
+    async def close(self):
+        """Отменяет отложенные обновления: сообщения обновятся после следующего запуска"""
+        for task in self._flushes.values():
+            task.cancel()
+        self._flushes.clear()
+        self._due.clear()
+        self._pending.clear()
+        self._refresh_players.clear()
+
+
+live_status = LiveStatus(bot_config.live_status_delay, bot_config.live_status_min_interval)
@@ -0,0 +1,116 @@
+"""Журнал без блокировки цикла событий.
+
+Записи ставятся в ограниченную очередь (QueueHandler), форматирование и запись в stderr
+выполняет отдельный поток QueueListener. Медленный вывод или заполненный pipe Docker'а
+задерживает только этот поток; если очередь переполнена, запись отбрасывается и учитывается
+в метрике, но цикл событий не ждёт.
+
+Поля chat_id, user, command, latency_ms и server передаются через extra и в формате JSON
+выводятся отдельными ключами. Записи частых путей (каждое сообщение в чате, тик watchdog'а)
+помечаются extra={"sample": "ключ"} и выводятся одна из log_sample_every отдельно для каждого
+сервера (extra["server"]), чтобы частый тик одного сервера не вытеснял записи другого.
+"""
+import copy
+import json
+import logging
+import queue
+import sys
+from collections import defaultdict
+from logging.handlers import QueueHandler, QueueListener
+from services import metrics
+
+STRUCTURED_FIELDS = ("chat_id", "user", "command", "latency_ms", "server")
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись — одна строка JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for name in STRUCTURED_FIELDS:
+            value = getattr(record, name, None)
+            if value is not None:
+                entry[name] = value
+        sampled = getattr(record, "sampled", None)
+        if sampled:
+            entry["sampled"] = sampled  # запись представляет sampled похожих
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Пропускает одну из every записей с одинаковыми extra["sample"] и extra["server"].
+    Предупреждения и ошибки, а также записи без ключа проходят всегда"""
+
+    def __init__(self, every: int):
+        super().__init__()
+        self.every = max(every, 1)
+        self._seen: dict[tuple, int] = defaultdict(int)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        sample = getattr(record, "sample", None)
+        if sample is None or self.every == 1 or record.levelno >= logging.WARNING:
+            return True
+        key = (sample, getattr(record, "server", None))
+        seen = self._seen[key]
+        self._seen[key] = seen + 1
+        if seen % self.every:
+            return False
+        record.sampled = self.every
+        return True
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler, который не ждёт места в очереди: при переполнении запись отбрасывается"""
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            metrics.log_records_dropped.inc()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # аргументы подставляются сразу (объекты могут измениться, пока запись в очереди),
+        # а оформление строки — в потоке QueueListener
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = _exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_exception_formatter = logging.Formatter()
+
+
+def setup_logging(level: int, json_format: bool = False, sample_every: int = 10,
+                  queue_size: int = 10_000, stream=None) -> QueueListener:
+    """Настраивает корневой логгер и запускает поток записи. Возвращает QueueListener,
+    который нужно остановить при выходе, чтобы дописать очередь"""
+    output = logging.StreamHandler(stream or sys.stderr)  # как у logging.basicConfig
+    if json_format:
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+    handler = DroppingQueueHandler(queue.Queue(queue_size))
+    handler.addFilter(SamplingFilter(sample_every))
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    listener = QueueListener(handler.queue, output, respect_handler_level=True)
+    listener.start()
+    return listener
@@ -0,0 +1,184 @@
+"""Метрики бота в текстовом формате Prometheus и локальный HTTP сервер /metrics"""
+import logging
+from bisect import bisect_left
+from collections.abc import Callable, Iterable
+from aiohttp import web
+from state.servers import servers
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограмм, секунд: от быстрых хендлеров до медленного VPS API
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *label_values, amount: float = 1):
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values) -> float:
+        return self._values.get(label_values, 0)
+
+    def samples(self) -> Iterable[str]:
+        for label_values, value in self._values.items():
+            yield f"{self.name}{_labels(self.labels, label_values)} {value}"
+
+
+class Histogram(Metric):
+    """Хранит только счётчики по корзинам: запись — поиск корзины и два сложения"""
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict[tuple, list] = {}  # значения меток -> [счётчики корзин..., +Inf, сумма]
+
+    def observe(self, value: float, *label_values):
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def count(self, *label_values) -> int:
+        series = self._series.get(label_values)
+        return sum(series[:-1]) if series else 0
+
+    def samples(self) -> Iterable[str]:
+        for label_values, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), series[:-1]):
+                cumulative += count
+                le = f'le="{bound}"'
+                yield f"{self.name}_bucket{_labels(self.labels, label_values, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labels, label_values)} {series[-1]}"
+            yield f"{self.name}_count{_labels(self.labels, label_values)} {cumulative}"
+
+
+class Gauge(Metric):
+    """Значение вычисляется при запросе /metrics, поэтому на горячий путь не влияет"""
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...],
+                 collect: Callable[[], Iterable[tuple[tuple, float]]]):
+        super().__init__(name, documentation, labels)
+        self._collect = collect
+
+    def samples(self) -> Iterable[str]:
+        for label_values, value in self._collect():
+            yield f"{self.name}{_labels(self.labels, label_values)} {value}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list[Metric] = []
+
+    def register(self, metric: Metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+
+registry = Registry()
+
+probe_duration = registry.register(Histogram(
+    "minecraft_probe_duration_seconds", "Minecraft server probe duration, including DNS", ("server",)))
+api_duration = registry.register(Histogram(
+    "vps_api_request_duration_seconds", "VPS API request duration", ("action",)))
+boot_duration = registry.register(Histogram(
+    "vps_boot_duration_seconds", "Time from PowerOn until the VPS is running and until Minecraft answers",
+    ("server", "stage"), buckets=(15, 30, 60, 90, 120, 180, 300, 600, 900)))
+api_errors = registry.register(Counter(
+    "vps_api_errors_total", "Failed VPS API requests", ("action",)))
+handler_duration = registry.register(Histogram(
+    "bot_handler_duration_seconds", "Command handler duration", ("command",)))
+watchdog_ticks = registry.register(Counter(
+    "watchdog_ticks_total", "Watchdog checks", ("server",)))
+watchdog_crashes = registry.register(Counter(
+    "watchdog_crashes_total", "Minecraft server crashes detected by the watchdog", ("server",)))
+watchdog_shutdowns = registry.register(Counter(
+    "watchdog_shutdowns_total", "VPS shutdowns after the idle timeout", ("server",)))
+log_records_dropped = registry.register(Counter(
+    "log_records_dropped_total", "Log records dropped because the log queue was full"))
+live_status_updates = registry.register(Counter(
+    "live_status_updates_total", "Live status messages sent, edited or skipped as unchanged", ("result",)))
+watchdog_transitions = registry.register(Counter(
+    "watchdog_transitions_total", "Server lifecycle phase transitions", ("server", "from", "to")))
+power_actions_joined = registry.register(Counter(
+    "vps_power_actions_joined_total", "Power requests that joined an action already in flight", ("action",)))
+rate_limited = registry.register(Counter(
+    "bot_rate_limited_total", "Commands rejected by the per-user and per-chat rate limits", ("command",)))
+notification_failures = registry.register(Counter(
+    "notification_failures_total", "Notifications that were not delivered", ("reason",)))
+registry.register(Gauge(
+    "minecraft_players_online", "Players online at the last check", ("server",),
+    lambda: (((server.name,), server.mc.snapshot.players_online or 0) for server in servers)))
+registry.register(Gauge(
+    "minecraft_shutdown_remaining_seconds", "Seconds left until the idle shutdown, -1 if not scheduled",
+    ("server",),
+    lambda: (((server.name,), server.mc.snapshot.shutdown_remaining
+              if server.mc.snapshot.shutdown_remaining is not None else -1) for server in servers)))
+
+
+class MetricsServer:
+    """Отдаёт /metrics для Prometheus. Слушает localhost, если не указано иное"""
+
+    def __init__(self, listen: str, port: int, metrics: Registry = registry):
+        self.listen = listen
+        self.port = port
+        self.metrics = metrics
+        self._runner: web.AppRunner | None = None
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        return web.Response(text=self.metrics.render(), content_type="text/plain", charset="utf-8")
+
+    async def start(self) -> int:
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.listen, self.port).start()
+        self.port = self._runner.addresses[0][1]
+        logger.info(f"Metrics server listening on {self.listen}:{self.port}/metrics")
+        return self.port
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
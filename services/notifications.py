@@ -0,0 +1,226 @@
+"""Рассылка уведомлений подписанным чатам с учётом ограничений Telegram"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import timedelta
+from telegram import Bot
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter
+from config.config import bot_config
+from services import metrics
+from services.ratelimit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BroadcastResult:
+    sent: int = 0
+    failed: int = 0
+    dropped: list[int] = field(default_factory=list)  # Чаты, заблокировавшие бота
+
+
+def _seconds(retry_after: int | timedelta) -> float:
+    return retry_after.total_seconds() if isinstance(retry_after, timedelta) else float(retry_after)
+
+
+class Broadcaster:
+    """Рассылает сообщения параллельно (не более concurrency одновременно),
+    соблюдая общий лимит бота и лимит на каждый чат.
+
+    Чаты, заблокировавшие бота, удаляются из переданного множества подписчиков.
+    """
+
+    def __init__(self, concurrency: int, global_rate: float, private_rate: float, group_rate: float,
+                 max_retries: int = 3):
+        self.concurrency = concurrency
+        self.private_rate = private_rate
+        self.group_rate = group_rate
+        self.max_retries = max_retries
+        self._global = TokenBucket(global_rate, global_rate)
+        self._chats: dict[int, TokenBucket] = {}
+        self._queue: asyncio.Queue | None = None
+        self._worker: asyncio.Task | None = None
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            # отрицательный chat_id — группа или канал, у них лимит строже
+            rate = self.group_rate if chat_id < 0 else self.private_rate
+            bucket = self._chats[chat_id] = TokenBucket(rate, 1)
+        return bucket
+
+    async def broadcast(self, bot: Bot, chat_ids: set[int], text: str,
+                        recipients: list[int] | None = None) -> BroadcastResult:
+        """Отправляет text всем recipients (по умолчанию — текущим chat_ids)"""
+        result = BroadcastResult()
+        if recipients is None:
+            recipients = list(chat_ids)
+        if not recipients:
+            logger.debug("No active chats to notify")
+            return result
+        semaphore = asyncio.Semaphore(self.concurrency)
+        await asyncio.gather(*(self._send(bot, chat_id, text, semaphore, result) for chat_id in recipients))
+        for chat_id in result.dropped:
+            chat_ids.discard(chat_id)
+            self._chats.pop(chat_id, None)
+        if result.failed:
+            metrics.notification_failures.inc("failed", amount=result.failed)
+        if result.dropped:
+            metrics.notification_failures.inc("dropped", amount=len(result.dropped))
+        logger.debug("Broadcast finished: %d sent, %d failed, %d dropped",
+                     result.sent, result.failed, len(result.dropped))
+        return result
+
+    async def acquire(self, chat_id: int):
+        """Ждёт разрешения на один запрос к чату в пределах лимитов рассылки"""
+        await self._chat_bucket(chat_id).acquire()
+        await self._global.acquire()
+
+    def flood_control(self, retry_after: int | timedelta) -> float:
+        """Приостанавливает все запросы бота после RetryAfter. Возвращает паузу в секундах"""
+        delay = _seconds(retry_after)
+        self._global.pause(delay)
+        return delay
+
+    async def _send(self, bot: Bot, chat_id: int, text: str, semaphore: asyncio.Semaphore,
+                    result: BroadcastResult):
+        for attempt in range(self.max_retries + 1):
+            await self.acquire(chat_id)
+            try:
+                async with semaphore:
+                    await bot.send_message(chat_id=chat_id, text=text)
+                result.sent += 1
+                logger.debug("Sent notification to %s: %r", chat_id, text)
+                return
+            except RetryAfter as e:
+                # flood control распространяется на весь бот, а не только на этот чат
+                delay = self.flood_control(e.retry_after)
+                logger.warning(f"Flood control while sending to {chat_id}, retrying in {delay} seconds")
+            except Forbidden as e:
+                logger.info(f"Chat {chat_id} blocked the bot, removing from notifications: {e}")
+                result.dropped.append(chat_id)
+                return
+            except BadRequest as e:
+                if "chat not found" in str(e).lower():
+                    logger.info(f"Chat {chat_id} not found, removing from notifications")
+                    result.dropped.append(chat_id)
+                else:
+                    logger.warning(f"Failed to send notification to {chat_id}: {e}")
+                    result.failed += 1
+                return
+            except NetworkError as e:
+                logger.debug("Network error while sending to %s (attempt %d): %s", chat_id, attempt + 1, e)
+                await asyncio.sleep(2 ** attempt)
+            except Exception as e:
+                logger.warning(f"Failed to send notification to {chat_id}: {e}")
+                result.failed += 1
+                return
+        logger.warning(f"Failed to send notification to {chat_id}: retries exhausted")
+        result.failed += 1
+
+    def submit(self, bot: Bot, chat_ids: set[int], text: str, recipients=None):
+        """Ставит рассылку в очередь и сразу возвращает управление.
+        Рассылки выполняются по одной, поэтому порядок сообщений в чате сохраняется.
+        Получатели (recipients, по умолчанию chat_ids) фиксируются в момент вызова,
+        а заблокировавшие бота чаты удаляются из chat_ids — передавайте само множество подписчиков"""
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+        self._queue.put_nowait((bot, chat_ids, text, list(chat_ids if recipients is None else recipients)))
+
+    async def _run(self):
+        while True:
+            bot, chat_ids, text, recipients = await self._queue.get()  # type: ignore
+            try:
+                await self.broadcast(bot, chat_ids, text, recipients)
+            except Exception as e:
+                logger.exception(f"Broadcast failed: {e}")
+            finally:
+                self._queue.task_done()  # type: ignore
+
+    async def close(self, timeout: float = 10):
+        """Дожидается отправки поставленных в очередь рассылок и останавливает обработчик"""
+        if self._worker is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)  # type: ignore
+        except asyncio.TimeoutError:
+            logger.warning("Pending notifications dropped on shutdown")
+        self._worker.cancel()
+        self._worker = None
+        self._queue = None
+
+
+class NotificationMerger:
+    """Гасит поток уведомлений во время нестабильной работы сервера.
+
+    Уведомление отправляется сразу, но если оно открывает окно (unstable=True, например падение),
+    то следующие уведомления о том же сервере в течение window секунд копятся и в конце окна
+    уходят одним сообщением со сводкой. Обычный запуск («запускается», «доступен») не задерживается.
+    """
+
+    def __init__(self, window: float, sender: Broadcaster):
+        self.window = window
+        self.sender = sender
+        self._open_until: dict[str, float] = {}
+        # сервер -> (бот, подписчики, получатели, текст, unstable)
+        self._buffered: dict[str, list[tuple[Bot, set[int], frozenset[int], str, bool]]] = {}
+        self._flushes: dict[str, asyncio.Task] = {}
+        self._prefixes: dict[str, str] = {}  # например, имя сервера в режиме нескольких серверов
+
+    def push(self, bot: Bot, key: str, chat_ids: set[int], text: str, unstable: bool = False,
+             prefix: str = "", recipients=None):
+        """chat_ids — подписчики сервера, из них удаляются заблокировавшие бота чаты;
+        recipients — получатели уведомления (по умолчанию chat_ids)"""
+        now = time.monotonic()
+        self._prefixes[key] = prefix
+        open_until = self._open_until.get(key, 0)
+        if now < open_until:
+            self._buffered.setdefault(key, []).append(
+                (bot, chat_ids, frozenset(chat_ids if recipients is None else recipients), text, unstable))
+            if key not in self._flushes:
+                self._flushes[key] = asyncio.create_task(self._flush_later(key, open_until - now))
+            return
+        if unstable:
+            self._open_until[key] = now + self.window
+        self.sender.submit(bot, chat_ids, prefix + text, recipients)
+
+    async def _flush_later(self, key: str, delay: float):
+        await asyncio.sleep(delay)
+        self._flushes.pop(key, None)
+        self._flush(key)
+
+    def _flush(self, key: str):
+        buffered = self._buffered.pop(key, [])
+        if not buffered:
+            return
+        if any(unstable for *_, unstable in buffered):
+            # сервер всё ещё нестабилен: окно продолжается
+            self._open_until[key] = time.monotonic() + self.window
+        bot, chat_ids = buffered[-1][:2]  # подписчики сервера — одно и то же множество
+        recipients = frozenset().union(*(recipients for _, _, recipients, _, _ in buffered))
+        summary = self.summary([text for *_, text, _ in buffered])
+        self.sender.submit(bot, chat_ids, self._prefixes.get(key, "") + summary, recipients)
+        logger.debug("Merged %d notifications about %s", len(buffered), key)
+
+    def summary(self, messages: list[str]) -> str:
+        if len(messages) == 1:
+            return messages[0]
+        return (f"🔁 Сервер работает нестабильно: состояние менялось {len(messages)} раз "
+                f"за {self.window / 60:.0f} мин. Сейчас:\n{messages[-1]}")
+
+    def close(self):
+        """Отправляет накопленные сводки сразу, не дожидаясь конца окна"""
+        for key, task in list(self._flushes.items()):
+            task.cancel()
+            self._flush(key)
+        self._flushes.clear()
+
+
+broadcaster = Broadcaster(concurrency=bot_config.broadcast_concurrency,
+                          global_rate=bot_config.broadcast_global_rate,
+                          private_rate=bot_config.broadcast_private_rate,
+                          group_rate=bot_config.broadcast_group_rate)
+merger = NotificationMerger(bot_config.notify_merge_window, broadcaster)
@@ -0,0 +1,113 @@
+"""Сохранение runtime состояния бота между перезапусками"""
+import json
+import logging
+from telegram.ext import Application, ContextTypes
+from services import events, watchdog
+from services.live_status import live_status
+from services.sqlite_store import SQLiteStore
+from state.bot_state import bot_state
+from state.servers import servers
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+# next_check не сохраняется: он отсчитывается по time.monotonic(), который не переживает перезапуск
+WATCHDOG_FIELDS = ("empty_since", "warning_3m_sent", "is_fresh_start", "crashed", "phase", "recent_probes")
+VPS_FIELDS = ("last_poweron_time", "last_poweroff_time", "boot_started", "boot_vps_ready", "boot_durations")
+
+
+class StateStore(SQLiteStore):
+    """Состояние хранится парами ключ — JSON. На диск пишутся только изменившиеся ключи,
+    все в одной транзакции, поэтому после падения состояние целиком на один из моментов сохранения.
+    """
+
+    schema = SCHEMA
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._written: dict[str, str] = dict(self._conn.execute("SELECT key, value FROM state"))
+
+    def load(self) -> dict[str, dict]:
+        return {key: json.loads(value) for key, value in self._written.items()}
+
+    def _write(self, changed: dict[str, str]):
+        with self._transaction():
+            self._conn.executemany("INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)",
+                                   changed.items())
+
+    async def save(self, state: dict[str, dict]) -> int:
+        """Записывает ключи, отличающиеся от последней записи. Возвращает число записанных ключей"""
+        encoded = {key: json.dumps(value, sort_keys=True) for key, value in state.items()}
+        changed = {key: value for key, value in encoded.items() if self._written.get(key) != value}
+        if changed:
+            await self._in_writer(self._write, changed)
+            self._written.update(changed)
+        return len(changed)
+
+
+def collect_state(application: Application) -> dict[str, dict]:
+    state = {
+        "bot": {"maintenance_mode": bot_state.maintenance_mode},
+        "muted": {"chats": sorted(chat_id for chat_id, data in application.chat_data.items()
+                                  if data.get("muted"))},
+        "live_status": {"messages": live_status.dump()},
+    }
+    for server in servers:
+        state[f"server:{server.name}"] = {
+            "active_chats": sorted(server.active_chats),
+            "watchdog_armed": server.watchdog.watchdog_job is not None,
+            "watchdog": {name: getattr(server.watchdog, name) for name in WATCHDOG_FIELDS},
+            "vps": {name: getattr(server.vps, name) for name in VPS_FIELDS},
+        }
+    return state
+
+
+def restore_state(application: Application, state: dict[str, dict]):
+    """Восстанавливает состояние и заново запускает watchdog для серверов, где он работал"""
+    bot_state.maintenance_mode = state.get("bot", {}).get("maintenance_mode", False)
+    for chat_id in state.get("muted", {}).get("chats", []):
+        application.chat_data[chat_id]["muted"] = True
+    live_status.load(state.get("live_status", {}).get("messages", []))
+
+    for server in servers:
+        saved = state.get(f"server:{server.name}")
+        if saved is None:
+            continue
+        server.active_chats.update(saved.get("active_chats", []))
+        for name, value in saved.get("watchdog", {}).items():
+            if name in WATCHDOG_FIELDS:
+                setattr(server.watchdog, name, value)
+        for name, value in saved.get("vps", {}).items():
+            if name in VPS_FIELDS:
+                setattr(server.vps, name, value)
+        if saved.get("watchdog_armed"):
+            # next_check = 0: сервер будет проверен на первом же тике задачи
+            watchdog.watchdog_run(application.job_queue, server)
+            logger.info(f"Restored watchdog for server {server.name} "
+                        f"with {len(server.active_chats)} subscribed chats")
+
+
+async def save_runtime_state(application: Application, store: StateStore):
+    try:
+        written = await store.save(collect_state(application))
+    except Exception as e:
+        logger.error(f"Failed to save runtime state: {e!r}")
+        return
+    if written:
+        logger.debug("Saved %d changed runtime state keys", written)
+
+
+def schedule_saving(application: Application, store: StateStore, interval: float):
+    async def save_job(context: ContextTypes.DEFAULT_TYPE):
+        await save_runtime_state(context.application, store)
+
+    async def save_on_transition(event: events.PhaseChanged):
+        # смена состояния сохраняется сразу, не дожидаясь периодического сохранения
+        await save_runtime_state(application, store)
+
+    application.job_queue.run_repeating(save_job, interval=interval, first=interval,
+                                        name="runtime_state_save")
+    events.bus.subscribe(events.PhaseChanged, save_on_transition)
@@ -0,0 +1,196 @@
+"""История онлайна Minecraft сервера: кольцевой буфер в memory-mapped файле и агрегаты для /stats"""
+import logging
+import mmap
+import os
+import struct
+import time
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from state.servers import ManagedServer
+
+logger = logging.getLogger(__name__)
+
+# Заголовок файла: сигнатура, ёмкость, позиция следующей записи, число записей.
+# Дальше три колонки: время (uint32), игроки (int16, -1 — сервер не в сети), задержка (uint16, мс)
+HEADER = struct.Struct("<4sIII")
+MAGIC = b"MCP1"
+SAMPLE_SIZE = 4 + 2 + 2
+OFFLINE = -1
+NO_LATENCY = 0xFFFF
+HISTORY_DAYS = 28
+DEFAULT_CAPACITY = HISTORY_DAYS * 24 * 60  # четыре недели по одной точке в минуту, ~320 КБ
+
+
+@dataclass
+class StatsSummary:
+    samples: int = 0
+    online_samples: int = 0
+    idle_share: float = 0  # доля времени с пустым сервером среди времени, когда он был в сети
+    session_concurrency: float = 0  # среднее число игроков, когда на сервере кто-то есть
+    peak_hours: list[tuple[int, float]] = field(default_factory=list)  # (час, среднее число игроков)
+
+
+class PlayerHistory:
+    """Кольцевой буфер фиксированного размера поверх mmap.
+
+    Колонки доступны как типизированные memoryview над отображённым файлом, поэтому точки
+    не превращаются в Python объекты при записи, а для агрегации копируется только нужное окно. Данные попадают в файл
+    сразу при записи (страничный кеш ОС) и переживают перезапуск бота.
+
+    Точки пишутся на тиках watchdog'а, а пока на сервере есть игроки, тики реже (до
+    watchdog_max_interval). Поэтому в агрегатах каждая точка весит время до следующей,
+    но не больше max_gap: дольше без точек бот, скорее всего, не работал.
+    """
+
+    def __init__(self, path: str, capacity: int = DEFAULT_CAPACITY, max_gap: float = 600):
+        self.path = path
+        self.max_gap = max_gap
+        size = HEADER.size + capacity * SAMPLE_SIZE
+        self._file = open(path, "a+b")
+        self._file.seek(0)
+        header = self._file.read(HEADER.size).ljust(HEADER.size, b"\0")
+        magic, stored_capacity, head, count = HEADER.unpack(header)
+        if magic != MAGIC or stored_capacity != capacity or os.fstat(self._file.fileno()).st_size != size:
+            if magic.strip(b"\0"):
+                logger.warning(f"Player history {path} has an unexpected format, starting a new one")
+            self._file.truncate(0)
+            self._file.truncate(size)
+            head = count = 0
+        self._mm = mmap.mmap(self._file.fileno(), size)
+        self.capacity = capacity
+        self.head = head
+        self.count = count
+
+        view = memoryview(self._mm)
+        offset = HEADER.size
+        self._timestamps = view[offset:offset + 4 * capacity].cast("I")
+        offset += 4 * capacity
+        self._players = view[offset:offset + 2 * capacity].cast("h")
+        offset += 2 * capacity
+        self._latency = view[offset:offset + 2 * capacity].cast("H")
+        self._write_header()
+
+    def _write_header(self):
+        HEADER.pack_into(self._mm, 0, MAGIC, self.capacity, self.head, self.count)
+
+    def last_timestamp(self) -> int:
+        return self._timestamps[(self.head - 1) % self.capacity] if self.count else 0
+
+    def append(self, timestamp: float, players: int | None, latency_ms: float | None):
+        i = self.head
+        self._timestamps[i] = int(timestamp)
+        self._players[i] = OFFLINE if players is None else min(players, 0x7FFF)
+        self._latency[i] = NO_LATENCY if latency_ms is None else min(int(latency_ms), NO_LATENCY - 1)
+        self.head = (i + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        self._write_header()
+
+    def _window(self, since: int, until: int) -> tuple[array, array]:
+        """Время и число игроков точек из [since, until] от старых к новым. Границы ищутся
+        бинарным поиском прямо в memoryview каждой части кольца, и копируется только окно —
+        одним memcpy на часть, а не вся колонка"""
+        if self.count < self.capacity:
+            parts = [(0, self.count)]
+        else:
+            parts = [(self.head, self.capacity), (0, self.head)]
+        timestamps, players = array("I"), array("h")
+        for lo, hi in parts:
+            a = bisect_left(self._timestamps, since, lo, hi)
+            b = bisect_left(self._timestamps, until + 1, a, hi)
+            timestamps.frombytes(self._timestamps[a:b].cast("B"))
+            players.frombytes(self._players[a:b].cast("B"))
+        return timestamps, players
+
+    def summarize(self, since: float, until: float | None = None, peaks: int = 3) -> StatsSummary:
+        until = time.time() if until is None else until
+        timestamps, window = self._window(int(since), int(until))
+
+        summary = StatsSummary(samples=len(window))
+        summary.online_samples = len(window) - window.count(OFFLINE)
+        if not summary.online_samples:
+            return summary
+
+        # Каждая точка весит время до следующей (не больше max_gap), последняя — как предыдущая
+        utc_offset = time.localtime(until).tm_gmtoff
+        online_time = empty_time = player_time = 0.0
+        hour_players, hour_time = [0.0] * 24, [0.0] * 24
+        gap = 1.0
+        for i, players in enumerate(window):
+            if i + 1 < len(window):
+                gap = min(timestamps[i + 1] - timestamps[i], self.max_gap)
+            if players == OFFLINE:
+                continue
+            online_time += gap
+            if players == 0:
+                empty_time += gap
+            player_time += players * gap
+            of_day = (timestamps[i] + utc_offset) // 3600 % 24
+            hour_players[of_day] += players * gap
+            hour_time[of_day] += gap
+        if not online_time:
+            return summary
+        summary.idle_share = empty_time / online_time
+        if online_time > empty_time:
+            summary.session_concurrency = player_time / (online_time - empty_time)
+        averages = [(h, hour_players[h] / hour_time[h]) for h in range(24) if hour_time[h]]
+        summary.peak_hours = sorted((item for item in averages if item[1] > 0),
+                                    key=lambda item: item[1], reverse=True)[:peaks]
+        return summary
+
+    def flush(self):
+        self._mm.flush()
+
+    def close(self):
+        self.flush()
+        for view in (self._timestamps, self._players, self._latency):
+            view.release()
+        self._mm.close()
+        self._file.close()
+
+
+class PlayerStats:
+    """Истории всех серверов. Пока open() не вызван, запись ничего не делает (тесты, бенчмарки)"""
+
+    def __init__(self):
+        self.directory: str | None = None
+        self.sample_interval: float = 60
+        self.max_gap: float = 600
+        self._histories: dict[str, PlayerHistory] = {}
+
+    def open(self, directory: str, sample_interval: float = 60, tick_interval: float = 300):
+        """tick_interval — самый редкий интервал watchdog'а: точки реже этого считаются перерывом"""
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.sample_interval = sample_interval
+        self.max_gap = 2 * max(sample_interval, tick_interval)
+
+    def history(self, server: ManagedServer) -> PlayerHistory | None:
+        if self.directory is None:
+            return None
+        history = self._histories.get(server.name)
+        if history is None:
+            history = PlayerHistory(os.path.join(self.directory, f"{server.name}.bin"), max_gap=self.max_gap)
+            self._histories[server.name] = history
+        return history
+
+    def record(self, server: ManagedServer, now: float | None = None):
+        """Добавляет точку не чаще sample_interval, чтобы буфер покрывал одинаковый период
+        независимо от текущего интервала watchdog'а"""
+        history = self.history(server)
+        if history is None:
+            return
+        now = time.time() if now is None else now
+        if now - history.last_timestamp() < self.sample_interval:
+            return
+        mc = server.mc
+        history.append(now, mc.players_online if mc.online else None, mc.last_latency_ms)
+
+    def close(self):
+        for history in self._histories.values():
+            history.close()
+        self._histories.clear()
+        self.directory = None
+
+
+player_stats = PlayerStats()
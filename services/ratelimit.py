@@ -0,0 +1,122 @@
+"""Ограничение частоты запросов"""
+import asyncio
+import time
+from collections import OrderedDict
+from collections.abc import Hashable
+from config.config import RateLimit
+
+
+class TokenBucket:
+    """Ведро токенов: rate токенов в секунду, не больше capacity про запас.
+
+    acquire() резервирует токен сразу и ждёт, пока баланс не станет неотрицательным,
+    поэтому ожидающие обслуживаются в порядке вызова без лишних пробуждений.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, tokens: float = 1) -> float:
+        """Берёт токены без ожидания. Возвращает 0, если получилось, иначе сколько секунд ждать"""
+        self._refill()
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return 0
+        return (tokens - self.tokens) / self.rate
+
+    def refund(self, tokens: float = 1):
+        self.tokens = min(self.capacity, self.tokens + tokens)
+
+    async def acquire(self, tokens: float = 1):
+        self._refill()
+        self.tokens -= tokens
+        if self.tokens < 0:
+            await asyncio.sleep(-self.tokens / self.rate)
+
+    def pause(self, seconds: float):
+        """Запрещает выдачу токенов на seconds секунд (например, после RetryAfter)"""
+        self._refill()
+        self.tokens = min(self.tokens, 0) - seconds * self.rate
+
+
+class KeyedRateLimiter:
+    """Отдельное ведро на каждый ключ (пользователя, чат).
+
+    Ведро, простоявшее дольше времени полного восстановления, неотличимо от нового и удаляется:
+    ключи хранятся в порядке последнего обращения, поэтому проверка вытеснения — O(1) в среднем,
+    а память пропорциональна числу активных ключей.
+    """
+
+    def __init__(self, limit: RateLimit):
+        self.rate = 1 / limit.period
+        self.capacity = limit.burst
+        self.idle_ttl = limit.burst * limit.period
+        self._buckets: OrderedDict[Hashable, TokenBucket] = OrderedDict()
+        self._warned: set[Hashable] = set()  # ключи, которым уже сообщили об ограничении
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def _evict(self, now: float):
+        while self._buckets:
+            key, bucket = next(iter(self._buckets.items()))
+            if now - bucket.updated < self.idle_ttl:
+                break
+            del self._buckets[key]
+            self._warned.discard(key)
+
+    def try_acquire(self, key: Hashable) -> float:
+        self._evict(time.monotonic())
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.rate, self.capacity)
+        else:
+            self._buckets.move_to_end(key)
+        wait = bucket.try_acquire()
+        if not wait:
+            self._warned.discard(key)
+        return wait
+
+    def refund(self, key: Hashable):
+        bucket = self._buckets.get(key)
+        if bucket is not None:
+            bucket.refund()
+
+    def should_warn(self, key: Hashable) -> bool:
+        """True для первого отказа подряд: на остальные отвечать не нужно"""
+        if key in self._warned:
+            return False
+        self._warned.add(key)
+        return True
+
+
+class CommandRateLimiter:
+    """Лимиты команд на пользователя и на чат: пользователи в разных чатах не мешают друг другу,
+    а один пользователь не может занять лимит всего чата"""
+
+    def __init__(self, limits: dict[str, tuple[RateLimit, RateLimit]]):
+        self._limiters = {command: (KeyedRateLimiter(per_user), KeyedRateLimiter(per_chat))
+                          for command, (per_user, per_chat) in limits.items()}
+
+    def check(self, command: str, user_id: int, chat_id: int) -> tuple[float, bool]:
+        """Возвращает (секунд до следующей попытки, нужно ли сообщить об ограничении)"""
+        limiters = self._limiters.get(command)
+        if limiters is None:
+            return 0, False
+        per_user, per_chat = limiters
+        wait = per_user.try_acquire(user_id)
+        if wait:
+            return wait, per_user.should_warn(user_id)
+        wait = per_chat.try_acquire(chat_id)
+        if wait:
+            per_user.refund(user_id)  # запрос не выполнен, токен пользователя возвращается
+            return wait, per_chat.should_warn(chat_id)
+        return 0, False
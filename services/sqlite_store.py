@@ -0,0 +1,41 @@
+"""Общая основа хранилищ бота в SQLite"""
+import asyncio
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+
+class SQLiteStore:
+    """База в режиме WAL с synchronous=FULL: закоммиченная транзакция переживает падение
+    процесса, а прерванная запись не портит файл.
+
+    Запись выполняется в одном фоновом потоке, поэтому не блокирует event loop
+    и применяется в порядке вызова. Чтение — только при запуске, до начала записи.
+    """
+
+    schema = ""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.executescript(self.schema)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=type(self).__name__)
+
+    @contextmanager
+    def _transaction(self):
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    async def _in_writer(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self._conn.close()
@@ -0,0 +1,67 @@
+"""Параллельная обработка обновлений Telegram с сохранением порядка внутри чата"""
+import logging
+from collections import deque
+from collections.abc import Awaitable
+from typing import Any
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+logger = logging.getLogger(__name__)
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """Обновления разных чатов обрабатываются одновременно (не больше max_concurrent_updates),
+    обновления одного чата — строго по очереди.
+
+    Если чат уже обрабатывается, новое обновление добавляется в очередь этого чата и слот
+    сразу освобождается: очередь выполняет та же задача, что обрабатывает чат. Поэтому один
+    чат занимает не больше одного слота, а очередь в нём не задерживает остальные чаты.
+    Порядок сохраняется, потому что Application создаёт задачи в порядке получения обновлений,
+    а семафор слотов пропускает их в порядке ожидания.
+    """
+
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        self._queues: dict[int, deque[Awaitable[Any]]] = {}
+
+    @staticmethod
+    def _chat_id(update: object) -> int | None:
+        if isinstance(update, Update) and update.effective_chat is not None:
+            return update.effective_chat.id
+        return None
+
+    def busy_chats(self) -> int:
+        return len(self._queues)
+
+    @staticmethod
+    async def _run(coroutine: Awaitable[Any]):
+        try:
+            await coroutine
+        except Exception:
+            # ошибки хендлеров обрабатывает Application, сюда попадают только неожиданные
+            logger.exception("Unexpected error while processing an update")
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        chat_id = self._chat_id(update)
+        if chat_id is None:
+            await coroutine
+            return
+        queue = self._queues.get(chat_id)
+        if queue is not None:
+            queue.append(coroutine)
+            return
+        queue = self._queues[chat_id] = deque()
+        try:
+            await self._run(coroutine)
+            while queue:
+                await self._run(queue.popleft())
+        finally:
+            del self._queues[chat_id]
+            for pending in queue:  # остаются только при отмене задачи (остановка бота)
+                pending.close()
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
@@ -1,33 +1,196 @@
 """Функции управления VPS сервером"""
+import asyncio
 import logging
+import math
 import time
+from typing import Awaitable, Callable
+from config.config import bot_config
 from integrations import api
-from dataclasses import dataclass
+from services import metrics
+from state.servers import ManagedServer, servers
+from state.vps_state import vps_state
 
 logger = logging.getLogger(__name__)
 
-@dataclass
-class VPSState:
-    # Время последнего успешного запуска VPS (в секундах с эпохи)
-    last_poweron_time: float = 0
-    last_poweroff_time: float = 0
-    # Время последнего запроса статуса сервера
-    last_status_time: float = 0
 
-vps_state = VPSState()
+class StatusCache:
+    """Кеш статуса VPS с TTL, объединением одновременных запросов и stale-while-revalidate.
 
+    Все вызовы get() в пределах одного обновления ждут один и тот же запрос к API.
+    Ответы с ошибкой не кешируются; если API не отвечает, при allow_stale отдаётся
+    последний известный статус с ключом stale_for.
+    """
 
-async def shutdown_vps():
+    def __init__(self, fetch: Callable[[], Awaitable[dict]], ttl: float, stale_ttl: float):
+        self._fetch = fetch
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._value: dict | None = None
+        self._fetched_at: float = 0
+        self._generation = 0  # увеличивается при invalidate(), чтобы не сохранять устаревший ответ
+        self._inflight: asyncio.Task | None = None
+
+    def age(self) -> float:
+        if self._value is None:
+            return math.inf
+        return time.monotonic() - self._fetched_at
+
+    async def get(self, max_age: float | None = None, allow_stale: bool = True) -> dict:
+        ttl = self.ttl if max_age is None else max_age
+        age = self.age()
+        if age < ttl:
+            return self._value  # type: ignore
+        if allow_stale and age < ttl + self.stale_ttl:
+            self._refresh()  # отдаём старое значение, обновляем в фоне
+            return self._value  # type: ignore
+        # shield: отмена одного ожидающего не отменяет общий запрос для остальных
+        result = await asyncio.shield(self._refresh())
+        if "error" in result and allow_stale and self._value is not None:
+            # API недоступен (при разомкнутом размыкателе — сразу): последний известный статус
+            # лучше ошибки, stale_for показывает его возраст
+            return {**self._value, "stale_for": self.age()}
+        return result
+
+    def invalidate(self):
+        self._value = None
+        self._generation += 1
+        self._inflight = None
+
+    def _refresh(self) -> asyncio.Task:
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.create_task(self._fetch_and_store(self._generation))
+            self._inflight.add_done_callback(self._log_failure)
+        return self._inflight
+
+    async def _fetch_and_store(self, generation: int) -> dict:
+        result = await self._fetch()
+        if "error" not in result and generation == self._generation:
+            self._value = result
+            self._fetched_at = time.monotonic()
+        return result
+
+    @staticmethod
+    def _log_failure(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug("VPS status refresh failed: %r", task.exception())
+
+
+class PowerCoordinator:
+    """Действия с питанием одного VPS выполняются по одному.
+
+    Повторный запрос того же действия, пока оно выполняется или ждёт своей очереди, получает
+    результат уже запущенного, без второго запроса к API. Разные действия (включение и выключение)
+    выполняются последовательно под server.lock. Отмена ожидающего не прерывает само действие.
+    """
+
+    def __init__(self, server: ManagedServer):
+        self.server = server
+        self.pending: str | None = None  # действие, которое выполняется сейчас
+        self.pending_since: float = 0  # time.monotonic() начала этого действия
+        self._inflight: dict[str, asyncio.Task] = {}
+
+    async def run(self, action: str, operation: Callable[[], Awaitable[dict]]) -> tuple[dict, bool]:
+        """Возвращает результат действия и True, если вызов присоединился к уже запущенному"""
+        task = self._inflight.get(action)
+        if task is not None:
+            metrics.power_actions_joined.inc(action)
+            logger.info(f"{action} for VPS {self.server.name} is already in progress, joining it")
+            return await asyncio.shield(task), True
+        task = asyncio.create_task(self._serialized(action, operation))
+        self._inflight[action] = task
+        task.add_done_callback(lambda done: self._finished(action, done))
+        return await asyncio.shield(task), False
+
+    async def _serialized(self, action: str, operation: Callable[[], Awaitable[dict]]) -> dict:
+        async with self.server.lock:
+            self.pending, self.pending_since = action, time.monotonic()
+            try:
+                return await operation()
+            finally:
+                self.pending = None
+
+    def _finished(self, action: str, task: asyncio.Task):
+        if self._inflight.get(action) is task:
+            del self._inflight[action]
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"{action} for VPS {self.server.name} failed: {task.exception()!r}")
+
+
+_power_coordinators: dict[str, PowerCoordinator] = {}
+
+
+def get_power_coordinator(server: ManagedServer | None = None) -> PowerCoordinator:
+    server = server or servers.default()
+    coordinator = _power_coordinators.get(server.name)
+    if coordinator is None:
+        coordinator = _power_coordinators[server.name] = PowerCoordinator(server)
+    return coordinator
+
+
+async def _measured(action: str, request: Awaitable[dict]) -> dict:
+    """Запрос к VPS API с записью длительности и ошибок в метрики"""
+    started = time.perf_counter()
+    try:
+        result = await request
+    except Exception:
+        metrics.api_errors.inc(action)
+        raise
+    finally:
+        metrics.api_duration.observe(time.perf_counter() - started, action)
+    if "error" in result:
+        metrics.api_errors.inc(action)
+    return result
+
+
+_status_caches: dict[str, StatusCache] = {}
+
+
+def get_status_cache(server: ManagedServer | None = None) -> StatusCache:
+    """Кеш статуса VPS конкретного сервера (по умолчанию — основного)"""
+    server = server or servers.default()
+    cache = _status_caches.get(server.name)
+    if cache is None:
+        cache = StatusCache(lambda: _measured("Status",
+                                              api.get_vps_server_status(server.api_url, server.api_token)),
+                            ttl=bot_config.status_cache_ttl,
+                            stale_ttl=bot_config.status_stale_ttl)
+        _status_caches[server.name] = cache
+    return cache
+
+
+status_cache = get_status_cache()
+
+
+async def get_vps_status(max_age: float | None = None, allow_stale: bool = True,
+                         server: ManagedServer | None = None) -> dict:
+    """Статус VPS из кеша, при необходимости — из API"""
+    return await get_status_cache(server).get(max_age=max_age, allow_stale=allow_stale)
+
+
+async def shutdown_vps(server: ManagedServer | None = None):
+    server = server or servers.default()
     now = time.time()
-    result = await api.api_request("ShutDownGuestOS")
-    logger.debug(f"shutdown_vps_API_result = {result}")
+    result = await _measured("ShutDownGuestOS", api.api_request("ShutDownGuestOS", server.api_url, server.api_token))
+    logger.debug("shutdown_vps_API_result = %s", result)
     if "error" in result:
         return result  # ничего не трогаем
+    get_status_cache(server).invalidate()
     # считаем, что shutdown инициирован успешно
-    vps_state.last_poweron_time = now  # предотвращение быстрого запуска VPS после включения
-    logger.info(f"VPS shutdown initiated successfully")
+    server.vps.last_poweron_time = now  # предотвращение быстрого запуска VPS после включения
+    server.vps.boot_started = server.vps.boot_vps_ready = 0
+    logger.info(f"VPS {server.name} shutdown initiated successfully")
     return result
 
-async def poweron_vps():
-    # TODO вынести сюда логику из /poweron хендлера
-    pass
\ No newline at end of file
+async def poweron_vps(server: ManagedServer | None = None):
+    server = server or servers.default()
+    now = time.time()
+    result = await _measured("PowerOn", api.api_request("PowerOn", server.api_url, server.api_token))
+    logger.debug("poweron_vps_API_result = %s", result)
+    if "error" in result:
+        return result
+    get_status_cache(server).invalidate()
+    server.vps.last_poweron_time = now
+    server.vps.boot_started = now  # watchdog ждёт запуска VPS, прежде чем проверять Minecraft
+    server.vps.boot_vps_ready = 0
+    logger.info(f"VPS {server.name} poweron initiated successfully")
+    return result
@@ -1,14 +1,22 @@
 import asyncio
+import contextlib
 import logging
 import time
-from typing import Optional
-from mcstatus import JavaServer
+from integrations.minecraft import ProbeError, ProbeResult, probe_status
+from integrations.query import get_query_client
 from re import search
-from dataclasses import dataclass, fields
-from telegram.ext import Job, JobQueue, ContextTypes
-from services import bot_service
-from state.minecraft_server import mc_server
+from telegram.ext import Application, Job, JobQueue, ContextTypes
+from config.config import bot_config
+from integrations.resolver import resolver
+from services import boot_tracker, bot_service, events, lifecycle, metrics, vps_service
+from services.events import PhaseChanged, ServerNotice, StatusUpdated
+from services.live_status import live_status, replaces
+from services.notifications import merger
+from services.player_stats import player_stats
+from state.minecraft_server import mc_server, MinecraftServer, MinecraftSnapshot
 from state.bot_state import bot_state
+from state.servers import ManagedServer, servers
+from state.watchdog_state import Phase, watchdog_state
 
 
 logger = logging.getLogger(__name__)
@@ -31,146 +39,313 @@ async def fast_check(host: str, port: int, timeout: float = 2.0):
         logger.exception(f"Watchdog: port fast check — unknown exception: {e}")
         return None
 
-async def refresh_mc_server_state(server_address: str = mc_server.server_address,
-                                  port: int = mc_server.query_port):
-    is_open = await fast_check(server_address, port, timeout=2)
-    if is_open:
-        try:
-            logger.debug("Watchdog: mcstatus trying async_lookup...")
-            server = await JavaServer.async_lookup(f"{server_address}:{port}", timeout=3)
-            logger.debug("Watchdog: mcstatus trying async_status...")
-            status = await asyncio.wait_for(server.async_status(), timeout=6)
-            logger.debug("Watchdog: ONLINE Successfully get Minecraft server status.")
-            if status:
-                mc_server.players_online = status.players.online  # Запись в глобальный инстанс
-                logger.debug(f"Watchdog: ONLINE {mc_server.players_online} players online.")
-                mc_server.online = True
-                if not mc_server.version:
-                    mc_server.version = status.version.name
-                    mc_server.version_number = (search(r"([0-9]+(\.[0-9]+)+)",
-                                                       mc_server.version)).group(1)
-            else:
-                logger.debug(f"Watchdog: OFFLINE Failed to get list of players online.")
-                mc_server.online = False
-                mc_server.players_online = None
-
-        except Exception as e:
-            mc_server.online = False
-            mc_server.players_online = None
-            logger.debug(f"Watchdog: OFFLINE Minecraft server unreachable. {type(e).__name__}: {e}")
+async def legacy_probe(host: str, port: int, server_name: str | None = None) -> ProbeResult:
+    """Проверка в два соединения: сначала порт (fast_check), затем status ping"""
+    if not await fast_check(host, port, timeout=2):
+        return ProbeResult(online=False, error=ProbeError.UNREACHABLE)
+    return await probe_status(host, port, deadline=6, server_name=server_name)
+
+
+async def probe_mc_server(mc: MinecraftServer) -> ProbeResult:
+    """Проверяет сервер, не изменяя его состояние"""
+    started = time.perf_counter()
+    try:
+        resolved = await resolver.resolve(mc.server_address, mc.query_port, mc.srv_lookup)
+        server_address, port = resolved.ip, resolved.port
+    except Exception as e:
+        logger.debug("Watchdog: failed to resolve %s: %s: %s", mc.server_address, type(e).__name__, e)
+        server_address, port = mc.server_address, mc.query_port
+    mc.last_resolve_duration = time.perf_counter() - started
+
+    # соединение идёт на IP из кеша, а в handshake — настроенное имя сервера
+    if mc.probe_mode == "legacy":
+        return await legacy_probe(server_address, port, mc.server_address)
+    if mc.probe_mode == "query":
+        return await query_probe(mc, server_address, port)
+    return await probe_status(server_address, port, deadline=mc.probe_deadline, server_name=mc.server_address)
+
+
+async def query_probe(mc: MinecraftServer, host: str, port: int) -> ProbeResult:
+    """Query (один обмен по UDP, полный список игроков), если не ответил — status ping"""
+    client = get_query_client(host, mc.query_udp_port or port)
+    if client.available():
+        result = await client.query(deadline=min(2.0, mc.probe_deadline / 2))
+        if result.online:
+            return result
+    result = await probe_status(host, port, deadline=mc.probe_deadline, server_name=mc.server_address)
+    if result.online and client.available():
+        client.disable()  # сервер работает, но Query выключен или закрыт файрволом
+    return result
+
+
+def apply_probe_result(mc: MinecraftServer, result: ProbeResult):
+    if result.player_names is not None and mc.player_names is not None:
+        joined = set(result.player_names) - set(mc.player_names)
+        left = set(mc.player_names) - set(result.player_names)
+        if joined or left:
+            logger.info(f"Watchdog: {mc.server_address} joined {sorted(joined)}, left {sorted(left)}")
+    mc.player_names = result.player_names if result.online else None
+    mc.online = result.online
+    mc.players_online = result.players_online if result.online else None
+    mc.last_latency_ms = result.latency_ms
+    if result.online and not mc.version and result.version:
+        mc.version = result.version
+        match = search(r"([0-9]+(\.[0-9]+)+)", mc.version)
+        mc.version_number = match.group(1) if match else mc.version
+
+
+async def refresh_mc_server_state(mc: MinecraftServer = mc_server) -> ProbeResult:
+    started = time.perf_counter()
+    result = await probe_mc_server(mc)
+    apply_probe_result(mc, result)
+    if result.online:
+        logger.debug("Watchdog: ONLINE %s players online, latency %.0f ms.", mc.players_online, result.latency_ms,
+                     extra={"server": mc.server_address, "sample": "probe"})
+        resolver.report_success(mc.server_address, mc.query_port, mc.srv_lookup)
     else:
-        mc_server.online = False
-        mc_server.players_online = None
+        logger.debug("Watchdog: OFFLINE Minecraft server unreachable (%s).", result.error.value,
+                     extra={"server": mc.server_address, "sample": "probe"})
+        resolver.report_failure(mc.server_address, mc.query_port, mc.srv_lookup)
+    mc.last_probe_duration = time.perf_counter() - started
+    mc.last_check = time.monotonic()
+    mc.publish_snapshot()
+    return result
+
 
-@dataclass
-class WatchdogState:
-    empty_since: float | None = None  # Когда сервер стал пустым
-    warning_3m_sent: bool = False  # Предупреждение за 3 минуты до отключения
-    is_fresh_start: bool = True
-    crashed: int = 0  # Сервер упал или ещё не запустился.
-    watchdog_job: Optional[Job] = None
+_background_refresh: dict[str, asyncio.Task] = {}
 
-    def reset(self):
-        for f in fields(self):
-            setattr(self, f.name, f.default)
 
-watchdog_state = WatchdogState()
+def get_mc_snapshot(max_age: float | None = None, server: ManagedServer | None = None) -> MinecraftSnapshot:
+    """Возвращает последний снимок состояния сервера без ожидания проверки.
+
+    Если снимок старше max_age (по умолчанию mc.snapshot_max_age), запускает
+    одну фоновую проверку; её результат увидят следующие запросы.
+    """
+    server = server or servers.default()
+    snapshot = server.mc.snapshot
+    if max_age is None:
+        max_age = server.mc.snapshot_max_age
+    task = _background_refresh.get(server.name)
+    if snapshot.age() > max_age and (task is None or task.done()):
+        logger.debug("Watchdog: snapshot of %s is stale, scheduling background refresh", server.name)
+        _background_refresh[server.name] = asyncio.create_task(refresh_mc_server_state(server.mc))
+    return snapshot
+
+
+def _fleet_job() -> Job | None:
+    """Общая задача watchdog'а, если она запущена хотя бы для одного сервера"""
+    return next((server.watchdog.watchdog_job for server in servers.running()), None)
+
+
+def watchdog_stop(server: ManagedServer | None = None):
+    server = server or servers.default()
+
+    server.mc.shutdown_remaining = None # Сброс runtime состояния minecraft сервера
+    server.mc.publish_snapshot()
+
+    job = server.watchdog.watchdog_job
+    if job is not None:
+        server.watchdog.watchdog_job = None
+        logger.info(f"Watchdog disabled for server {server.name}")
+        if _fleet_job() is None:  # задача больше не нужна ни одному серверу
+            job.schedule_removal()
+            logger.info("Removed watchdog job")
+
+
+def subscribe_consumers(application: Application):
+    """Подписывает рассылку уведомлений и метрики на события жизненного цикла серверов"""
+
+    async def notify(event: PhaseChanged | ServerNotice):
+        if event.message is None or replaces(event):
+            return
+        recipients = event.chats
+        if bot_config.live_status and isinstance(event, PhaseChanged):
+            # закреплённое сообщение уже показывает это состояние: отдельное уведомление не нужно
+            recipients = frozenset(chat_id for chat_id in recipients
+                                   if not live_status.shows(event.server.name, chat_id, event.phase))
+        if not recipients:
+            logger.debug("No active chats to notify about %s", event.server.name)
+            return
+        prefix = f"[{event.server.name}] " if servers.is_fleet() else ""
+        # после падения уведомления о сервере объединяются, пока он не станет стабильным;
+        # рассылка идёт в фоне и не задерживает обработку следующих событий
+        unstable = isinstance(event, PhaseChanged) and event.phase == Phase.CRASHED
+        # получатели зафиксированы в событии, а заблокировавшие бота чаты удаляются из подписчиков сервера
+        merger.push(application.bot, event.server.name, event.server.active_chats, event.message, unstable, prefix,
+                    recipients=recipients)
 
-def watchdog_stop():
+    async def count(event: PhaseChanged):
+        metrics.watchdog_transitions.inc(event.server.name, event.previous.value, event.phase.value)
+        if event.phase == Phase.CRASHED:
+            metrics.watchdog_crashes.inc(event.server.name)
+        elif event.phase == Phase.SHUTTING_DOWN:
+            metrics.watchdog_shutdowns.inc(event.server.name)
 
-    mc_server.shutdown_remaining = None # Сброс runtime состояния minecraft сервера
+    events.bus.subscribe(PhaseChanged, notify)
+    events.bus.subscribe(ServerNotice, notify)
+    events.bus.subscribe(PhaseChanged, count)
+    if bot_config.live_status:
+        live_status.attach(application)
 
-    if watchdog_state.watchdog_job is not None:
-        watchdog_state.watchdog_job.schedule_removal()
-        watchdog_state.watchdog_job = None
-        logger.info("Removed watchdog job")
 
 async def watchdog_task(context: ContextTypes.DEFAULT_TYPE):
-    async def notifier(message: str):
-        if not bot_state.active_chats:
-            logger.debug("No active chats to notify")
+    def make_shutdown(server: ManagedServer):
+        async def shutdown_bot():
+            # выключение, уже запущенное через /poweroff, не повторяется
+            await vps_service.get_power_coordinator(server).run(
+                "shutdown", lambda: bot_service.shutdown_all(context.application, server))
+        return shutdown_bot
+
+    # задача просыпается каждые watchdog_min_interval секунд, но проверяет только те серверы,
+    # для которых подошло время по их собственному интервалу
+    now = time.monotonic()
+    due = [server for server in servers.running() if server.watchdog.next_check <= now]
+    await watchdog_fleet_tick(due, make_shutdown)  # уведомления рассылаются подписчиками шины событий
+
+def watchdog_run(job_queue: JobQueue, server: ManagedServer | None = None):
+    server = server or servers.default()
+    if server.watchdog.watchdog_job is None and not bot_state.maintenance_mode:
+        job = _fleet_job()
+        if job is None:
+            job = job_queue.run_repeating(watchdog_task, interval=bot_config.watchdog_min_interval,
+                                          first=10, name="minecraft_watchdog",
+                                          job_kwargs={'misfire_grace_time': 2})
+            logger.info("Started watchdog job")
+        server.watchdog.watchdog_job = job
+        logger.info(f"Watchdog enabled for server {server.name}")
+
+
+def reset_watchdog_state(server: ManagedServer | None = None):
+    (server or servers.default()).watchdog.reset()
+
+
+async def _idle_timer(server: ManagedServer, shutdown_callback, notify_callback, now: float):
+    """Таймер автовыключения пустого сервера: предупреждение за 3 минуты и выключение"""
+    mc, state = server.mc, server.watchdog
+    if state.empty_since is None:
+        state.empty_since = now
+        logger.info(f"Watchdog: server {server.name} is empty, starting shutdown timer")
+    elif now - state.empty_since >= mc.wd_poweroff_cooldown:
+        logger.warning(f"Watchdog: server {server.name} remained empty, cooldown passed — shutting down VPS")
+        await _emit(lifecycle.transition(server, Phase.SHUTTING_DOWN), notify_callback)
+        await shutdown_callback()
+        # после shutdown_all сервер уже в VPS_OFF, тогда переход ничего не делает
+        await _emit(lifecycle.transition(server, Phase.VPS_OFF), notify_callback)
+    else:
+        mc.shutdown_remaining = int(mc.wd_poweroff_cooldown - (now - state.empty_since))
+        logger.info(f"Watchdog: server {server.name} still empty, "
+                    f"{mc.shutdown_remaining} seconds left until shutdown")
+        if mc.shutdown_remaining <= 180 and not state.warning_3m_sent:
+            await _emit(ServerNotice(server, "ℹ️ На сервере никого нет. До выключения осталось 3 минуты."),
+                        notify_callback)
+            state.warning_3m_sent = True  # для однократного вывода
+
+
+def next_check_interval(server: ManagedServer) -> float:
+    """Интервал до следующей проверки сервера.
+
+    Пока сервер не в сети (загрузка VPS, запуск, падение) — опрос с минимальным интервалом.
+    Пустой сервер проверяется ко времени предупреждения и автовыключения.
+    Пока игроки есть, интервал удваивается от mc.check_interval до максимального.
+    """
+    mc, state = server.mc, server.watchdog
+    low, high = bot_config.watchdog_min_interval, bot_config.watchdog_max_interval
+
+    if not mc.online:
+        return low
+    if mc.active_players() == 0:
+        remaining = mc.shutdown_remaining if mc.shutdown_remaining is not None else mc.wd_poweroff_cooldown
+        if not state.warning_3m_sent and remaining > 180:
+            remaining -= 180  # успеть предупредить за 3 минуты
+        return min(max(remaining, low), mc.check_interval)
+    backoff = mc.check_interval * 2 ** max(state.stable_ticks - 1, 0)
+    return min(max(backoff, low), high)
+
+
+async def watchdog_fleet_tick(targets: list[ManagedServer], make_shutdown, make_notifier=None,
+                              concurrency: int | None = None):
+    """Один тик для всех серверов: проверки идут параллельно, не более concurrency одновременно"""
+    if not targets:
+        return
+    probe_limiter = asyncio.Semaphore(concurrency or bot_config.watchdog_probe_concurrency)
+    results = await asyncio.gather(
+        *(watchdog_tick(make_shutdown(server), make_notifier(server) if make_notifier else None,
+                        server, probe_limiter)
+          for server in targets),
+        return_exceptions=True,
+    )
+    for server, result in zip(targets, results):
+        if isinstance(result, BaseException):
+            logger.error(f"Watchdog tick failed for server {server.name}: {result!r}")
+
+
+async def _emit(event: PhaseChanged | ServerNotice | None, notify_callback=None):
+    """Публикует событие в шину; notify_callback (если передан) получает текст уведомления сразу"""
+    if event is None:
+        return
+    events.bus.publish(event)
+    if notify_callback and event.message:
+        await notify_callback(event.message)
+
+
+async def watchdog_tick(shutdown_callback, notify_callback=None, server: ManagedServer | None = None,
+                        probe_limiter: asyncio.Semaphore | None = None):
+    server = server or servers.default()
+    mc, state = server.mc, server.watchdog
+    logger.debug("Watchdog tick for %s.", server.name, extra={"server": server.name, "sample": "watchdog_tick"})
+    tick_started = time.perf_counter()
+    if boot_tracker.is_booting(server.vps):
+        await _emit(lifecycle.transition(server, Phase.BOOTING), notify_callback)
+        if await boot_tracker.poll(server):
+            # VPS ещё загружается: Minecraft не проверяется, следующий опрос назначен трекером
+            metrics.watchdog_ticks.inc(server.name)
+            events.bus.publish(StatusUpdated(server))
             return
-        for chat_id in list(bot_state.active_chats):
-            try:
-                await context.bot.send_message(
-                    chat_id=chat_id,
-                    text=message
-                )
-                logger.debug(f"Watchdog sent notification to {chat_id}: {message!r}")
-            except Exception as e:
-                logger.warning(
-                    f"Failed to send notification "
-                    f"to {chat_id}: {e}"
-                )
-
-    async def shutdown_bot():
-        await bot_service.shutdown_all(context.application)
-
-    await watchdog_tick(shutdown_bot, notifier)
-
-def watchdog_run(job_queue: JobQueue):
-    if watchdog_state.watchdog_job is None and not bot_state.maintenance_mode:
-        watchdog_state.watchdog_job = job_queue.run_repeating(watchdog_task, interval=60,
-                                                                             first=10, name="minecraft_watchdog",
-                                                                             job_kwargs={'misfire_grace_time': 2})
-        logger.info("Started watchdog job")
-
-
-def reset_watchdog_state():
-    watchdog_state.reset()
-
-
-async def watchdog_tick(shutdown_callback, notify_callback=None):
-    logger.debug("Watchdog tick.")
-    await refresh_mc_server_state()
+    async with probe_limiter or contextlib.nullcontext():
+        probe_started = time.perf_counter()
+        await refresh_mc_server_state(mc)
+        metrics.probe_duration.observe(time.perf_counter() - probe_started, server.name)
+    metrics.watchdog_ticks.inc(server.name)
+    player_stats.record(server)
     now = time.time()
 
-    if mc_server.online:
-        watchdog_state.crashed = 0
-        if watchdog_state.is_fresh_start:
-            if notify_callback:
-                await notify_callback(f"✅ Minecraft сервер доступен для подключения."
-                                      f"\nВерсия сервера: {mc_server.version_number}")
-            watchdog_state.is_fresh_start = False
-
-    if mc_server.players_online == 0:
-        if watchdog_state.empty_since is None:
-            watchdog_state.empty_since = now
-            logger.info("Watchdog: server is empty, starting shutdown timer")
-        elif now - watchdog_state.empty_since >= mc_server.wd_poweroff_cooldown:
-            logger.warning("Watchdog: server remained empty, cooldown passed — shutting down VPS")
-            if notify_callback:
-                await notify_callback(f"🔴 Сервер выключен после "
-                                      f"{mc_server.wd_poweroff_cooldown // 60} минут неактивности.")
-            await shutdown_callback()
-            watchdog_state.empty_since = None  # Reset after shutdown
-            watchdog_state.warning_3m_sent = False  # сбрасываем флаг после выключения
-            watchdog_state.is_fresh_start = True # следующий запуск будет новым
-            mc_server.shutdown_remaining = None
-        else:
-            mc_server.shutdown_remaining = int(mc_server.wd_poweroff_cooldown - (now - watchdog_state.empty_since))
-            logger.info(f"Watchdog: server still empty, {mc_server.shutdown_remaining} seconds left until shutdown")
-            if mc_server.shutdown_remaining <= 180 and notify_callback and not watchdog_state.warning_3m_sent:
-                await notify_callback(f"ℹ️ На сервере никого нет. До выключения осталось 3 минуты.")
-                watchdog_state.warning_3m_sent = True  # для однократного вывода
-
-    elif mc_server.players_online is not None:
-        if watchdog_state.empty_since is not None:
-            logger.info("Watchdog: players joined — resetting shutdown timer")
-            watchdog_state.empty_since = None  # Reset timer because players are online
-            mc_server.shutdown_remaining = None
-            watchdog_state.warning_3m_sent = False
-    else: # случай с падением minecraft или первым запуском.
-        if not watchdog_state.is_fresh_start:
-            logger.warning("Watchdog: looks like minecraft server is crashed or unreachable.")
-        else:
-            logger.info("Watchdog: Minecraft server is offline and probably starting.")
-        if notify_callback and watchdog_state.crashed > 1 and not watchdog_state.is_fresh_start:
-            await notify_callback("⚠️ Minecraft сервер временно недоступен или аварийно завершил работу.")
-            watchdog_state.warning_3m_sent = False
-            watchdog_state.is_fresh_start = True # для вывода уведомления о запуске
-            mc_server.shutdown_remaining = None
-        elif notify_callback and watchdog_state.crashed == 0 and watchdog_state.is_fresh_start:
-            await notify_callback("⏳ Minecraft сервер запускается...")
-        watchdog_state.crashed += 1
-        watchdog_state.empty_since = None #  сброс таймера до корректного восстановления работы
+    players = mc.active_players()  # игроки из ignored_players не мешают автовыключению
+    phase = lifecycle.observe(server, players)
+    if mc.online:
+        state.crashed = 0
+    elif lifecycle.current_phase(state) in lifecycle.ONLINE or phase == Phase.CRASHED:
+        logger.warning(f"Watchdog: looks like minecraft server {server.name} is crashed or unreachable.")
+    else:
+        logger.info(f"Watchdog: Minecraft server {server.name} is offline and probably starting.")
+    await _emit(lifecycle.transition(server, phase), notify_callback)
+
+    if not mc.online:  # падение (возможно, ещё не подтверждённое) или запуск
+        state.crashed += 1
+        state.empty_since = None  # сброс таймера до корректного восстановления работы
+    elif phase == Phase.ONLINE_IDLE:
+        await _idle_timer(server, shutdown_callback, notify_callback, now)
+    elif state.empty_since is not None:
+        logger.info(f"Watchdog: players joined {server.name} — resetting shutdown timer")
+        state.empty_since = None  # Reset timer because players are online
+        mc.shutdown_remaining = None
+        state.warning_3m_sent = False
+
+    if players:
+        state.stable_ticks += 1
+    else:
+        state.stable_ticks = 0
+    state.interval = next_check_interval(server)
+    state.next_check = time.monotonic() + state.interval
+    logger.debug("Watchdog: next check of %s in %.0f seconds", server.name, state.interval,
+                 extra={"server": server.name, "sample": "watchdog_tick"})
+
+    mc.publish_snapshot()
+    events.bus.publish(StatusUpdated(server))
+    if mc.last_resolve_duration is not None and logger.isEnabledFor(logging.DEBUG):
+        tick_duration = time.perf_counter() - tick_started
+        logger.debug("Watchdog: tick for %s took %.1f ms, DNS resolve %.1f ms (%.0f%%), "
+                     "resolver cache hits %d, misses %d",
+                     server.name, tick_duration * 1000, mc.last_resolve_duration * 1000,
+                     mc.last_resolve_duration / tick_duration * 100, resolver.stats.hits, resolver.stats.misses,
+                     extra={"server": server.name, "latency_ms": round(tick_duration * 1000, 1),
+                            "sample": "watchdog_tick"})
@@ -1,24 +1,80 @@
 import os
-from dataclasses import dataclass
+import time
+from dataclasses import dataclass, field
+
+
+@dataclass(frozen=True)
+class MinecraftSnapshot:
+    """Неизменяемый снимок состояния Minecraft сервера, публикуемый watchdog'ом"""
+    online: bool = False
+    players_online: int | None = None
+    version: str = ""
+    version_number: str = ""
+    shutdown_remaining: int | None = None
+    latency_ms: float | None = None
+    player_names: tuple[str, ...] | None = None  # известны только при проверке по Query
+    taken_at: float = 0  # time.monotonic() последней проверки, 0 — проверок ещё не было
+
+    def age(self) -> float:
+        return time.monotonic() - self.taken_at if self.taken_at else float("inf")
+
 
 @dataclass
 class MinecraftServer:
     server_address: str = os.getenv("SERVER_ADDRESS")  # или IP
     query_port: int = 25565
+    srv_lookup: bool = False  # искать SRV запись _minecraft._tcp для адреса
+    # "single" — одно соединение, "legacy" — проверка порта и отдельный status ping,
+    # "query" — Query протокол (UDP) со списком игроков, при недоступности — status ping
+    probe_mode: str = "single"
+    query_udp_port: int | None = None  # порт Query (query.port), по умолчанию совпадает с портом сервера
+    # игроки, которые не мешают автовыключению (боты, AFK аккаунты); учитываются, если известны имена
+    ignored_players: frozenset[str] = field(default_factory=lambda: frozenset(
+        name.strip().lower() for name in os.getenv("IGNORED_PLAYERS", "").split(",") if name.strip()))
+    probe_deadline: float = 6  # общее время на проверку, секунд
     check_interval: int = 60  # секунд между проверками
     wd_poweroff_cooldown: int = 10 * 60  # 10 минут
+    snapshot_max_age: int = 90  # снимок старше этого значения обновляется в фоне
     version: str = ""
     version_number: str = ""
     # runtime state
     online: bool = False
     players_online: int | None = None
-    last_check: float | None = None # Пока не используется
+    player_names: tuple[str, ...] | None = None
+    last_check: float | None = None # time.monotonic() последней проверки
     shutdown_remaining: int | None = None # Осталось до перезапуска
+    last_probe_duration: float | None = None # Длительность последней проверки, секунд
+    last_resolve_duration: float | None = None # Из неё на DNS, секунд
+    last_latency_ms: float | None = None # Задержка ответа сервера
+    snapshot: MinecraftSnapshot = field(default_factory=MinecraftSnapshot)
+
+    def publish_snapshot(self) -> MinecraftSnapshot:
+        """Фиксирует текущее runtime состояние в новом снимке для чтения хендлерами"""
+        self.snapshot = MinecraftSnapshot(
+            online=self.online,
+            players_online=self.players_online,
+            version=self.version,
+            version_number=self.version_number,
+            shutdown_remaining=self.shutdown_remaining,
+            latency_ms=self.last_latency_ms,
+            player_names=self.player_names,
+            taken_at=self.last_check or 0,
+        )
+        return self.snapshot
+
+    def active_players(self) -> int | None:
+        """Число игроков для решения об автовыключении: без ignored_players"""
+        if self.players_online is None or not self.ignored_players or self.player_names is None:
+            return self.players_online
+        ignored = sum(1 for name in self.player_names if name.lower() in self.ignored_players)
+        return max(self.players_online - ignored, 0)
 
     def reset_runtime(self):
         self.online = False
         self.players_online = None
+        self.player_names = None
         self.shutdown_remaining = None
         self.last_check = None
+        self.publish_snapshot()
 
-mc_server = MinecraftServer() # Общий shared instance Minecraft сервера
\ No newline at end of file
+mc_server = MinecraftServer() # Общий shared instance Minecraft сервера
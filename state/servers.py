@@ -0,0 +1,119 @@
+"""Реестр серверов: каждая запись — пара Minecraft сервер + VPS со своим состоянием"""
+import asyncio
+import json
+import logging
+from dataclasses import dataclass, field
+from config.config import bot_config
+from state.bot_state import bot_state
+from state.minecraft_server import MinecraftServer, mc_server
+from state.vps_state import VPSState, vps_state
+from state.watchdog_state import WatchdogState, watchdog_state
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SERVER_NAME = "default"
+
+
+@dataclass
+class ManagedServer:
+    name: str
+    mc: MinecraftServer
+    vps: VPSState = field(default_factory=VPSState)
+    watchdog: WatchdogState = field(default_factory=WatchdogState)
+    api_url: str | None = None  # None — API_URL из .env
+    api_token: str | None = None  # None — API_TOKEN из .env
+    active_chats: set[int] = field(default_factory=set)  # Чаты, получающие уведомления об этом сервере
+    # Держится, пока выполняется действие с питанием VPS (см. vps_service.PowerCoordinator)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock, repr=False, compare=False)
+
+
+class ServerRegistry:
+    """Серверы по имени. Первый сервер — сервер по умолчанию для команд без аргумента"""
+
+    def __init__(self, servers: list[ManagedServer]):
+        if not servers:
+            raise ValueError("Server registry must contain at least one server")
+        self._servers = {server.name: server for server in servers}
+
+    def __iter__(self):
+        return iter(self._servers.values())
+
+    def __len__(self):
+        return len(self._servers)
+
+    def get(self, name: str) -> ManagedServer | None:
+        return self._servers.get(name.lower())
+
+    def default(self) -> ManagedServer:
+        return next(iter(self._servers.values()))
+
+    def names(self) -> list[str]:
+        return list(self._servers)
+
+    def running(self) -> list[ManagedServer]:
+        """Серверы, для которых запущен watchdog"""
+        return [server for server in self if server.watchdog.watchdog_job is not None]
+
+    def is_fleet(self) -> bool:
+        return len(self._servers) > 1
+
+
+def _default_server() -> ManagedServer:
+    # Сервер из .env использует общие инстансы состояния, чтобы старый код продолжал работать
+    return ManagedServer(name=DEFAULT_SERVER_NAME, mc=mc_server, vps=vps_state,
+                         watchdog=watchdog_state, active_chats=bot_state.active_chats)
+
+
+def load_servers(path: str = bot_config.servers_file) -> list[ManagedServer]:
+    """Читает описание серверов из JSON файла вида
+    {"servers": [{"name": "main", "address": "mc.example.com", "port": 25565,
+                  "api_url": "...", "api_token": "...", "poweroff_cooldown": 600}]}
+    """
+    try:
+        with open(path, "r") as f:
+            entries = json.load(f)["servers"]
+    except FileNotFoundError:
+        logger.debug("Servers file %s not found. Using single server from environment.", path)
+        return [_default_server()]
+    except (json.JSONDecodeError, KeyError, TypeError) as e:
+        logger.error(f"Servers file {path} is invalid ({e!r}). Using single server from environment.")
+        return [_default_server()]
+
+    if not entries:
+        logger.error(f"Servers file {path} has no servers. Using single server from environment.")
+        return [_default_server()]
+
+    servers = []
+    for i, entry in enumerate(entries):
+        name = str(entry.get("name") or "").strip().lower() if isinstance(entry, dict) else ""
+        if not name:
+            logger.error(f"Server #{i + 1} in {path} has no name, skipping it")
+            continue
+        if any(server.name == name for server in servers):
+            logger.error(f"Server {name} is listed in {path} more than once, skipping the duplicate")
+            continue
+        if not servers:
+            server = _default_server()
+            server.name = name
+        else:
+            server = ManagedServer(name=name, mc=MinecraftServer())
+        server.mc.server_address = entry.get("address", server.mc.server_address)
+        server.mc.query_port = int(entry.get("port", server.mc.query_port))
+        server.mc.srv_lookup = bool(entry.get("srv", server.mc.srv_lookup))
+        server.mc.probe_mode = entry.get("probe_mode", server.mc.probe_mode)
+        if "query_udp_port" in entry:
+            server.mc.query_udp_port = int(entry["query_udp_port"])
+        if "ignored_players" in entry:
+            server.mc.ignored_players = frozenset(str(name).lower() for name in entry["ignored_players"])
+        server.mc.wd_poweroff_cooldown = int(entry.get("poweroff_cooldown", server.mc.wd_poweroff_cooldown))
+        server.api_url = entry.get("api_url")
+        server.api_token = entry.get("api_token")
+        servers.append(server)
+    if not servers:
+        logger.error(f"Servers file {path} has no valid servers. Using single server from environment.")
+        return [_default_server()]
+    logger.info(f"Loaded {len(servers)} server(s): {', '.join(s.name for s in servers)}")
+    return servers
+
+
+servers = ServerRegistry(load_servers()) # Общий реестр серверов
@@ -0,0 +1,14 @@
+"""Датакласс для хранения состояния VPS сервера"""
+from dataclasses import dataclass, field
+
+@dataclass
+class VPSState:
+    # Время последнего успешного запуска VPS (в секундах с эпохи)
+    last_poweron_time: float = 0
+    last_poweroff_time: float = 0
+    # Загрузка после PowerOn (см. services.boot_tracker), 0 — не отслеживается
+    boot_started: float = 0
+    boot_vps_ready: float = 0  # когда провайдер сообщил, что VPS запущен
+    boot_durations: list[float] = field(default_factory=list)  # секунд от PowerOn до доступности Minecraft
+
+vps_state = VPSState() # Состояние VPS сервера по умолчанию
@@ -0,0 +1,37 @@
+"""Датакласс для хранения состояния watchdog'а Minecraft сервера"""
+from dataclasses import dataclass, fields
+from enum import Enum
+from typing import Optional
+from telegram.ext import Job
+
+
+class Phase(str, Enum):
+    """Состояние жизненного цикла сервера, переходы — в services.lifecycle"""
+    VPS_OFF = "vps_off"
+    BOOTING = "booting"  # PowerOn отправлен, VPS загружается
+    MC_STARTING = "mc_starting"  # VPS работает, Minecraft ещё не отвечает
+    ONLINE_ACTIVE = "online_active"  # на сервере есть игроки
+    ONLINE_IDLE = "online_idle"  # сервер пуст, идёт таймер автовыключения
+    CRASHED = "crashed"  # Minecraft перестал отвечать
+    SHUTTING_DOWN = "shutting_down"  # автовыключение по таймеру
+
+
+@dataclass
+class WatchdogState:
+    empty_since: float | None = None  # Когда сервер стал пустым
+    warning_3m_sent: bool = False  # Предупреждение за 3 минуты до отключения
+    is_fresh_start: bool = True
+    crashed: int = 0  # Сервер упал или ещё не запустился.
+    stable_ticks: int = 0  # Сколько проверок подряд на сервере есть игроки
+    interval: float = 0  # Текущий интервал между проверками, секунд
+    next_check: float = 0  # time.monotonic() следующей проверки
+    boot_polls: int = 0  # запросов статуса VPS во время текущей загрузки
+    recent_probes: tuple[bool, ...] = ()  # ответил ли Minecraft на последние flap_window проверок
+    phase: Phase | None = None  # None — ещё не определено, выводится из флагов выше
+    watchdog_job: Optional[Job] = None
+
+    def reset(self):
+        for f in fields(self):
+            setattr(self, f.name, f.default)
+
+watchdog_state = WatchdogState() # Состояние watchdog'а сервера по умолчанию
@@ -0,0 +1,129 @@
+import asyncio
+import dataclasses
+import time
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from benchmarks.fake_vps import FakeVPSProvider
+from integrations import api
+
+
+@pytest_asyncio.fixture
+async def provider(monkeypatch):
+    calls = {"status": 0, "action": []}
+
+    async def status(request):
+        calls["status"] += 1
+        return web.json_response({"IsPowerOn": True})
+
+    async def action(request):
+        calls["action"].append((await request.json())["Type"])
+        return web.json_response({"State": "InProgress"})
+
+    app = web.Application()
+    app.router.add_get("/", status)
+    app.router.add_post("/Action", action)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    monkeypatch.setattr(api, "API_URL", f"http://127.0.0.1:{runner.addresses[0][1]}")
+    yield calls
+    await api.close_session()
+    await runner.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_requests_share_session(provider):
+    await api.open_session()
+    session = api._session
+
+    assert (await api.get_vps_server_status())["IsPowerOn"] is True
+    assert (await api.api_request("PowerOn"))["State"] == "InProgress"
+
+    assert api._session is session
+    assert provider == {"status": 1, "action": ["PowerOn"]}
+
+
+@pytest.mark.asyncio
+async def test_session_reopens_after_close(provider):
+    await api.open_session()
+    await api.close_session()
+    assert api._session is None
+
+    await api.get_vps_server_status()
+    assert api._session is not None and not api._session.closed
+
+
+@pytest_asyncio.fixture
+async def faulty(monkeypatch):
+    """Заглушка провайдера со сбоями и короткими сроками, чтобы тесты шли быстро"""
+    monkeypatch.setattr(api, "bot_config", dataclasses.replace(
+        api.bot_config, api_deadline=1, api_action_deadline=1, api_attempt_timeout=0.2, api_retries=3,
+        api_backoff_base=0.01, api_backoff_max=0.05, api_breaker_threshold=3, api_breaker_reset_timeout=0.3))
+    monkeypatch.setattr(api, "_breakers", {})
+    provider = FakeVPSProvider(is_power_on=True)
+    provider.hang_time = 1
+    monkeypatch.setattr(api, "API_URL", await provider.start())
+    yield provider
+    await api.close_session()
+    await provider.stop()
+
+
+@pytest.mark.asyncio
+async def test_status_is_retried_on_transient_errors(faulty):
+    faulty.inject(503, "reset", "hang")
+
+    result = await api.get_vps_server_status()
+
+    assert result["IsPowerOn"] is True
+    assert faulty.requests == 3  # зависший запрос брошен по сроку попытки и не учтён
+
+
+@pytest.mark.asyncio
+async def test_status_deadline_bounds_latency(faulty):
+    faulty.inject(*["hang"] * 10)
+
+    started = time.monotonic()
+    result = await api.get_vps_server_status()
+
+    assert "error" in result
+    assert time.monotonic() - started < 1.2
+
+
+@pytest.mark.asyncio
+async def test_poweron_is_not_repeated_if_it_may_have_been_executed(faulty):
+    faulty.is_power_on = False
+    faulty.inject(503)
+    assert "error" in await api.api_request("PowerOn")
+
+    faulty.inject("hang")
+    assert "error" in await api.api_request("PowerOn")
+    assert faulty.actions == []
+
+
+@pytest.mark.asyncio
+async def test_poweron_is_retried_when_rejected_before_execution(faulty):
+    faulty.is_power_on = False
+    faulty.inject(429)
+
+    assert (await api.api_request("PowerOn"))["State"] == "InProgress"
+    assert faulty.actions == ["PowerOn"]
+
+
+@pytest.mark.asyncio
+async def test_breaker_fails_fast_and_recovers(faulty):
+    faulty.inject(*[500] * 12)  # три вызова по четыре попытки
+    for _ in range(3):
+        assert "error" in await api.get_vps_server_status()
+    requests = faulty.requests
+
+    started = time.monotonic()
+    result = await api.get_vps_server_status()
+    assert result.get("circuit_open") is True
+    assert time.monotonic() - started < 0.05
+    assert faulty.requests == requests
+
+    await asyncio.sleep(0.3)
+    assert (await api.get_vps_server_status())["IsPowerOn"] is True
+    assert api.get_breaker().state == "closed"
@@ -0,0 +1,40 @@
+import json
+import pytest
+from services.auth_store import AuthStore
+
+
+@pytest.mark.asyncio
+async def test_changes_survive_reopen(tmp_path):
+    path = str(tmp_path / "auth.db")
+    store = AuthStore(path)
+    await store.add_user(123, "alice")
+    await store.add_user(456)
+    await store.add_group(-100123)
+    await store.remove_user(456)
+    store.close()
+
+    reopened = AuthStore(path)
+    assert reopened.load() == ({123: "alice"}, {-100123})
+    reopened.close()
+
+
+def test_json_imported_once(tmp_path):
+    json_path = tmp_path / "authorized.json"
+    json_path.write_text(json.dumps({"users": [{"id": 1, "username": "bob"}], "groups": [-1]}))
+    store = AuthStore(str(tmp_path / "auth.db"))
+
+    assert store.import_json(str(json_path)) is True
+    json_path.write_text(json.dumps({"users": [{"id": 2}], "groups": []}))
+    assert store.import_json(str(json_path)) is False
+    assert store.load() == ({1: "bob"}, {-1})
+    store.close()
+
+
+def test_corrupt_json_not_imported(tmp_path):
+    json_path = tmp_path / "authorized.json"
+    json_path.write_text("{broken")
+    store = AuthStore(str(tmp_path / "auth.db"))
+
+    assert store.import_json(str(json_path)) is False
+    assert store.load() == ({}, set())
+    store.close()
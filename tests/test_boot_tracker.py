@@ -0,0 +1,108 @@
+import time
+import pytest
+from config.config import bot_config
+from services import boot_tracker, vps_service, watchdog
+from state.minecraft_server import MinecraftServer
+from state.servers import ManagedServer
+
+
+@pytest.fixture
+def booting_server():
+    server = ManagedServer(name="booting", mc=MinecraftServer())
+    server.vps.boot_started = time.time() - 30
+    server.vps.boot_durations = [90, 120, 100]
+    return server
+
+
+def fake_status(monkeypatch, responses: list[dict]):
+    calls = []
+
+    async def get_vps_status(max_age=None, allow_stale=True, server=None):
+        calls.append(max_age)
+        return responses[min(len(calls), len(responses)) - 1]
+
+    monkeypatch.setattr(vps_service, "get_vps_status", get_vps_status)
+    return calls
+
+
+def fake_probe(monkeypatch, online: bool):
+    probes = []
+
+    async def refresh(mc=None):
+        probes.append(mc)
+        mc.online = online
+        mc.players_online = 0 if online else None
+
+    monkeypatch.setattr(watchdog, "refresh_mc_server_state", refresh)
+    return probes
+
+
+async def noop():
+    pass
+
+
+@pytest.mark.asyncio
+async def test_minecraft_is_not_probed_while_vps_boots(monkeypatch, booting_server):
+    calls = fake_status(monkeypatch, [{"IsPowerOn": True, "State": "InProgress"}])
+    probes = fake_probe(monkeypatch, online=False)
+
+    intervals = []
+    for _ in range(4):
+        await watchdog.watchdog_tick(noop, None, booting_server)
+        intervals.append(booting_server.watchdog.interval)
+
+    assert len(calls) == 4 and calls[0] == 0  # статус запрашивается мимо кеша
+    assert probes == []
+    assert intervals == sorted(intervals) and intervals[0] < intervals[-1]
+    assert intervals[-1] <= max(bot_config.boot_poll_max_interval, bot_config.watchdog_min_interval)
+
+
+@pytest.mark.asyncio
+async def test_running_vps_starts_probes_and_pushes_eta(monkeypatch, booting_server):
+    fake_status(monkeypatch, [{"IsPowerOn": True, "State": "Running"}])
+    probes = fake_probe(monkeypatch, online=False)
+    messages = []
+
+    async def notify(message):
+        messages.append(message)
+
+    await watchdog.watchdog_tick(noop, notify, booting_server)
+
+    assert len(probes) == 1
+    assert booting_server.vps.boot_vps_ready > 0
+    # одно уведомление о переходе BOOTING -> MC_STARTING вместо двух подряд
+    assert messages == ["🖥 VPS запущен, Minecraft сервер запускается, осталось примерно 1 мин."]
+
+
+@pytest.mark.asyncio
+async def test_boot_duration_is_recorded_when_minecraft_answers(monkeypatch, booting_server):
+    booting_server.vps.boot_vps_ready = time.time()
+    fake_probe(monkeypatch, online=True)
+
+    await watchdog.watchdog_tick(noop, None, booting_server)
+
+    assert booting_server.vps.boot_started == 0
+    assert len(booting_server.vps.boot_durations) == 4
+    assert booting_server.vps.boot_durations[-1] == pytest.approx(30, abs=1)
+    assert boot_tracker.eta(booting_server.vps) is None
+
+
+@pytest.mark.asyncio
+async def test_tracking_gives_up_after_timeout(monkeypatch, booting_server):
+    booting_server.vps.boot_started = time.time() - bot_config.boot_timeout - 1
+    fake_status(monkeypatch, [{"IsPowerOn": False, "State": "Stopped"}])
+    probes = fake_probe(monkeypatch, online=False)
+
+    await watchdog.watchdog_tick(noop, None, booting_server)
+
+    assert len(probes) == 1
+    assert not boot_tracker.is_booting(booting_server.vps)
+
+
+def test_eta_uses_median_of_past_boots():
+    server = ManagedServer(name="eta", mc=MinecraftServer())
+    assert boot_tracker.eta(server.vps) is None
+    server.vps.boot_durations = [60, 300, 90]
+    server.vps.boot_started = 1000
+    assert boot_tracker.eta(server.vps, now=1030) == 60
+    assert boot_tracker.eta(server.vps, now=2000) == 0
@@ -1,3 +1,4 @@
+import pytest
 import services.bot_service as bot_service
 
 
@@ -16,4 +17,17 @@ def test_is_authorized_unknown():
     bot_service.authorized_users = {}
     bot_service.authorized_groups = set()
 
-    assert bot_service.is_authorized(999999) is False
\ No newline at end of file
+    assert bot_service.is_authorized(999999) is False
+
+@pytest.mark.asyncio
+async def test_auth_data_is_loaded_from_store(tmp_path):
+    db_path = str(tmp_path / "authorized.db")
+    bot_service.load_auth_data(db_path, str(tmp_path / "authorized.json"))
+    await bot_service.add_authorized_user(123, "alice")
+    await bot_service.add_authorized_group(-100123)
+    bot_service.close_auth_data()
+
+    bot_service.load_auth_data(db_path, str(tmp_path / "authorized.json"))
+    assert bot_service.authorized_users == {123: "alice"}
+    assert bot_service.authorized_groups == {-100123}
+    bot_service.close_auth_data()
@@ -0,0 +1,198 @@
+import asyncio
+import dataclasses
+from types import SimpleNamespace
+import pytest
+from telegram.error import Forbidden
+from services import events, lifecycle, live_status, watchdog
+from services.events import EventBus, PhaseChanged, ServerNotice
+from services.live_status import LiveStatus
+from services.notifications import Broadcaster, NotificationMerger
+from state.minecraft_server import MinecraftServer
+from state.servers import ManagedServer
+from state.watchdog_state import Phase
+
+
+@pytest.fixture
+def bus(monkeypatch):
+    bus = EventBus()
+    monkeypatch.setattr(events, "bus", bus)
+    return bus
+
+
+@pytest.fixture
+def server():
+    server = ManagedServer(name="lifecycle", mc=MinecraftServer())
+    server.active_chats.add(100)
+    return server
+
+
+def fake_probe(monkeypatch, results: list[int | None]):
+    """Проверки возвращают по очереди число игроков; None — сервер не отвечает"""
+    results = iter(results)
+
+    async def refresh(mc=None):
+        players = next(results)
+        mc.online = players is not None
+        mc.players_online = players
+
+    monkeypatch.setattr(watchdog, "refresh_mc_server_state", refresh)
+
+
+async def noop():
+    pass
+
+
+@pytest.mark.asyncio
+async def test_transitions_are_published_once(monkeypatch, bus, server):
+    received = []
+
+    async def handler(event: PhaseChanged):
+        received.append((event.previous, event.phase, event.message is not None))
+
+    bus.subscribe(PhaseChanged, handler)
+    fake_probe(monkeypatch, [None, None, 2, 2, 0, None, None, None])
+    for _ in range(8):
+        await watchdog.watchdog_tick(noop, None, server)
+    await bus.drain()
+
+    assert received == [
+        (Phase.VPS_OFF, Phase.MC_STARTING, True),
+        (Phase.MC_STARTING, Phase.ONLINE_ACTIVE, True),
+        (Phase.ONLINE_ACTIVE, Phase.ONLINE_IDLE, False),
+        (Phase.ONLINE_IDLE, Phase.CRASHED, True),  # падение подтверждено третьей неудачной проверкой
+    ]
+
+
+@pytest.mark.asyncio
+async def test_idle_shutdown_goes_through_shutting_down(monkeypatch, bus, server):
+    phases, notices = [], []
+
+    async def on_phase(event: PhaseChanged):
+        phases.append(event.phase)
+
+    async def on_notice(event: ServerNotice):
+        notices.append(event.message)
+
+    bus.subscribe(PhaseChanged, on_phase)
+    bus.subscribe(ServerNotice, on_notice)
+    fake_probe(monkeypatch, [0, 0, 0])
+    server.watchdog.is_fresh_start = False
+    server.watchdog.phase = Phase.ONLINE_IDLE
+
+    server.watchdog.empty_since = 1  # таймер истёк
+    await watchdog.watchdog_tick(noop, None, server)
+    await bus.drain()
+
+    assert phases == [Phase.SHUTTING_DOWN, Phase.VPS_OFF]
+    assert notices == []
+    assert server.watchdog.is_fresh_start and server.watchdog.empty_since is None
+
+
+@pytest.mark.asyncio
+async def test_event_keeps_recipients_after_chats_are_cleared(bus, server):
+    sent = []
+
+    async def handler(event: PhaseChanged):
+        sent.append(event.chats)
+
+    bus.subscribe(PhaseChanged, handler)
+    bus.publish(lifecycle.transition(server, Phase.SHUTTING_DOWN))
+    server.active_chats.clear()  # shutdown_all очищает подписки раньше, чем сработает подписчик
+    await bus.drain()
+
+    assert sent == [frozenset({100})]
+
+
+@pytest.mark.asyncio
+async def test_failing_subscriber_does_not_block_others(bus, server):
+    received = []
+
+    async def broken(event):
+        raise RuntimeError("boom")
+
+    async def slow(event):
+        await asyncio.sleep(0.01)
+        received.append(event.message)
+
+    bus.subscribe(ServerNotice, broken)
+    bus.subscribe(ServerNotice, slow)
+    bus.publish(ServerNotice(server, "первое"))
+    bus.publish(ServerNotice(server, "второе"))
+    bus.publish(PhaseChanged(server, Phase.VPS_OFF, Phase.BOOTING))  # нет подписчиков — не в очереди
+    await bus.close()
+
+    assert received == ["первое", "второе"]
+
+
+class ChatBot:
+    def __init__(self, blocked=()):
+        self.calls = []
+        self.blocked = set(blocked)
+
+    async def send_message(self, chat_id, text, disable_notification=False):
+        if chat_id in self.blocked:
+            raise Forbidden("Forbidden: bot was blocked by the user")
+        self.calls.append(("send", chat_id, text))
+        return SimpleNamespace(message_id=len(self.calls))
+
+    async def edit_message_text(self, text, chat_id, message_id):
+        self.calls.append(("edit", chat_id, text))
+
+    async def pin_chat_message(self, chat_id, message_id, disable_notification=False):
+        self.calls.append(("pin", chat_id, message_id))
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("live", [False, True])
+async def test_consumers_deliver_notifications(monkeypatch, bus, server, live):
+    fast = Broadcaster(concurrency=5, global_rate=10_000, private_rate=10_000, group_rate=10_000)
+    config = dataclasses.replace(watchdog.bot_config, live_status=live)
+    monkeypatch.setattr(watchdog, "bot_config", config)
+    monkeypatch.setattr(live_status, "bot_config", config)
+    monkeypatch.setattr(live_status, "broadcaster", fast)
+    monkeypatch.setattr(watchdog, "live_status", LiveStatus(delay=0))
+    monkeypatch.setattr(watchdog, "merger", NotificationMerger(0, fast))
+    bot = ChatBot()
+    watchdog.subscribe_consumers(SimpleNamespace(bot=bot))
+
+    bus.publish(PhaseChanged(server, Phase.VPS_OFF, Phase.MC_STARTING, "⏳ запускается"))
+    bus.publish(PhaseChanged(server, Phase.ONLINE_IDLE, Phase.CRASHED, "⚠️ недоступен"))
+    await bus.drain()
+    await asyncio.sleep(0.05)
+    await fast.close()
+    await watchdog.live_status.close()
+
+    sent = [text for call, _, text in bot.calls if call == "send"]
+    if live:
+        # запуск показан в закреплённом сообщении, о падении приходит отдельное уведомление
+        assert "⏳ запускается" not in sent and "⚠️ недоступен" in sent
+        assert any(call == "pin" for call, *_ in bot.calls)
+    else:
+        assert sent == ["⏳ запускается", "⚠️ недоступен"]
+
+
+@pytest.mark.asyncio
+async def test_blocked_chats_are_removed_from_subscribers(monkeypatch, bus, server):
+    fast = Broadcaster(concurrency=5, global_rate=10_000, private_rate=10_000, group_rate=10_000)
+    monkeypatch.setattr(watchdog, "bot_config", dataclasses.replace(watchdog.bot_config, live_status=False))
+    monkeypatch.setattr(watchdog, "merger", NotificationMerger(0, fast))
+    server.active_chats.add(200)
+    bot = ChatBot(blocked={200})
+    watchdog.subscribe_consumers(SimpleNamespace(bot=bot))
+
+    bus.publish(PhaseChanged(server, Phase.VPS_OFF, Phase.MC_STARTING, "⏳ запускается"))
+    await bus.drain()
+    await fast.close()
+
+    assert [(chat_id, text) for _, chat_id, text in bot.calls] == [(100, "⏳ запускается")]
+    assert server.active_chats == {100}
+
+
+def test_legacy_state_is_mapped_to_phase():
+    server = ManagedServer(name="legacy", mc=MinecraftServer())
+    state = server.watchdog
+    assert lifecycle.current_phase(state) == Phase.VPS_OFF
+    state.is_fresh_start, state.empty_since = False, 123.0
+    assert lifecycle.current_phase(state) == Phase.ONLINE_IDLE
+    state.phase = "online_active"  # значение из сохранённого JSON
+    assert lifecycle.current_phase(state) == Phase.ONLINE_ACTIVE
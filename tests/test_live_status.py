@@ -0,0 +1,175 @@
+import asyncio
+import dataclasses
+import time
+from types import SimpleNamespace
+import pytest
+from telegram.error import BadRequest
+from services import events, live_status, watchdog
+from services.events import EventBus, PhaseChanged, ServerNotice, StatusUpdated
+from services.live_status import LiveStatus
+from services.notifications import Broadcaster
+from state.minecraft_server import MinecraftServer
+from state.servers import ManagedServer
+from state.watchdog_state import Phase
+
+
+class FakeBot:
+    def __init__(self, deleted=()):
+        self.calls = []
+        self.deleted = set(deleted)  # сообщения, удалённые из чата
+        self._next_id = 100
+
+    async def send_message(self, chat_id, text, disable_notification=False):
+        self._next_id += 1
+        self.calls.append(("send", chat_id, text))
+        return SimpleNamespace(message_id=self._next_id)
+
+    async def edit_message_text(self, text, chat_id, message_id):
+        if message_id in self.deleted:
+            raise BadRequest("Message to edit not found")
+        self.calls.append(("edit", chat_id, text))
+
+    async def pin_chat_message(self, chat_id, message_id, disable_notification=False):
+        self.calls.append(("pin", chat_id, message_id))
+
+
+@pytest.fixture(autouse=True)
+def fast_limits(monkeypatch):
+    monkeypatch.setattr(live_status, "broadcaster",
+                        Broadcaster(concurrency=5, global_rate=10_000, private_rate=10_000, group_rate=10_000))
+
+
+@pytest.fixture
+def server():
+    server = ManagedServer(name="live", mc=MinecraftServer())
+    server.active_chats.update({1, 2})
+    server.watchdog.phase = Phase.ONLINE_ACTIVE
+    server.mc.online, server.mc.players_online = True, 2
+    server.mc.publish_snapshot()
+    return server
+
+
+@pytest.mark.asyncio
+async def test_message_is_edited_only_when_text_changes(server):
+    bot, live = FakeBot(), LiveStatus(delay=0)
+
+    await live.flush(bot, server, {1})
+    server.mc.players_online = 3  # число игроков обновляется только со сменой состояния и по /status
+    await live.flush(bot, server, {1})
+    server.watchdog.phase, server.watchdog.empty_since = Phase.ONLINE_IDLE, 1000.0
+    await live.flush(bot, server, {1})
+
+    assert [call[0] for call in bot.calls] == ["send", "pin", "edit"]
+    assert "никого нет" in bot.calls[-1][2] and "Автовыключение в" in bot.calls[-1][2]
+
+
+@pytest.mark.asyncio
+async def test_shutdown_countdown_does_not_trigger_edits(server):
+    bot, live = FakeBot(), LiveStatus(delay=0)
+    server.watchdog.phase, server.watchdog.empty_since = Phase.ONLINE_IDLE, 1000.0
+    for remaining in (590, 500, 170):  # время автовыключения показывается часами, а не отсчётом
+        server.mc.shutdown_remaining = remaining
+        server.mc.publish_snapshot()
+        await live.flush(bot, server, {1})
+
+    assert [call[0] for call in bot.calls] == ["send", "pin"]
+
+
+@pytest.mark.asyncio
+async def test_phase_change_does_not_wait_for_min_interval(monkeypatch, server):
+    bus = EventBus()
+    monkeypatch.setattr(events, "bus", bus)
+    bot, live = FakeBot(), LiveStatus(delay=0.01, min_interval=10)
+    live.attach(SimpleNamespace(bot=bot))
+    server.active_chats.discard(2)
+    await live.flush(bot, server, {1})
+    live._flushed_at[server.name] = time.monotonic()
+
+    server.watchdog.phase = Phase.ONLINE_IDLE
+    bus.publish(StatusUpdated(server))  # обычный тик ждёт min_interval
+    await bus.drain()
+    await asyncio.sleep(0.05)
+    assert [call[0] for call in bot.calls] == ["send", "pin"]
+
+    bus.publish(PhaseChanged(server, Phase.ONLINE_ACTIVE, Phase.ONLINE_IDLE))
+    await bus.drain()
+    await asyncio.sleep(0.05)
+    assert [call[0] for call in bot.calls] == ["send", "pin", "edit"]
+    await live.close()
+
+
+@pytest.mark.asyncio
+async def test_ticks_are_coalesced_into_one_update(monkeypatch, server):
+    bus = EventBus()
+    monkeypatch.setattr(events, "bus", bus)
+    bot, live = FakeBot(), LiveStatus(delay=0.05)
+    live.attach(SimpleNamespace(bot=bot))
+
+    for _ in range(5):
+        bus.publish(StatusUpdated(server))
+    bus.publish(PhaseChanged(server, Phase.ONLINE_ACTIVE, Phase.ONLINE_IDLE))
+    await bus.drain()
+    await asyncio.sleep(0.1)
+
+    assert sorted(call[1] for call in bot.calls if call[0] == "send") == [1, 2]
+    await live.close()
+
+
+@pytest.mark.asyncio
+async def test_deleted_message_is_sent_again(server):
+    bot, live = FakeBot(deleted={7}), LiveStatus(delay=0)
+    live.load([["live", 1, 7]])  # сообщение из прошлого запуска, которое удалили из чата
+
+    await live.flush(bot, server, {1})
+
+    assert [call[0] for call in bot.calls] == ["send", "pin"]
+    assert live.dump() == [["live", 1, 101]]
+
+
+def test_alerts_are_still_sent_in_live_mode(monkeypatch, server):
+    monkeypatch.setattr(live_status, "bot_config", dataclasses.replace(live_status.bot_config, live_status=True))
+
+    assert live_status.replaces(ServerNotice(server, "ℹ️ До выключения осталось 3 минуты."))
+    assert live_status.replaces(PhaseChanged(server, Phase.VPS_OFF, Phase.MC_STARTING, "⏳"))
+    assert not live_status.replaces(PhaseChanged(server, Phase.ONLINE_IDLE, Phase.CRASHED, "⚠️"))
+
+
+@pytest.mark.asyncio
+async def test_status_refreshes_pinned_message(server):
+    bot, live = FakeBot(), LiveStatus(delay=0)
+    assert not await live.refresh(bot, server, 1)  # сообщения ещё нет: /status отвечает как обычно
+    await live.flush(bot, server, {1}, players=True)
+
+    assert await live.refresh(bot, server, 1)  # число игроков не изменилось: запроса нет
+    assert [call[0] for call in bot.calls] == ["send", "pin"]
+
+    server.mc.players_online = 3
+    server.mc.publish_snapshot()
+    assert await live.refresh(bot, server, 1)
+    assert [call[0] for call in bot.calls] == ["send", "pin", "edit"]
+    assert "3 игрок" in bot.calls[-1][2]
+
+    await live.flush(bot, server, {1})  # тик не меняет показанное число игроков
+    assert len(bot.calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_alert_is_skipped_where_live_message_shows_phase(monkeypatch, server):
+    config = dataclasses.replace(live_status.bot_config, live_status=True)
+    monkeypatch.setattr(live_status, "bot_config", config)
+    monkeypatch.setattr(watchdog, "bot_config", config)
+    bus, bot, live = EventBus(), FakeBot(), LiveStatus(delay=10)
+    monkeypatch.setattr(events, "bus", bus)
+    monkeypatch.setattr(watchdog, "live_status", live)
+    pushed = []
+    monkeypatch.setattr(watchdog, "merger", SimpleNamespace(
+        push=lambda *args, recipients=None: pushed.append(recipients)))
+    watchdog.subscribe_consumers(SimpleNamespace(bot=bot))
+    server.watchdog.phase = Phase.CRASHED
+    await live.flush(bot, server, {1})  # в чате 1 закреплённое сообщение уже показывает падение
+
+    bus.publish(PhaseChanged(server, Phase.ONLINE_IDLE, Phase.CRASHED, "⚠️"))
+    await bus.drain()
+
+    assert pushed == [frozenset({2})]
+    await live.close()
@@ -0,0 +1,93 @@
+import io
+import json
+import logging
+import time
+import pytest
+from services import logs, metrics
+
+
+def make_record(msg="hello %s", args=("world",), level=logging.INFO, **extra):
+    record = logging.LogRecord("test", level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+@pytest.fixture
+def root_logger():
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    yield root
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+
+
+class SlowStream(io.StringIO):
+    def write(self, text):
+        time.sleep(0.01)  # медленный stdout или заполненный pipe
+        return super().write(text)
+
+
+def test_json_record_carries_structured_fields():
+    record = make_record(chat_id=42, user="steve", command="/status", latency_ms=12.5, sample="x")
+
+    entry = json.loads(logs.JsonFormatter().format(record))
+
+    assert entry["message"] == "hello world"
+    assert entry["chat_id"] == 42 and entry["user"] == "steve" and entry["command"] == "/status"
+    assert entry["latency_ms"] == 12.5
+    assert "sample" not in entry
+
+
+def test_sampling_keeps_one_of_n_and_all_warnings():
+    sampler = logs.SamplingFilter(every=5)
+
+    passed = [sampler.filter(make_record(sample="tick", server="a")) for _ in range(20)]
+    other = [sampler.filter(make_record("other %s", sample="tick", server="b")) for _ in range(5)]
+
+    assert sum(passed) == 4 and passed[0]
+    assert sum(other) == 1 and other[0]  # частые записи одного сервера не вытесняют записи другого
+    assert all(sampler.filter(make_record(level=logging.WARNING, sample="tick")) for _ in range(3))
+    assert all(sampler.filter(make_record()) for _ in range(3))
+
+
+def test_full_queue_drops_records_instead_of_blocking():
+    handler = logs.DroppingQueueHandler(logs.queue.Queue(2))
+    dropped = metrics.log_records_dropped.value()
+
+    for _ in range(5):
+        handler.handle(make_record())
+
+    assert handler.queue.qsize() == 2
+    assert metrics.log_records_dropped.value() == dropped + 3
+
+
+def test_slow_output_does_not_block_logging_calls(root_logger):
+    stream = SlowStream()
+    listener = logs.setup_logging(logging.INFO, json_format=True, stream=stream)
+    logger = logging.getLogger("test.slow")
+
+    started = time.perf_counter()
+    for i in range(20):
+        logger.info("record %d", i, extra={"chat_id": i})
+    elapsed = time.perf_counter() - started
+    listener.stop()
+
+    assert elapsed < 0.1  # запись в поток заняла бы не меньше 0.2 секунды
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [line["chat_id"] for line in lines] == list(range(20))
+
+
+def test_exception_is_kept_in_json(root_logger):
+    stream = io.StringIO()
+    listener = logs.setup_logging(logging.INFO, json_format=True, stream=stream)
+    try:
+        raise RuntimeError("boom")
+    except RuntimeError:
+        logging.getLogger("test.exc").exception("failed")
+    listener.stop()
+
+    entry = json.loads(stream.getvalue())
+    assert entry["message"] == "failed" and "RuntimeError: boom" in entry["exc"]
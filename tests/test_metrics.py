@@ -0,0 +1,40 @@
+import aiohttp
+import pytest
+from services import metrics
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = metrics.Histogram("test_seconds", "Test", ("name",), buckets=(0.1, 1))
+    histogram.observe(0.05, "a")
+    histogram.observe(0.5, "a")
+    histogram.observe(5, "a")
+
+    rendered = histogram.render()
+    assert 'test_seconds_bucket{name="a",le="0.1"} 1' in rendered
+    assert 'test_seconds_bucket{name="a",le="1"} 2' in rendered
+    assert 'test_seconds_bucket{name="a",le="+Inf"} 3' in rendered
+    assert 'test_seconds_count{name="a"} 3' in rendered
+    assert histogram.count("a") == 3
+
+
+def test_label_values_are_escaped():
+    counter = metrics.Counter("test_total", "Test", ("server",))
+    counter.inc('a"b')
+    assert 'test_total{server="a\\"b"} 1' in counter.render()
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint():
+    registry = metrics.Registry()
+    registry.register(metrics.Counter("test_ticks_total", "Test", ("server",))).inc("default")
+    server = metrics.MetricsServer("127.0.0.1", 0, registry)
+    port = await server.start()
+    try:
+        async with aiohttp.ClientSession() as session:
+            async with session.get(f"http://127.0.0.1:{port}/metrics") as response:
+                assert response.status == 200
+                body = await response.text()
+    finally:
+        await server.stop()
+    assert "# TYPE test_ticks_total counter" in body
+    assert 'test_ticks_total{server="default"} 1' in body
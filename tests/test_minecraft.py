@@ -0,0 +1,75 @@
+import socket
+from types import SimpleNamespace
+import pytest
+import pytest_asyncio
+from benchmarks.fake_minecraft import FakeMinecraftServer
+from integrations.minecraft import ProbeError, probe_status
+from services import watchdog
+from state.minecraft_server import MinecraftServer
+
+
+@pytest_asyncio.fixture
+async def fake_server():
+    server = FakeMinecraftServer(players=3, version="Paper 1.21.4")
+    await server.start()
+    yield server
+    await server.stop()
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.mark.asyncio
+async def test_probe_uses_single_connection(fake_server):
+    result = await probe_status("127.0.0.1", fake_server.port)
+
+    assert result.online and result.error is None
+    assert result.players_online == 3
+    assert result.version == "Paper 1.21.4"
+    assert result.latency_ms is not None
+    assert fake_server.connections == 1
+
+
+@pytest.mark.asyncio
+async def test_handshake_carries_server_name(monkeypatch, fake_server):
+    mc = MinecraftServer(server_address="mc.example.com", query_port=fake_server.port)
+
+    async def resolve(host, port, srv_lookup=False):
+        return SimpleNamespace(ip="127.0.0.1", port=port)  # соединение идёт на IP из кеша
+
+    monkeypatch.setattr(watchdog.resolver, "resolve", resolve)
+    result = await watchdog.probe_mc_server(mc)
+
+    assert result.online
+    assert fake_server.handshake_hosts == ["mc.example.com"]
+
+
+@pytest.mark.asyncio
+async def test_probe_reports_refused_port():
+    result = await probe_status("127.0.0.1", free_port())
+
+    assert not result.online
+    assert result.error is ProbeError.REFUSED
+
+
+@pytest.mark.asyncio
+async def test_probe_deadline(fake_server):
+    fake_server.latency = 1
+
+    result = await probe_status("127.0.0.1", fake_server.port, deadline=0.2)
+
+    assert result.error is ProbeError.TIMEOUT
+
+
+@pytest.mark.asyncio
+async def test_refresh_applies_probe_result(fake_server):
+    mc = MinecraftServer(server_address="127.0.0.1", query_port=fake_server.port)
+
+    result = await watchdog.refresh_mc_server_state(mc)
+
+    assert result.online
+    assert (mc.online, mc.players_online, mc.version_number) == (True, 3, "1.21.4")
+    assert mc.snapshot.players_online == 3
@@ -0,0 +1,128 @@
+import asyncio
+from datetime import timedelta
+import pytest
+from telegram.error import Forbidden, RetryAfter
+from services.notifications import Broadcaster, NotificationMerger
+
+
+class FakeBot:
+    def __init__(self, blocked=(), flood_once=()):
+        self.sent = []
+        self.blocked = set(blocked)
+        self.flood_once = set(flood_once)
+
+    async def send_message(self, chat_id, text):
+        if chat_id in self.blocked:
+            raise Forbidden("Forbidden: bot was blocked by the user")
+        if chat_id in self.flood_once:
+            self.flood_once.discard(chat_id)
+            raise RetryAfter(timedelta(0))
+        await asyncio.sleep(0.001)
+        self.sent.append((chat_id, text))
+
+
+def make_broadcaster(**kwargs):
+    params = dict(concurrency=5, global_rate=10_000, private_rate=10_000, group_rate=10_000)
+    params.update(kwargs)
+    return Broadcaster(**params)
+
+
+@pytest.mark.asyncio
+async def test_broadcast_drops_blocked_chats():
+    bot = FakeBot(blocked={2})
+    chats = {1, 2, 3}
+
+    result = await make_broadcaster().broadcast(bot, chats, "hi")
+
+    assert result.sent == 2 and result.dropped == [2]
+    assert chats == {1, 3}
+
+
+@pytest.mark.asyncio
+async def test_broadcast_retries_after_flood_control():
+    bot = FakeBot(flood_once={1})
+
+    result = await make_broadcaster().broadcast(bot, {1, 2}, "hi")
+
+    assert result.sent == 2 and result.failed == 0
+    assert sorted(chat_id for chat_id, _ in bot.sent) == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_broadcast_respects_global_rate():
+    bot = FakeBot()
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+
+    # запас в 20 токенов, затем 20 сообщений в секунду
+    await make_broadcaster(global_rate=20).broadcast(bot, set(range(30)), "hi")
+
+    assert len(bot.sent) == 30
+    assert loop.time() - start >= 0.45
+
+
+@pytest.mark.asyncio
+async def test_submit_keeps_order_and_recipients():
+    bot = FakeBot()
+    broadcaster = make_broadcaster()
+    chats = {1}
+
+    broadcaster.submit(bot, chats, "first")
+    broadcaster.submit(bot, chats, "second")
+    chats.clear()  # например, сервер выключен сразу после уведомления
+    await broadcaster.close()
+
+    assert bot.sent == [(1, "first"), (1, "second")]
+
+
+class FakeSender:
+    def __init__(self):
+        self.sent = []
+
+    def submit(self, bot, chat_ids, text, recipients=None):
+        self.sent.append((set(chat_ids if recipients is None else recipients), text))
+
+
+@pytest.mark.asyncio
+async def test_notifications_after_crash_are_merged():
+    sender = FakeSender()
+    merger = NotificationMerger(0.05, sender)
+
+    merger.push(None, "mc", frozenset({1}), "⚠️ недоступен", unstable=True)
+    merger.push(None, "mc", frozenset({1}), "✅ доступен")
+    merger.push(None, "mc", frozenset({1, 2}), "⚠️ недоступен", unstable=True)
+    merger.push(None, "mc", frozenset({1, 2}), "✅ доступен")
+    assert sender.sent == [({1}, "⚠️ недоступен")]  # первое уведомление не задерживается
+
+    await asyncio.sleep(0.08)
+    assert len(sender.sent) == 2
+    chats, text = sender.sent[1]
+    assert chats == {1, 2}
+    assert "менялось 3 раз" in text and text.endswith("✅ доступен")
+
+
+@pytest.mark.asyncio
+async def test_regular_notifications_are_not_delayed():
+    sender = FakeSender()
+    merger = NotificationMerger(10, sender)
+
+    merger.push(None, "mc", frozenset({1}), "⏳ запускается")
+    merger.push(None, "mc", frozenset({1}), "✅ доступен")
+
+    assert [text for _, text in sender.sent] == ["⏳ запускается", "✅ доступен"]
+
+
+@pytest.mark.asyncio
+async def test_merged_notification_drops_blocked_chats():
+    bot = FakeBot(blocked={2})
+    broadcaster = make_broadcaster()
+    merger = NotificationMerger(0.02, broadcaster)
+    subscribers = {1, 2}
+
+    merger.push(bot, "mc", subscribers, "⚠️ недоступен", unstable=True, recipients=frozenset({1}))
+    merger.push(bot, "mc", subscribers, "✅ доступен", recipients=frozenset({1, 2}))
+    await asyncio.sleep(0.05)
+    await broadcaster.close()
+
+    assert [chat_id for chat_id, _ in bot.sent] == [1, 1]
+    assert subscribers == {1}  # сводка удалила заблокировавший бота чат из подписчиков сервера
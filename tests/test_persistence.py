@@ -0,0 +1,67 @@
+from collections import defaultdict
+from types import SimpleNamespace
+from unittest.mock import Mock
+import pytest
+from services import persistence
+from state.bot_state import bot_state
+from state.servers import servers
+
+
+@pytest.fixture
+def default_server():
+    server = servers.default()
+    server.watchdog.reset()
+    server.active_chats.clear()
+    yield server
+    server.watchdog.reset()
+    server.active_chats.clear()
+    server.vps.last_poweron_time = 0
+
+
+def make_application(chat_data=None):
+    job_queue = Mock()
+    job_queue.run_repeating.return_value = Mock()
+    return SimpleNamespace(chat_data=defaultdict(dict, chat_data or {}), job_queue=job_queue)
+
+
+@pytest.mark.asyncio
+async def test_state_restored_after_restart(tmp_path, default_server):
+    path = str(tmp_path / "state.db")
+    default_server.active_chats.update({1, -100})
+    default_server.watchdog.watchdog_job = Mock()
+    default_server.watchdog.empty_since = 1000.0
+    default_server.watchdog.warning_3m_sent = True
+    default_server.vps.last_poweron_time = 500.0
+    store = persistence.StateStore(path)
+    await store.save(persistence.collect_state(make_application({1: {"muted": False}, 2: {"muted": True}})))
+    store.close()
+
+    default_server.watchdog.reset()
+    default_server.active_chats.clear()
+    default_server.vps.last_poweron_time = 0
+    application = make_application()
+    store = persistence.StateStore(path)
+    persistence.restore_state(application, store.load())
+    store.close()
+
+    assert default_server.active_chats == {1, -100}
+    assert default_server.watchdog.empty_since == 1000.0
+    assert default_server.watchdog.warning_3m_sent is True
+    assert default_server.vps.last_poweron_time == 500.0
+    assert application.chat_data[2]["muted"] is True
+    application.job_queue.run_repeating.assert_called_once()  # watchdog запущен без /status
+    assert default_server.watchdog.watchdog_job is not None
+    assert bot_state.maintenance_mode is False
+
+
+@pytest.mark.asyncio
+async def test_only_changed_keys_written(tmp_path, default_server):
+    store = persistence.StateStore(str(tmp_path / "state.db"))
+    application = make_application()
+
+    # bot, muted, live_status и по ключу на сервер
+    assert await store.save(persistence.collect_state(application)) == 3 + len(servers)
+    assert await store.save(persistence.collect_state(application)) == 0
+    default_server.active_chats.add(42)
+    assert await store.save(persistence.collect_state(application)) == 1
+    store.close()
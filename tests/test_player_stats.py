@@ -0,0 +1,69 @@
+import time
+from services.player_stats import PlayerHistory
+
+
+def local_hour_start(days_ago: int, hour: int) -> float:
+    t = time.localtime(time.time() - days_ago * 86400)
+    return time.mktime((t.tm_year, t.tm_mon, t.tm_mday, hour, 0, 0, 0, 0, -1))
+
+
+def test_ring_buffer_wraps_and_survives_reopen(tmp_path):
+    path = str(tmp_path / "default.bin")
+    history = PlayerHistory(path, capacity=4)
+    for i in range(6):
+        history.append(1000 + i * 60, i, 20)
+    history.close()
+
+    reopened = PlayerHistory(path, capacity=4)
+    assert reopened.count == 4
+    assert reopened.last_timestamp() == 1000 + 5 * 60
+    summary = reopened.summarize(since=0, until=2000)
+    assert summary.samples == 4  # две самые старые точки перезаписаны
+    assert summary.session_concurrency == (2 + 3 + 4 + 5) / 4
+    reopened.close()
+
+
+def test_summary_idle_share_and_peak_hours(tmp_path):
+    history = PlayerHistory(str(tmp_path / "default.bin"), capacity=1000)
+    evening, morning = local_hour_start(1, 20), local_hour_start(1, 9)
+    for minute in range(30):
+        history.append(morning + minute * 60, 0, 10)  # утром сервер пустует
+    for minute in range(30):
+        history.append(evening + minute * 60, 4, 10)
+    history.append(evening + 40 * 60, None, None)  # сервер не в сети
+
+    summary = history.summarize(since=morning - 1, until=evening + 3600)
+    assert summary.samples == 61
+    assert summary.online_samples == 60
+    assert summary.idle_share == 0.5
+    assert summary.session_concurrency == 4
+    assert summary.peak_hours == [(20, 4.0)]
+    history.close()
+
+
+def test_samples_are_weighted_by_time(tmp_path):
+    # пока есть игроки, watchdog проверяет сервер раз в 5 минут, пустой — раз в минуту
+    history = PlayerHistory(str(tmp_path / "default.bin"), capacity=1000, max_gap=600)
+    start = local_hour_start(1, 12)
+    for i in range(24):  # два часа с игроками
+        history.append(start + i * 300, 2, 10)
+    for i in range(120):  # два часа без игроков
+        history.append(start + 7200 + i * 60, 0, 10)
+
+    summary = history.summarize(since=start - 1, until=start + 4 * 3600)
+    assert summary.samples == 144
+    assert summary.idle_share == 0.5
+    assert summary.session_concurrency == 2
+    assert summary.peak_hours == [(12, 2.0), (13, 2.0)]
+    history.close()
+
+
+def test_long_gap_is_capped(tmp_path):
+    history = PlayerHistory(str(tmp_path / "default.bin"), capacity=1000, max_gap=600)
+    history.append(1000, 3, 10)
+    history.append(1000 + 86400, 0, 10)  # бот не работал сутки
+    history.append(1000 + 86400 + 600, 0, 10)
+
+    summary = history.summarize(since=0, until=1000 + 90000)
+    assert summary.idle_share == 2 / 3
+    history.close()
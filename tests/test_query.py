@@ -0,0 +1,100 @@
+import pytest
+import pytest_asyncio
+from benchmarks.fake_minecraft import FakeMinecraftServer, FakeQueryServer
+from integrations.minecraft import ProbeError
+from integrations.query import QueryClient, parse_full_stat
+from services import watchdog
+from state.minecraft_server import MinecraftServer
+
+
+@pytest_asyncio.fixture
+async def fake_servers():
+    minecraft = FakeMinecraftServer(players=2, version="1.21.4", player_names=["Steve", "Alex"])
+    query = FakeQueryServer(minecraft, plugins="Paper on 1.21.4: EssentialsX 2.20")
+    await minecraft.start()
+    await query.start()
+    yield minecraft, query
+    await query.stop()
+    await minecraft.stop()
+
+
+def test_parse_full_stat():
+    data = (b"splitnum\x00\x80\x00hostname\x00A Minecraft Server\x00numplayers\x001\x00"
+            b"map\x00world\x00\x00\x01player_\x00\x00Steve\x00\x00")
+    info, players = parse_full_stat(data)
+    assert info == {"hostname": "A Minecraft Server", "numplayers": "1", "map": "world"}
+    assert players == ["Steve"]
+
+
+@pytest.mark.asyncio
+async def test_query_returns_players_and_reuses_token(fake_servers):
+    _, query = fake_servers
+    client = QueryClient("127.0.0.1", query.port)
+
+    first = await client.query()
+    second = await client.query()
+    client.close()
+
+    assert first.online and first.player_names == ("Steve", "Alex")
+    assert first.players_online == 2 and first.map_name == "world"
+    assert "EssentialsX" in first.plugins
+    assert second.online
+    assert query.handshakes == 1  # токен закеширован между проверками
+    assert query.stats == 2
+
+
+@pytest.mark.asyncio
+async def test_query_renews_expired_token(fake_servers):
+    _, query = fake_servers
+    client = QueryClient("127.0.0.1", query.port)
+    await client.query()
+    query.rotate_tokens()
+
+    result = await client.query(deadline=1)
+    client.close()
+
+    assert result.online
+    assert query.handshakes == 2
+
+
+@pytest.mark.asyncio
+async def test_malformed_reply_is_protocol_error(fake_servers):
+    minecraft, query = fake_servers
+    minecraft.players = "many"  # numplayers в ответе не число
+    client = QueryClient("127.0.0.1", query.port)
+
+    result = await client.query(deadline=1)
+    client.close()
+
+    assert not result.online
+    assert result.error is ProbeError.PROTOCOL
+
+
+@pytest.mark.asyncio
+async def test_query_probe_falls_back_to_status_ping(fake_servers):
+    minecraft, query = fake_servers
+    await query.stop()  # Query выключен на сервере
+    mc = MinecraftServer(server_address="127.0.0.1", query_port=minecraft.port, probe_mode="query",
+                         probe_deadline=1, query_udp_port=query.port)
+
+    result = await watchdog.probe_mc_server(mc)
+
+    assert result.online and result.players_online == 2
+    assert result.player_names is None
+    assert minecraft.status_requests == 1
+    connections = minecraft.connections
+    await watchdog.probe_mc_server(mc)  # Query временно не пробуется
+    assert minecraft.connections == connections + 1
+
+
+@pytest.mark.asyncio
+async def test_ignored_players_do_not_block_shutdown(fake_servers):
+    minecraft, query = fake_servers
+    mc = MinecraftServer(server_address="127.0.0.1", query_port=minecraft.port, probe_mode="query",
+                         query_udp_port=query.port, ignored_players=frozenset({"alex", "steve"}))
+
+    await watchdog.refresh_mc_server_state(mc)
+
+    assert mc.players_online == 2
+    assert mc.active_players() == 0
+    assert mc.snapshot.player_names == ("Steve", "Alex")
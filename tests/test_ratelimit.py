@@ -0,0 +1,60 @@
+import pytest
+from config.config import RateLimit
+from services import ratelimit
+from services.ratelimit import CommandRateLimiter, KeyedRateLimiter
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ratelimit.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_keys_are_independent(clock):
+    limiter = KeyedRateLimiter(RateLimit(burst=2, period=5))
+    assert limiter.try_acquire(1) == 0
+    assert limiter.try_acquire(1) == 0
+    assert limiter.try_acquire(1) == pytest.approx(5)
+    assert limiter.try_acquire(2) == 0  # другой пользователь не ждёт
+
+    clock[0] += 5
+    assert limiter.try_acquire(1) == 0
+
+
+def test_warns_once_per_run_of_denials(clock):
+    limiter = KeyedRateLimiter(RateLimit(burst=1, period=10))
+    limiter.try_acquire(1)
+    assert limiter.try_acquire(1) and limiter.should_warn(1)
+    assert limiter.try_acquire(1) and not limiter.should_warn(1)
+
+    clock[0] += 10
+    assert limiter.try_acquire(1) == 0
+    assert limiter.try_acquire(1) and limiter.should_warn(1)
+
+
+def test_idle_keys_are_evicted(clock):
+    limiter = KeyedRateLimiter(RateLimit(burst=2, period=5))
+    for user in range(100):
+        limiter.try_acquire(user)
+    assert len(limiter) == 100
+
+    clock[0] += 10  # время полного восстановления ведра
+    limiter.try_acquire("new")
+    assert len(limiter) == 1
+
+
+def test_chat_limit_refunds_user_token(clock):
+    limiter = CommandRateLimiter({"status": (RateLimit(2, 5), RateLimit(1, 5))})
+    assert limiter.check("status", user_id=1, chat_id=-100) == (0, False)
+
+    wait, warn = limiter.check("status", user_id=1, chat_id=-100)
+    assert wait == pytest.approx(5) and warn
+    # отказ по лимиту чата не тратит лимит пользователя в другом чате
+    assert limiter.check("status", user_id=1, chat_id=1) == (0, False)
+    assert limiter.check("status", user_id=1, chat_id=2)[0] == pytest.approx(5)
+
+
+def test_unknown_command_is_not_limited():
+    limiter = CommandRateLimiter({})
+    assert limiter.check("status", 1, 1) == (0, False)
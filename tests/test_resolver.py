@@ -0,0 +1,81 @@
+import pytest
+from types import SimpleNamespace
+from integrations import resolver as resolver_module
+from integrations.resolver import ResolverCache
+
+
+def fake_dns(monkeypatch, answers, ttl=60):
+    calls = []
+
+    class Answer(list):
+        pass
+
+    async def resolve(qname, rdtype, **kwargs):
+        calls.append(qname)
+        answer = Answer([answers[qname]])
+        answer.rrset = SimpleNamespace(ttl=ttl)
+        return answer
+
+    monkeypatch.setattr(resolver_module.dns.asyncresolver, "resolve", resolve)
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_ip_address_is_not_resolved(monkeypatch):
+    calls = fake_dns(monkeypatch, {})
+    cache = ResolverCache()
+
+    resolved = await cache.resolve("127.0.0.1", 25565)
+
+    assert (resolved.ip, resolved.port) == ("127.0.0.1", 25565)
+    assert calls == []
+
+
+@pytest.mark.asyncio
+async def test_resolution_is_cached_within_ttl(monkeypatch):
+    calls = fake_dns(monkeypatch, {"mc.example.com": "10.0.0.5"})
+    cache = ResolverCache()
+
+    first = await cache.resolve("mc.example.com", 25565)
+    second = await cache.resolve("mc.example.com", 25565)
+
+    assert first.ip == second.ip == "10.0.0.5"
+    assert calls == ["mc.example.com"]
+    assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_expired_record_is_resolved_again(monkeypatch):
+    calls = fake_dns(monkeypatch, {"mc.example.com": "10.0.0.5"}, ttl=0)
+    cache = ResolverCache(min_ttl=0)
+
+    await cache.resolve("mc.example.com", 25565)
+    await cache.resolve("mc.example.com", 25565)
+
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_srv_record_redirects_host_and_port(monkeypatch):
+    srv = SimpleNamespace(target="node1.example.com.", port=25570)
+    calls = fake_dns(monkeypatch, {"_minecraft._tcp.mc.example.com": srv, "node1.example.com": "10.0.0.7"})
+    cache = ResolverCache()
+
+    resolved = await cache.resolve("mc.example.com", 25565, srv=True)
+
+    assert (resolved.ip, resolved.port) == ("10.0.0.7", 25570)
+    assert calls == ["_minecraft._tcp.mc.example.com", "node1.example.com"]
+
+
+@pytest.mark.asyncio
+async def test_consecutive_failures_force_re_resolution(monkeypatch):
+    calls = fake_dns(monkeypatch, {"mc.example.com": "10.0.0.5"})
+    cache = ResolverCache(max_failures=2)
+
+    await cache.resolve("mc.example.com", 25565)
+    cache.report_failure("mc.example.com", 25565)
+    await cache.resolve("mc.example.com", 25565)
+    cache.report_failure("mc.example.com", 25565)
+    await cache.resolve("mc.example.com", 25565)
+
+    assert len(calls) == 2
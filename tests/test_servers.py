@@ -0,0 +1,53 @@
+import json
+from state import servers as servers_module
+from state.minecraft_server import mc_server
+
+
+def test_missing_file_uses_single_env_server(tmp_path):
+    servers = servers_module.load_servers(str(tmp_path / "missing.json"))
+
+    assert [s.name for s in servers] == [servers_module.DEFAULT_SERVER_NAME]
+    assert servers[0].mc is mc_server
+
+
+def test_load_servers_from_file(tmp_path, monkeypatch):
+    # первый сервер использует общие инстансы — не портим их для других тестов
+    monkeypatch.setattr(mc_server, "server_address", mc_server.server_address)
+    monkeypatch.setattr(mc_server, "wd_poweroff_cooldown", mc_server.wd_poweroff_cooldown)
+    path = tmp_path / "servers.json"
+    path.write_text(json.dumps({"servers": [
+        {"name": "Main", "address": "main.example.com", "api_url": "https://api/1", "api_token": "a"},
+        {"name": "modded", "address": "modded.example.com", "port": 25570, "poweroff_cooldown": 300},
+    ]}))
+
+    registry = servers_module.ServerRegistry(servers_module.load_servers(str(path)))
+
+    assert registry.names() == ["main", "modded"]
+    assert registry.is_fleet()
+    assert registry.default().mc is mc_server
+    modded = registry.get("MODDED")
+    assert modded.mc.query_port == 25570
+    assert modded.mc.wd_poweroff_cooldown == 300
+    assert modded.mc is not mc_server and modded.watchdog is not registry.default().watchdog
+
+
+def test_invalid_file_falls_back(tmp_path):
+    path = tmp_path / "servers.json"
+    path.write_text("{not json")
+
+    assert [s.name for s in servers_module.load_servers(str(path))] == [servers_module.DEFAULT_SERVER_NAME]
+
+
+def test_unnamed_and_duplicate_servers_are_skipped(tmp_path, monkeypatch):
+    monkeypatch.setattr(mc_server, "server_address", mc_server.server_address)
+    path = tmp_path / "servers.json"
+    path.write_text(json.dumps({"servers": [
+        {"address": "unnamed.example.com"},
+        {"name": "main", "address": "main.example.com"},
+        {"name": "Main", "address": "other.example.com"},
+    ]}))
+
+    servers = servers_module.load_servers(str(path))
+
+    assert [s.name for s in servers] == ["main"]
+    assert servers[0].mc is mc_server and servers[0].mc.server_address == "main.example.com"
@@ -0,0 +1,67 @@
+import asyncio
+import pytest
+from telegram import Update
+from benchmarks.common import make_update
+from services.update_processor import ChatOrderedUpdateProcessor
+
+
+def update(update_id: int, chat_id: int) -> Update:
+    return Update.de_json(make_update(update_id, chat_id, "привет"), None)
+
+
+async def handle(log: list, name: str, delay: float):
+    log.append(("start", name))
+    await asyncio.sleep(delay)
+    log.append(("end", name))
+
+
+@pytest.mark.asyncio
+async def test_same_chat_is_processed_in_order():
+    processor = ChatOrderedUpdateProcessor(8)
+    log = []
+    # первое обновление чата самое медленное: без очереди второе и третье закончились бы раньше
+    await asyncio.gather(
+        processor.process_update(update(1, 10), handle(log, "a1", 0.03)),
+        processor.process_update(update(2, 10), handle(log, "a2", 0.01)),
+        processor.process_update(update(3, 10), handle(log, "a3", 0)),
+    )
+    assert log == [("start", "a1"), ("end", "a1"), ("start", "a2"), ("end", "a2"),
+                   ("start", "a3"), ("end", "a3")]
+    assert processor.busy_chats() == 0
+
+
+@pytest.mark.asyncio
+async def test_slow_chat_does_not_block_others():
+    processor = ChatOrderedUpdateProcessor(8)
+    log = []
+    await asyncio.gather(
+        processor.process_update(update(1, 10), handle(log, "slow", 0.05)),
+        processor.process_update(update(2, 20), handle(log, "fast", 0)),
+    )
+    assert log.index(("end", "fast")) < log.index(("end", "slow"))
+
+
+@pytest.mark.asyncio
+async def test_queued_updates_do_not_hold_slots():
+    processor = ChatOrderedUpdateProcessor(2)
+    log = []
+    slow_chat = [processor.process_update(update(i, 10), handle(log, f"a{i}", 0.02)) for i in range(5)]
+    other = processor.process_update(update(10, 20), handle(log, "b", 0))
+    await asyncio.gather(*slow_chat, other)
+    # очередь чата 10 занимает один слот, второй остаётся чату 20
+    assert log.index(("end", "b")) < log.index(("end", "a1"))
+
+
+@pytest.mark.asyncio
+async def test_failing_update_does_not_stop_chat_queue():
+    processor = ChatOrderedUpdateProcessor(4)
+    log = []
+
+    async def fail():
+        raise RuntimeError("boom")
+
+    await asyncio.gather(
+        processor.process_update(update(1, 10), fail()),
+        processor.process_update(update(2, 10), handle(log, "a2", 0)),
+    )
+    assert log == [("start", "a2"), ("end", "a2")]
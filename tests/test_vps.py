@@ -1,11 +1,16 @@
+import asyncio
+import math
+import time
 import pytest
 import services.vps_service as vps_service
 from integrations import api
+from state.minecraft_server import MinecraftServer
+from state.servers import ManagedServer
 
 
 @pytest.mark.asyncio
 async def test_shutdown_vps_success(monkeypatch):
-    async def mock_request(action):
+    async def mock_request(action, api_url=None, api_token=None):
         return {"State": "InProgress"}
 
     monkeypatch.setattr(api, "api_request", mock_request)
@@ -13,4 +18,141 @@ async def test_shutdown_vps_success(monkeypatch):
     result = await vps_service.shutdown_vps()
 
     assert result["State"] == "InProgress"
-    assert vps_service.vps_state.last_poweron_time > 0
\ No newline at end of file
+    assert vps_service.vps_state.last_poweron_time > 0
+
+@pytest.mark.asyncio
+async def test_status_cache_coalesces_concurrent_requests():
+    calls = {"count": 0}
+
+    async def fetch():
+        calls["count"] += 1
+        await asyncio.sleep(0.01)
+        return {"IsPowerOn": True}
+
+    cache = vps_service.StatusCache(fetch, ttl=5, stale_ttl=25)
+    results = await asyncio.gather(*(cache.get() for _ in range(20)))
+
+    assert calls["count"] == 1
+    assert all(r == {"IsPowerOn": True} for r in results)
+
+
+@pytest.mark.asyncio
+async def test_status_cache_serves_stale_and_revalidates():
+    responses = iter([{"IsPowerOn": False}, {"IsPowerOn": True}])
+
+    async def fetch():
+        return next(responses)
+
+    cache = vps_service.StatusCache(fetch, ttl=0, stale_ttl=60)
+    assert (await cache.get())["IsPowerOn"] is False
+    # устаревшее значение отдаётся сразу, обновление идёт в фоне
+    assert (await cache.get())["IsPowerOn"] is False
+    await asyncio.sleep(0)
+    assert (await cache.get(max_age=60))["IsPowerOn"] is True
+
+
+@pytest.mark.asyncio
+async def test_status_cache_does_not_store_errors():
+    calls = {"count": 0}
+
+    async def fetch():
+        calls["count"] += 1
+        return {"error": "500: boom"}
+
+    cache = vps_service.StatusCache(fetch, ttl=5, stale_ttl=25)
+    await cache.get()
+    await cache.get()
+    assert calls["count"] == 2
+
+
+@pytest.mark.asyncio
+async def test_status_cache_falls_back_to_last_status_when_api_fails():
+    responses = [{"IsPowerOn": True}]
+
+    async def fetch():
+        return responses.pop(0) if responses else {"error": "VPS API is not responding", "circuit_open": True}
+
+    cache = vps_service.StatusCache(fetch, ttl=0, stale_ttl=0)
+    await cache.get()
+    await asyncio.sleep(0.01)
+
+    assert "error" in await cache.get(allow_stale=False)
+    stale = await cache.get()
+    assert stale["IsPowerOn"] is True and stale["stale_for"] > 0
+
+
+@pytest.mark.asyncio
+async def test_poweron_invalidates_status_cache(monkeypatch):
+    async def mock_request(action, api_url=None, api_token=None):
+        return {"State": "InProgress"}
+
+    monkeypatch.setattr(api, "api_request", mock_request)
+    vps_service.status_cache._value = {"IsPowerOn": False}
+    vps_service.status_cache._fetched_at = time.monotonic()
+    monkeypatch.setattr(vps_service.vps_state, "boot_started", 0)  # не оставлять загрузку другим тестам
+
+    await vps_service.poweron_vps()
+
+    assert vps_service.status_cache.age() == math.inf
+    assert vps_service.vps_state.boot_started > 0
+
+
+def make_coordinator(name: str = "coordinator") -> vps_service.PowerCoordinator:
+    return vps_service.PowerCoordinator(ManagedServer(name=name, mc=MinecraftServer()))
+
+
+@pytest.mark.asyncio
+async def test_power_coordinator_joins_duplicate_requests():
+    coordinator = make_coordinator()
+    calls = {"count": 0}
+
+    async def poweron():
+        calls["count"] += 1
+        await asyncio.sleep(0.01)
+        return {"State": "InProgress"}
+
+    results = await asyncio.gather(*(coordinator.run("poweron", poweron) for _ in range(5)))
+
+    assert calls["count"] == 1
+    assert [joined for _, joined in results] == [False, True, True, True, True]
+    assert all(result == {"State": "InProgress"} for result, _ in results)
+    assert coordinator.pending is None
+
+    # следующее действие после завершения — снова запрос к API
+    await coordinator.run("poweron", poweron)
+    assert calls["count"] == 2
+
+
+@pytest.mark.asyncio
+async def test_power_coordinator_serializes_different_actions():
+    coordinator = make_coordinator()
+    log = []
+
+    def action(name: str):
+        async def run():
+            log.append(("start", name, coordinator.pending))
+            await asyncio.sleep(0.01)
+            log.append(("end", name))
+            return {"State": "InProgress"}
+        return run
+
+    await asyncio.gather(coordinator.run("shutdown", action("shutdown")),
+                         coordinator.run("poweron", action("poweron")))
+
+    assert log == [("start", "shutdown", "shutdown"), ("end", "shutdown"),
+                   ("start", "poweron", "poweron"), ("end", "poweron")]
+
+
+@pytest.mark.asyncio
+async def test_power_coordinator_shares_failure():
+    coordinator = make_coordinator()
+
+    async def failing():
+        await asyncio.sleep(0)
+        raise RuntimeError("boom")
+
+    results = await asyncio.gather(coordinator.run("poweron", failing), coordinator.run("poweron", failing),
+                                   return_exceptions=True)
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert coordinator.pending is None
@@ -1,8 +1,12 @@
+import asyncio
 from unittest.mock import Mock
 
 import pytest
 import time
+from integrations import minecraft
 from services import watchdog
+from state.minecraft_server import MinecraftServer
+from state.servers import ManagedServer
 
 # для будущих тестов
 @pytest.fixture
@@ -17,7 +21,7 @@ async def test_online_with_players(monkeypatch):
     state = {"notified": False, "shutdown": False}
 
     # игроки есть
-    async def mock_refresh_mc_server_state():
+    async def mock_refresh_mc_server_state(mc=None):
         watchdog.mc_server.online = True
         watchdog.mc_server.players_online = 3
 
@@ -39,7 +43,7 @@ async def test_online_with_players(monkeypatch):
 async def test_empty_server_timer_not_expired(monkeypatch):
     state = {"notified": None, "shutdown": False}
 
-    async def mock_refresh_mc_server_state():
+    async def mock_refresh_mc_server_state(mc=None):
         watchdog.mc_server.online = True
         watchdog.mc_server.players_online = 0
 
@@ -63,7 +67,7 @@ async def test_empty_server_timer_not_expired(monkeypatch):
 async def test_empty_server_shutdown(monkeypatch):
     state = {"notified": None, "shutdown": False}
 
-    async def mock_refresh_mc_server_state():
+    async def mock_refresh_mc_server_state(mc=None):
         watchdog.mc_server.online = True
         watchdog.mc_server.players_online = 0
 
@@ -88,7 +92,7 @@ async def test_server_crashed(monkeypatch):
     crashes = {"count": 2}
 
     # сервер упал
-    async def mock_refresh_mc_server_state():
+    async def mock_refresh_mc_server_state(mc=None):
         watchdog.mc_server.online = False
         watchdog.mc_server.players_online = None
 
@@ -111,7 +115,7 @@ async def test_first_start(monkeypatch):
     state = {"notified": None, "shutdown": False}
 
     # сервер недоступен, первый запуск
-    async def mock_refresh_mc_server_status():
+    async def mock_refresh_mc_server_status(mc=None):
         watchdog.mc_server.online = False
         watchdog.mc_server.players_online = None
 
@@ -132,24 +136,20 @@ async def test_first_start(monkeypatch):
 
 @pytest.mark.asyncio
 async def test_failed_server_status(monkeypatch):
-    state = {"notified": None, "shutdown": False}
+    state = {"notified": None, "shutdown": False, "pings": 0}
     crashes = {"count": 1}
 
-    async def mock_fast_check(host, port, timeout=2.0):
-        return True  # порт открыт
-
-    class MockServer:
-        async def async_status(self):
-            raise TimeoutError("Сервер завис")
-
-    async def mock_lookup(address_port, timeout=3):
-        return MockServer()
+    async def mock_status(self, **kwargs):
+        state["pings"] += 1
+        raise TimeoutError("Сервер завис")
 
     async def notify_cb(msg): state["notified"] = msg
     async def shutdown_cb(): state["shutdown"] = True
 
-    monkeypatch.setattr(watchdog,"fast_check", mock_fast_check)
-    monkeypatch.setattr(watchdog.JavaServer,"async_lookup", mock_lookup)
+    # режим single: один status ping без предварительной проверки порта
+    monkeypatch.setattr(watchdog.mc_server, "probe_mode", "single")
+    monkeypatch.setattr(watchdog.mc_server, "server_address", "127.0.0.1")
+    monkeypatch.setattr(minecraft.PinnedJavaServer, "async_status", mock_status)
 
     watchdog.watchdog_state.reset()
     watchdog.watchdog_state.crashed = crashes["count"]
@@ -157,6 +157,8 @@ async def test_failed_server_status(monkeypatch):
     watchdog.watchdog_state.warning_3m_sent = False
 
     await watchdog.watchdog_tick(shutdown_cb, notify_cb)
+    assert state["pings"] == 1
+    assert watchdog.mc_server.online is False
     assert state["notified"] is None
 
 
@@ -195,4 +197,150 @@ def test_watchdog_can_restart_after_shutdown():
     # повторный запуск
     watchdog.watchdog_run(job_queue)
 
-    assert watchdog.watchdog_state.watchdog_job is watchdog_job
\ No newline at end of file
+    assert watchdog.watchdog_state.watchdog_job is watchdog_job
+
+@pytest.mark.asyncio
+async def test_tick_publishes_snapshot(monkeypatch):
+    async def mock_refresh_mc_server_state(mc=None):
+        watchdog.mc_server.online = True
+        watchdog.mc_server.players_online = 4
+
+    async def shutdown_cb(): pass
+
+    monkeypatch.setattr(watchdog, "refresh_mc_server_state", mock_refresh_mc_server_state)
+    watchdog.watchdog_state.reset()
+
+    await watchdog.watchdog_tick(shutdown_cb)
+    snapshot = watchdog.mc_server.snapshot
+    assert snapshot.online is True
+    assert snapshot.players_online == 4
+    with pytest.raises(AttributeError):
+        snapshot.online = False  # снимок неизменяемый
+
+
+@pytest.mark.asyncio
+async def test_stale_snapshot_refreshed_in_background(monkeypatch):
+    probes = {"count": 0}
+
+    async def mock_refresh_mc_server_state(mc=None):
+        probes["count"] += 1
+        watchdog.mc_server.online = True
+        watchdog.mc_server.players_online = 1
+        watchdog.mc_server.last_check = time.monotonic()
+        watchdog.mc_server.publish_snapshot()
+
+    monkeypatch.setattr(watchdog, "refresh_mc_server_state", mock_refresh_mc_server_state)
+    watchdog.mc_server.reset_runtime()
+
+    # устаревший снимок возвращается сразу, проверка запускается один раз в фоне
+    first = watchdog.get_mc_snapshot()
+    second = watchdog.get_mc_snapshot()
+    assert first.online is False and second is first
+    await asyncio.sleep(0)
+    assert probes["count"] == 1
+    assert watchdog.get_mc_snapshot().players_online == 1
+    assert probes["count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_fleet_tick_probes_servers_concurrently(monkeypatch):
+    fleet = [ManagedServer(name=f"s{i}", mc=MinecraftServer()) for i in range(5)]
+    running = {"now": 0, "max": 0}
+
+    async def mock_refresh_mc_server_state(mc=None):
+        running["now"] += 1
+        running["max"] = max(running["max"], running["now"])
+        await asyncio.sleep(0.01)
+        running["now"] -= 1
+        mc.online = True
+        mc.players_online = 2
+
+    async def shutdown_cb(): pass
+
+    monkeypatch.setattr(watchdog, "refresh_mc_server_state", mock_refresh_mc_server_state)
+
+    await watchdog.watchdog_fleet_tick(fleet, lambda server: shutdown_cb, concurrency=3)
+
+    assert running["max"] == 3
+    assert all(server.mc.snapshot.players_online == 2 for server in fleet)
+    assert all(not server.watchdog.is_fresh_start for server in fleet)
+
+
+@pytest.mark.asyncio
+async def test_interval_backs_off_while_players_online(monkeypatch):
+    async def mock_refresh_mc_server_state(mc=None):
+        watchdog.mc_server.online = True
+        watchdog.mc_server.players_online = 3
+
+    async def shutdown_cb(): pass
+
+    monkeypatch.setattr(watchdog, "refresh_mc_server_state", mock_refresh_mc_server_state)
+    watchdog.watchdog_state.reset()
+
+    intervals = []
+    for _ in range(5):
+        await watchdog.watchdog_tick(shutdown_cb)
+        intervals.append(watchdog.watchdog_state.interval)
+
+    check = watchdog.mc_server.check_interval
+    assert intervals[:3] == [check, check * 2, check * 4]
+    assert intervals[-1] == watchdog.bot_config.watchdog_max_interval
+
+
+@pytest.mark.asyncio
+async def test_interval_is_minimal_while_starting(monkeypatch):
+    async def mock_refresh_mc_server_state(mc=None):
+        watchdog.mc_server.online = False
+        watchdog.mc_server.players_online = None
+
+    async def shutdown_cb(): pass
+
+    monkeypatch.setattr(watchdog, "refresh_mc_server_state", mock_refresh_mc_server_state)
+    watchdog.watchdog_state.reset()
+
+    await watchdog.watchdog_tick(shutdown_cb)
+    assert watchdog.watchdog_state.interval == watchdog.bot_config.watchdog_min_interval
+
+
+@pytest.mark.asyncio
+async def test_interval_targets_shutdown_deadline(monkeypatch):
+    async def mock_refresh_mc_server_state(mc=None):
+        watchdog.mc_server.online = True
+        watchdog.mc_server.players_online = 0
+
+    async def notify_cb(msg): pass
+    async def shutdown_cb(): pass
+
+    monkeypatch.setattr(watchdog, "refresh_mc_server_state", mock_refresh_mc_server_state)
+    watchdog.watchdog_state.reset()
+    watchdog.watchdog_state.is_fresh_start = False
+    watchdog.watchdog_state.warning_3m_sent = True
+    watchdog.watchdog_state.empty_since = time.time() - watchdog.mc_server.wd_poweroff_cooldown + 25
+
+    await watchdog.watchdog_tick(shutdown_cb, notify_cb)
+    assert 20 <= watchdog.watchdog_state.interval <= 25
+
+
+@pytest.mark.asyncio
+async def test_flapping_server_does_not_flood_notifications(monkeypatch):
+    messages = []
+    # работал, упал, затем то отвечает, то нет, и только потом стабильно поднялся
+    results = iter([True, False, False, False, True, False, True, False, True, True, True, True])
+
+    async def mock_refresh_mc_server_state(mc=None):
+        mc.online = next(results)
+        mc.players_online = 2 if mc.online else None
+
+    async def notify_cb(msg): messages.append(msg)
+    async def shutdown_cb(): pass
+
+    monkeypatch.setattr(watchdog, "refresh_mc_server_state", mock_refresh_mc_server_state)
+    server = ManagedServer(name="flapping", mc=MinecraftServer())
+    server.watchdog.is_fresh_start = False
+
+    for _ in range(12):
+        await watchdog.watchdog_tick(shutdown_cb, notify_cb, server)
+
+    assert len(messages) == 2
+    assert "временно недоступен" in messages[0]
+    assert "доступен для подключения" in messages[1]
@@ -0,0 +1,71 @@
+import asyncio
+import json
+from types import SimpleNamespace
+import aiohttp
+import pytest
+import pytest_asyncio
+from integrations.webhook import SECRET_HEADER, WebhookServer
+
+UPDATE = {"update_id": 1, "message": {"message_id": 1, "date": 0, "text": "/status",
+                                      "chat": {"id": 5, "type": "private"}}}
+
+
+@pytest_asyncio.fixture
+async def webhook(tmp_path):
+    application = SimpleNamespace(update_queue=asyncio.Queue(), bot=None)
+    server = WebhookServer(application, "127.0.0.1", 0, "/telegram", secret_token="s3cret",
+                           record_file=str(tmp_path / "updates.jsonl"))
+    port = await server.start()
+    yield server, f"http://127.0.0.1:{port}/telegram"
+    await server.stop()
+
+
+@pytest.mark.asyncio
+async def test_valid_update_is_queued_and_recorded(webhook):
+    server, url = webhook
+    async with aiohttp.ClientSession() as session:
+        async with session.post(url, json=UPDATE, headers={SECRET_HEADER: "s3cret"}) as response:
+            assert response.status == 200
+
+    update = server.application.update_queue.get_nowait()
+    assert update.update_id == 1 and update.message.text == "/status"
+    with open(server.record_file, encoding="utf-8") as f:
+        assert json.loads(f.readline()) == UPDATE
+
+
+@pytest.mark.asyncio
+async def test_wrong_secret_is_rejected(webhook):
+    server, url = webhook
+    async with aiohttp.ClientSession() as session:
+        async with session.post(url, json=UPDATE, headers={SECRET_HEADER: "wrong"}) as response:
+            assert response.status == 403
+
+    assert server.application.update_queue.empty()
+
+
+@pytest.mark.asyncio
+async def test_request_without_secret_header_is_rejected(webhook):
+    server, url = webhook
+    async with aiohttp.ClientSession() as session:
+        async with session.post(url, json=UPDATE) as response:
+            assert response.status == 403
+
+    assert server.application.update_queue.empty()
+
+
+def test_secret_token_is_required():
+    application = SimpleNamespace(update_queue=asyncio.Queue(), bot=None)
+    for secret in (None, ""):
+        with pytest.raises(ValueError):
+            WebhookServer(application, "127.0.0.1", 0, "/telegram", secret_token=secret)
+
+
+@pytest.mark.asyncio
+async def test_malformed_update_is_rejected(webhook):
+    server, url = webhook
+    async with aiohttp.ClientSession() as session:
+        for body in ({"message": UPDATE["message"]}, [1, 2]):  # без update_id, не объект
+            async with session.post(url, json=body, headers={SECRET_HEADER: "s3cret"}) as response:
+                assert response.status == 400
+
+    assert server.application.update_queue.empty()